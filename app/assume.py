@@ -0,0 +1,180 @@
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+import threading
+import time
+
+from loguru import logger
+
+from app.consts import ASSUME_TTL_SECONDS
+from app.demand import demand_cache
+from app.schemas import resource_value
+
+if TYPE_CHECKING:
+    from app.schemas import NodeDetail, NodeResources
+    from app.state import SchedulerState
+    from app.swarm.Worker import NodeGenerations
+
+
+class AssumedPod:
+    __slots__ = ("node", "demand", "expires_at")
+
+    def __init__(self, node: str, demand: dict[str, float], expires_at: float):
+        self.node = node
+        self.demand = demand
+        self.expires_at = expires_at
+
+    @classmethod
+    def from_dict(cls, value: dict[str, Any]) -> "AssumedPod":
+        demand = value.get("demand")
+        if demand is None:
+            # stored by a version that only kept cpu and memory
+            demand = {"cpu": value["cpu"], "memory": value["memory"]}
+        return cls(value["node"], demand, value["expires_at"])
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "node": self.node,
+            "demand": self.demand,
+            "expires_at": self.expires_at,
+        }
+
+
+def charged_usage(usage: "NodeResources", charges: dict[str, float]) -> Any:
+    """Copy of `usage` with the `charges` added."""
+    extra = usage.model_extra or {}
+    return usage.model_copy(
+        update={
+            name: (
+                getattr(usage, name)
+                if name in ("cpu", "memory")
+                else resource_value(name, extra.get(name, 0))
+            )
+            + value
+            for name, value in charges.items()
+        }
+    )
+
+
+class AssumeCache:
+    """
+    Pods sent to bind whose placement the node snapshot doesn't show yet.
+
+    The demand of an assumed pod is charged to the usage of its node in every
+    snapshot passed through `apply`, so that consecutive decisions don't pick
+    the same "free" node. The charge ends when the pod is seen running
+    (`confirm`), when its bind fails (`forget`) or after `ttl` seconds. In
+    the last two cases the capacity is freed, and `on_release` is called.
+
+    Charged nodes get a generation derived by `generations` from their own and
+    the version of their charges, as in `SlackLedger`.
+    """
+
+    def __init__(
+        self,
+        ttl: float = ASSUME_TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+        on_release: Optional[Callable[[], None]] = None,
+        generations: Optional["NodeGenerations"] = None,
+    ) -> None:
+        self.ttl = ttl
+        self.clock = clock
+        self.on_release = on_release
+        self.generations = generations
+        self.state: Optional["SchedulerState"] = None
+        self._pods: dict[str, AssumedPod] = {}
+        # node -> version of its charges
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _changed(self, node: str) -> None:
+        self._versions[node] = self._versions.get(node, 0) + 1
+
+    def attach(self, state: "SchedulerState") -> None:
+        """Keep the assumed pods in `state`, restoring those of the last run."""
+        with self._lock:
+            self.state = state
+            for uid, value in state.reservations().items():
+                self._pods[uid] = AssumedPod.from_dict(value)
+                self._changed(self._pods[uid].node)
+        logger.debug(f"Restored {len(self._pods)} assumed pods.")
+
+    def assume(self, pod: Any, node: str) -> None:
+        demand = demand_cache.get(pod).as_dict()
+        assumed = AssumedPod(node, demand, self.clock() + self.ttl)
+        with self._lock:
+            previous = self._pods.get(pod.metadata.uid)
+            if previous is not None:
+                self._changed(previous.node)
+            self._pods[pod.metadata.uid] = assumed
+            self._changed(node)
+            if self.state is not None:
+                self.state.set_reservation(pod.metadata.uid, assumed.as_dict())
+
+    def _remove(self, uid: str) -> bool:
+        with self._lock:
+            assumed = self._pods.pop(uid, None)
+            if assumed is None:
+                return False
+            self._changed(assumed.node)
+            if self.state is not None:
+                self.state.delete_reservation(uid)
+            return True
+
+    def confirm(self, uid: str) -> None:
+        """The pod runs on its node, the snapshot accounts for it from now on."""
+        if self._remove(uid):
+            logger.debug(f"Assumed pod {uid} confirmed.")
+
+    def forget(self, uid: str) -> None:
+        """The bind failed, release the charge."""
+        if self._remove(uid):
+            logger.debug(f"Assumed pod {uid} forgotten.")
+            self._released()
+
+    def expire(self) -> None:
+        now = self.clock()
+        with self._lock:
+            expired = [uid for uid, p in self._pods.items() if p.expires_at <= now]
+        released = False
+        for uid in expired:
+            if self._remove(uid):
+                logger.warning(f"Assumed pod {uid} expired without confirmation.")
+                released = True
+        if released:
+            self._released()
+
+    def _released(self) -> None:
+        if self.on_release is not None:
+            self.on_release()
+
+    def apply(self, nodes: dict[str, "NodeDetail"]) -> dict[str, "NodeDetail"]:
+        """Copy of `nodes` with the demand of the assumed pods added to usage."""
+        self.expire()
+        charges: dict[str, dict[str, float]] = {}
+        with self._lock:
+            for assumed in self._pods.values():
+                charge = charges.setdefault(assumed.node, {})
+                for name, value in assumed.demand.items():
+                    charge[name] = charge.get(name, 0.0) + value
+            versions = {name: self._versions[name] for name in charges}
+
+        charged = dict(nodes)
+        for name, charge in charges.items():
+            node = nodes.get(name)
+            if node is None:
+                continue
+            generation = None
+            if self.generations is not None and node.generation is not None:
+                generation = self.generations.derive(
+                    name, (node.generation, versions[name]), source="reservations"
+                )
+            charged[name] = node.model_copy(
+                update={
+                    "usage": charged_usage(node.usage, charge),
+                    "generation": generation,
+                }
+            )
+        return charged
+
+    def __len__(self) -> int:
+        return len(self._pods)
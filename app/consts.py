@@ -8,6 +8,50 @@ ORCHESTRATION_API_URL = getenv(
     "ORCHESTRATION_API_URL", "http://aces-orchestration-api.hiros.svc.cluster.local"
 )
 RETRY_EVERY_SECONDS = float(getenv("RETRY_EVERY_SECONDS", "5"))
+# timeout of the GETs from the orchestration API
+ORCHESTRATION_TIMEOUT_SECONDS = float(getenv("ORCHESTRATION_TIMEOUT_SECONDS", "10"))
+# port of the scheduler's Prometheus metrics, disabled if 0
+METRICS_PORT = int(getenv("METRICS_PORT", "9000"))
+# upper bound of the adaptive number of concurrent bind calls to WAM
+WAM_MAX_CONCURRENCY = int(getenv("WAM_MAX_CONCURRENCY", "32"))
+# binds sent to WAM as one JSON-RPC batch, and how long to wait to fill one
+WAM_BATCH_SIZE = int(getenv("WAM_BATCH_SIZE", "32"))
+WAM_BATCH_LINGER_MS = float(getenv("WAM_BATCH_LINGER_MS", "5"))
+# threads deciding on pending pods in parallel, see SwarmScheduler.commit
+DECISION_THREADS = int(getenv("DECISION_THREADS", "1"))
+# time a decision may spend gathering nodes and parameters before it falls back
+# to the last published snapshot, no limit if 0
+DECISION_DEADLINE_SECONDS = float(getenv("DECISION_DEADLINE_SECONDS", "5"))
+# backoff of a pod whose scheduling failed, doubled on every further failure
+BACKOFF_INITIAL_SECONDS = float(getenv("BACKOFF_INITIAL_SECONDS", "1"))
+BACKOFF_MAX_SECONDS = float(getenv("BACKOFF_MAX_SECONDS", "60"))
+# a pod that fits nowhere waits for the cluster to grow, retried at the latest
+# after this many seconds
+UNSCHEDULABLE_FLUSH_SECONDS = float(getenv("UNSCHEDULABLE_FLUSH_SECONDS", "300"))
+# seconds a pod sent to bind is charged to its node unless seen running before
+ASSUME_TTL_SECONDS = float(getenv("ASSUME_TTL_SECONDS", "60"))
+# memory-mapped file for the warm state of the scheduler, disabled if empty
+STATE_FILE = getenv("STATE_FILE", "")
+# the watch resourceVersion is written to it at most this often
+RESOURCE_VERSION_SAVE_SECONDS = float(getenv("RESOURCE_VERSION_SAVE_SECONDS", "1"))
+# resource dimensions of the scheduling vectors, in bucket key bit order; cpu and
+# memory come first, they are the ones alpha/beta from /tuning_parameters apply to
+RESOURCES = tuple(
+    name.strip() for name in getenv("RESOURCES", "cpu,memory").split(",") if name
+)
+# let elastic pods use slack of the buckets next to their own when it has none
+NEIGHBOR_BUCKETS = getenv("NEIGHBOR_BUCKETS", "false").lower() == "true"
+# SWARM, RND, or BINPACK to place batches of pending pods jointly
+SCHEDULING_METHOD = getenv("SCHEDULING_METHOD", "SWARM")
+# BINPACK: most pending pods placed at once, and whether elastic pods may use
+# the slack of rigid pods
+BINPACK_BATCH_SIZE = int(getenv("BINPACK_BATCH_SIZE", "64"))
+BINPACK_SLACK = getenv("BINPACK_SLACK", "true").lower() == "true"
+# "api": alpha/beta from /tuning_parameters, "local": streaming estimate
+THRESHOLDS_SOURCE = getenv("THRESHOLDS_SOURCE", "api")
+# the local thresholds are recomputed at most this often, so that lookup tables
+# and bucket keys stay valid in between
+THRESHOLDS_REFRESH_SECONDS = float(getenv("THRESHOLDS_REFRESH_SECONDS", "60"))
 
 # Annotation keys
 ANNOT_DECISION_START_TIME = "resource-management-service/decision-start-time"
@@ -0,0 +1,148 @@
+from typing import Any, Callable, Hashable, Optional
+
+import threading
+from collections import OrderedDict
+
+from app.consts import RESOURCES
+from app.swarm.buckets import BucketKey, bucket_key
+from app.utils import classify_pod, get_pod_requested_resources
+
+Thresholds = tuple[float, ...]
+
+
+def owner_uid(pod: Any) -> Optional[str]:
+    """UID of the controller owning the pod (ReplicaSet, StatefulSet, Job, ...)."""
+    owners = pod.metadata.owner_references
+    if not owners:
+        return None
+    for owner in owners:
+        if owner.controller:
+            return str(owner.uid)
+    return str(owners[0].uid)
+
+
+def template_resources(pod: Any) -> tuple[Hashable, ...]:
+    """Hashable fingerprint of the resources of all containers of the pod."""
+    fingerprint = []
+    for container in pod.spec.containers:
+        resources = container.resources
+        limits = resources.limits if resources else None
+        requests = resources.requests if resources else None
+        fingerprint.append(
+            (
+                tuple(sorted(limits.items())) if limits else (),
+                tuple(sorted(requests.items())) if requests else (),
+            )
+        )
+    return tuple(fingerprint)
+
+
+class PodDemand:
+    """Parsed resource demand shared by all pods created from the same template."""
+
+    __slots__ = (
+        "cpu",
+        "memory",
+        "extended",
+        "pod_class",
+        "vector",
+        "_bucket",
+    )
+
+    def __init__(
+        self,
+        cpu: float,
+        memory: float,
+        pod_class: str,
+        extended: Optional[dict[str, float]] = None,
+    ) -> None:
+        self.cpu = cpu
+        self.memory = memory
+        # requested resources other than cpu and memory
+        self.extended = extended or {}
+        self.pod_class = pod_class
+        # the demand over the scheduling dimensions (`RESOURCES`)
+        self.vector: tuple[float, ...] = tuple(self.get(name) for name in RESOURCES)
+        # the thresholds the bucket key was computed for, and the key
+        self._bucket: Optional[tuple[Thresholds, BucketKey]] = None
+
+    @classmethod
+    def from_pod(cls, pod: Any) -> "PodDemand":
+        requested = get_pod_requested_resources(pod)
+        cpu, memory = requested.pop("cpu"), requested.pop("memory")
+        return cls(cpu, memory, classify_pod(pod), requested)
+
+    def get(self, name: str) -> float:
+        if name == "cpu":
+            return self.cpu
+        if name == "memory":
+            return self.memory
+        return self.extended.get(name, 0.0)
+
+    @property
+    def demand_class(self) -> tuple[str, tuple[float, ...]]:
+        """Pods of the same class fit on the same nodes and slack entries."""
+        return (self.pod_class, self.vector)
+
+    def as_dict(self) -> dict[str, float]:
+        return {"cpu": self.cpu, "memory": self.memory, **self.extended}
+
+    def bucket_key(self, thresholds: Thresholds) -> BucketKey:
+        """Bucket key of the demand, recomputed only when the thresholds change."""
+        bucket = self._bucket
+        if bucket is None or bucket[0] != thresholds:
+            bucket = (thresholds, bucket_key(self.vector, thresholds))
+            self._bucket = bucket
+        return bucket[1]
+
+
+class DemandCache:
+    """Bounded LRU cache of pod demands keyed by owner UID and template resources.
+
+    Replicas of the same ReplicaSet/StatefulSet/Job share one entry, so their
+    resource quantities are parsed once instead of once per replica and call.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        compute: Callable[[Any], PodDemand] = PodDemand.from_pod,
+    ) -> None:
+        self.maxsize = maxsize
+        self.compute = compute
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, PodDemand] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, pod: Any) -> Hashable:
+        return (owner_uid(pod), template_resources(pod))
+
+    def get(self, pod: Any) -> PodDemand:
+        key = self.key(pod)
+        with self._lock:
+            demand = self._entries.get(key)
+            if demand is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return demand
+
+        demand = self.compute(pod)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = demand
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return demand
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+demand_cache = DemandCache()
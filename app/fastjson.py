@@ -0,0 +1,66 @@
+# JSON encoding of the decision path: orjson when it is installed, the standard
+# library otherwise. Both produce compact UTF-8 bytes.
+
+from typing import Any, Iterable, Iterator
+
+import codecs
+import json
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:  # pragma: no cover
+    HAS_ORJSON = False
+
+HEADERS = {"Content-Type": "application/json"}
+
+
+def dumps(value: Any) -> bytes:
+    if HAS_ORJSON:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def loads(data: bytes | str) -> Any:
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def iter_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Decode the elements of a top-level JSON array one at a time from a stream of
+    byte chunks, keeping only the current element and one chunk in memory.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer, pos = "", 0
+    started = False
+    for chunk in chunks:
+        buffer = buffer[pos:] + utf8.decode(chunk)
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                if buffer[pos] == "," and not started:
+                    raise ValueError("Expected a JSON array")
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # the element continues in the next chunk
+            if end == len(buffer) and not isinstance(value, (dict, list)):
+                break  # a number or literal may continue in the next chunk
+            yield value
+            pos = end
+    raise ValueError("Truncated JSON array")
@@ -0,0 +1,68 @@
+from typing import TYPE_CHECKING, Optional
+
+import threading
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from kubernetes.client import CoreV1Api, CustomObjectsApi
+
+
+class KubernetesClients:
+    """Lazily configured Kubernetes API clients shared by the whole process.
+
+    Nothing touches the cluster configuration until a client is first requested,
+    so importing the service (tests, OpenAPI extraction, benchmarks) stays cheap.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._configured = False
+        self._core_v1: Optional["CoreV1Api"] = None
+        self._custom_objects: Optional["CustomObjectsApi"] = None
+
+    def _load_config(self) -> None:
+        from kubernetes import config
+
+        try:
+            config.load_incluster_config()
+        except config.config_exception.ConfigException:
+            try:
+                config.load_kube_config()
+            except config.config_exception.ConfigException:
+                logger.error(
+                    "No Kubernetes config found — running without cluster access"
+                )
+        self._configured = True
+
+    def core_v1(self) -> "CoreV1Api":
+        if self._core_v1 is None:
+            with self._lock:
+                if self._core_v1 is None:
+                    from kubernetes import client
+
+                    if not self._configured:
+                        self._load_config()
+                    self._core_v1 = client.CoreV1Api()
+        return self._core_v1
+
+    def custom_objects(self) -> "CustomObjectsApi":
+        if self._custom_objects is None:
+            with self._lock:
+                if self._custom_objects is None:
+                    from kubernetes import client
+
+                    if not self._configured:
+                        self._load_config()
+                    self._custom_objects = client.CustomObjectsApi()
+        return self._custom_objects
+
+    def reset(self) -> None:
+        """Drop the cached clients; the next request reloads the configuration."""
+        with self._lock:
+            self._configured = False
+            self._core_v1 = None
+            self._custom_objects = None
+
+
+clients = KubernetesClients()
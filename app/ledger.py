@@ -0,0 +1,141 @@
+from typing import TYPE_CHECKING, Any, Collection, Optional
+
+import threading
+
+from loguru import logger
+
+from app.demand import demand_cache
+from app.schemas import resource_value
+
+if TYPE_CHECKING:
+    from app.schemas import NodeDetail, NodeResources
+    from app.state import SchedulerState
+    from app.swarm.Worker import NodeGenerations
+
+
+class SlackCharge:
+    __slots__ = ("node", "host", "demand")
+
+    def __init__(self, node: str, host: str, demand: dict[str, float]):
+        self.node = node
+        # key of the rigid pod whose slack hosts the elastic pod
+        self.host = host
+        self.demand = demand
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"node": self.node, "host": self.host, "demand": self.demand}
+
+
+def charged_slack(slack: "NodeResources", charges: list[dict[str, float]]) -> Any:
+    """Copy of `slack` less the `charges`, never below zero."""
+    update: dict[str, float] = {}
+    for demand in charges:
+        for name, value in demand.items():
+            if name not in update:
+                update[name] = (
+                    getattr(slack, name)
+                    if name in ("cpu", "memory")
+                    else resource_value(name, (slack.model_extra or {}).get(name, 0))
+                )
+            update[name] -= value
+    return slack.model_copy(
+        update={name: max(value, 0.0) for name, value in update.items()}
+    )
+
+
+class SlackLedger:
+    """
+    Elastic pods placed into the slack of a rigid pod, for as long as they run.
+
+    The demand of every elastic pod is charged to the slack entry of its host
+    rigid pod in every snapshot passed through `apply`, so that the lookup
+    table and the fit checks see the slack that is actually left. The charge
+    ends when the elastic pod ends or its bind fails (`release`).
+
+    Charged nodes get a generation derived by `generations` from their own and
+    the version of their charges, so that they are only rebuilt when either
+    changes; without `generations` they are rebuilt every time.
+    """
+
+    def __init__(self, generations: Optional["NodeGenerations"] = None) -> None:
+        self.generations = generations
+        self.state: Optional["SchedulerState"] = None
+        self._charges: dict[str, SlackCharge] = {}
+        # node -> version of its charges
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _changed(self, node: str) -> None:
+        self._versions[node] = self._versions.get(node, 0) + 1
+
+    def attach(self, state: "SchedulerState") -> None:
+        """Keep the charges in `state`, restoring those of the last run."""
+        with self._lock:
+            self.state = state
+            for uid, value in state.slack_charges().items():
+                self._charges[uid] = SlackCharge(**value)
+                self._changed(self._charges[uid].node)
+        logger.debug(f"Restored {len(self._charges)} slack charges.")
+
+    def charge(self, pod: Any, node: str, host: str) -> None:
+        charge = SlackCharge(node, host, demand_cache.get(pod).as_dict())
+        with self._lock:
+            previous = self._charges.get(pod.metadata.uid)
+            if previous is not None:
+                self._changed(previous.node)
+            self._charges[pod.metadata.uid] = charge
+            self._changed(node)
+            if self.state is not None:
+                self.state.set_slack_charge(pod.metadata.uid, charge.as_dict())
+
+    def release(self, uid: str) -> None:
+        """The elastic pod ended or was never bound, give the slack back."""
+        with self._lock:
+            charge = self._charges.pop(uid, None)
+            if charge is None:
+                return
+            self._changed(charge.node)
+            if self.state is not None:
+                self.state.delete_slack_charge(uid)
+        logger.debug(f"Slack charge of pod {uid} released.")
+
+    def retain(self, uids: Collection[str]) -> None:
+        """Release the charges of the elastic pods not in `uids`, which ended."""
+        with self._lock:
+            ended = [uid for uid in self._charges if uid not in uids]
+        for uid in ended:
+            self.release(uid)
+        if ended:
+            logger.info(f"Released the slack charges of {len(ended)} ended pods.")
+
+    def apply(self, nodes: dict[str, "NodeDetail"]) -> dict[str, "NodeDetail"]:
+        """Copy of `nodes` with the charges taken from the slack entries."""
+        charges: dict[str, dict[str, list[dict[str, float]]]] = {}
+        with self._lock:
+            for charge in self._charges.values():
+                hosts = charges.setdefault(charge.node, {})
+                hosts.setdefault(charge.host, []).append(charge.demand)
+            versions = {name: self._versions[name] for name in charges}
+
+        charged = dict(nodes)
+        for name, hosts in charges.items():
+            node = nodes.get(name)
+            if node is None or not node.slack:
+                continue
+            slack = dict(node.slack)
+            for host, demands in hosts.items():
+                # hosts that ended are gone from the slack table
+                if host in slack:
+                    slack[host] = charged_slack(slack[host], demands)
+            generation = None
+            if self.generations is not None and node.generation is not None:
+                generation = self.generations.derive(
+                    name, (node.generation, versions[name]), source="slack"
+                )
+            charged[name] = node.model_copy(
+                update={"slack": slack, "generation": generation}
+            )
+        return charged
+
+    def __len__(self) -> int:
+        return len(self._charges)
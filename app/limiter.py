@@ -0,0 +1,93 @@
+from typing import Iterator, Optional
+
+import threading
+import time
+from contextlib import contextmanager
+
+from app import metrics
+
+
+class LimitExceeded(Exception):
+    pass
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit driven by latency and errors.
+
+    Each call that succeeds within `latency_tolerance` times the baseline
+    latency grows the limit by `1 / limit` (about +1 per round of calls); a
+    failed or slow call multiplies it by `backoff`. The baseline follows the
+    lowest observed latency and drifts slowly upwards, so it adapts when the
+    service gets permanently slower.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        backoff: float = 0.7,
+        latency_tolerance: float = 2.0,
+        baseline_drift: float = 0.01,
+        name: str = "wam_bind",
+    ) -> None:
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.baseline_drift = baseline_drift
+        self.baseline: Optional[float] = None
+        self.in_flight = 0
+        self.name = name
+        self._condition = threading.Condition()
+        self._publish()
+
+    def _publish(self) -> None:
+        metrics.CONCURRENCY_LIMIT.labels(self.name).set(self.limit)
+        metrics.IN_FLIGHT.labels(self.name).set(self.in_flight)
+
+    def acquire(self, timeout: Optional[float] = None) -> None:
+        """Wait until fewer than `limit` calls are in flight."""
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self.in_flight < max(int(self.limit), 1), timeout
+            ):
+                raise LimitExceeded(
+                    f"{self.in_flight} calls in flight (limit {self.limit:.1f})"
+                )
+            self.in_flight += 1
+            self._publish()
+
+    def release(self, latency: float, ok: bool) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            if self.baseline is None or latency < self.baseline:
+                self.baseline = latency
+            else:
+                self.baseline += (latency - self.baseline) * self.baseline_drift
+
+            if ok and latency <= self.latency_tolerance * self.baseline:
+                self.limit += 1 / self.limit
+            else:
+                self.limit *= self.backoff
+            self.limit = min(max(self.limit, self.min_limit), self.max_limit)
+
+            metrics.CALL_LATENCY.labels(self.name).observe(latency)
+            if not ok:
+                metrics.CALL_ERRORS.labels(self.name).inc()
+            self._publish()
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None) -> Iterator[None]:
+        """Hold one slot for the duration of a call and record its outcome."""
+        self.acquire(timeout)
+        start = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.release(time.monotonic() - start, ok)
@@ -2,9 +2,10 @@ from typing import Any, Dict
 
 from fastapi import FastAPI
 from fastapi.openapi.utils import get_openapi
+from fastapi.responses import JSONResponse, ORJSONResponse
 from prometheus_fastapi_instrumentator import Instrumentator
 
-from app import routers  # , items
+from app import fastjson, routers, snapshot  # , items
 
 
 class CustomFastAPI(FastAPI):
@@ -30,11 +31,14 @@ class CustomFastAPI(FastAPI):
         return self.openapi_schema
 
 
-app = CustomFastAPI()
+app = CustomFastAPI(
+    default_response_class=ORJSONResponse if fastjson.HAS_ORJSON else JSONResponse
+)
 
 
 Instrumentator().instrument(app).expose(app)
 
 
 app.include_router(routers.router)
+app.include_router(snapshot.routes.router)
 # app.include_router(items.routes.router)
@@ -0,0 +1,55 @@
+# Prometheus metrics of the scheduler process, served by start_metrics_server.
+# (The webserver exposes its own HTTP metrics on /metrics, see app.main.)
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+from app.consts import METRICS_PORT
+
+CONCURRENCY_LIMIT = Gauge(
+    "rms_concurrency_limit",
+    "Current adaptive concurrency limit of outgoing calls.",
+    ["client"],
+)
+IN_FLIGHT = Gauge(
+    "rms_in_flight_calls",
+    "Outgoing calls currently in flight.",
+    ["client"],
+)
+CALL_LATENCY = Histogram(
+    "rms_call_latency_seconds",
+    "Latency of outgoing calls.",
+    ["client"],
+)
+CALL_ERRORS = Counter(
+    "rms_call_errors_total",
+    "Outgoing calls that failed.",
+    ["client"],
+)
+PENDING_PODS = Gauge(
+    "rms_pending_pods",
+    "Pods waiting for a scheduling decision.",
+    ["tier"],
+)
+
+COMMIT_CONFLICTS = Counter(
+    "rms_commit_conflicts_total",
+    "Decisions refused at commit because the node no longer fits the pod.",
+)
+
+ORCHESTRATION_FETCHES = Counter(
+    "rms_orchestration_fetches_total",
+    "GETs of the orchestration API, by whether the resource had changed.",
+    ["path", "result"],
+)
+
+DECISION_FALLBACKS = Counter(
+    "rms_decision_fallbacks_total",
+    "Decisions that ran out of time gathering nodes and parameters, by what "
+    "they fell back to.",
+    ["fallback"],
+)
+
+
+def start_metrics_server() -> None:
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
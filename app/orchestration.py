@@ -0,0 +1,76 @@
+from typing import Any, Callable
+
+import threading
+
+import requests
+from loguru import logger
+
+from app.consts import ORCHESTRATION_API_URL, ORCHESTRATION_TIMEOUT_SECONDS
+from app.metrics import ORCHESTRATION_FETCHES
+
+NOT_MODIFIED = 304
+
+
+def decode_json(response: Any) -> Any:
+    return response.json()
+
+
+class OrchestrationClient:
+    """
+    Conditional, compressed GETs against the orchestration API.
+
+    Every response is asked for gzip-encoded, and the decoded value of every
+    response that carries an ETag is kept with it. The next GET of the same
+    path sends `If-None-Match`; on a 304 the kept value is returned without
+    reading or decoding anything. Kept values are shared between callers and
+    must not be modified.
+    """
+
+    def __init__(
+        self,
+        base_url: str = ORCHESTRATION_API_URL,
+        timeout: float = ORCHESTRATION_TIMEOUT_SECONDS,
+    ) -> None:
+        self.base_url = base_url
+        self.timeout = timeout
+        # path -> (etag, decoded value)
+        self._cache: dict[str, tuple[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str, decode: Callable[[Any], Any] = decode_json) -> Any:
+        """
+        The value of `path` as decoded by `decode` from the (streamed) response,
+        or None if the API answered with an error status.
+        """
+        headers = {"Accept-Encoding": "gzip"}
+        with self._lock:
+            cached = self._cache.get(path)
+        if cached is not None:
+            headers["If-None-Match"] = cached[0]
+
+        with requests.get(
+            f"{self.base_url}{path}", headers=headers, stream=True, timeout=self.timeout
+        ) as response:
+            if response.status_code == NOT_MODIFIED and cached is not None:
+                ORCHESTRATION_FETCHES.labels(path=path, result="not_modified").inc()
+                return cached[1]
+            if response.status_code != 200:
+                logger.error(f"Status code {response.status_code}: {response.text}")
+                return None
+            value = decode(response)
+            etag = response.headers.get("ETag")
+
+        ORCHESTRATION_FETCHES.labels(path=path, result="modified").inc()
+        with self._lock:
+            if isinstance(etag, str):
+                self._cache[path] = (etag, value)
+            else:
+                self._cache.pop(path, None)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+client = OrchestrationClient()
@@ -0,0 +1,323 @@
+from typing import Any, Callable, Hashable, Optional
+
+import heapq
+import itertools
+import threading
+import time
+
+from loguru import logger
+
+from app.consts import (
+    BACKOFF_INITIAL_SECONDS,
+    BACKOFF_MAX_SECONDS,
+    UNSCHEDULABLE_FLUSH_SECONDS,
+)
+from app.metrics import PENDING_PODS
+
+# outcomes of a scheduling decision
+SCHEDULED = "scheduled"
+UNSCHEDULABLE = "unschedulable"
+FAILED = "failed"
+
+
+class PendingPod:
+    __slots__ = (
+        "pod",
+        "decision_start_time",
+        "order",
+        "ready_at",
+        "demand_class",
+        "wakes",
+    )
+
+    def __init__(
+        self,
+        pod: Any,
+        decision_start_time: Optional[str],
+        order: tuple[int, float, int],
+        ready_at: Optional[float] = None,
+    ):
+        self.pod = pod
+        self.decision_start_time = decision_start_time
+        self.order = order
+        # set while the pod waits in the backoff or the unschedulable tier
+        self.ready_at = ready_at
+        # set while the pod waits in the unschedulable tier
+        self.demand_class: Optional[Hashable] = None
+        # number of wakes when the pod was popped, see `park`
+        self.wakes = 0
+
+
+def pod_order(pod: Any, seq: int) -> tuple[int, float, int]:
+    """Higher priority first, then older pods, then arrival order."""
+    priority = pod.spec.priority or 0
+    created = pod.metadata.creation_timestamp
+    return (-priority, created.timestamp() if created else time.time(), seq)
+
+
+class PendingQueue:
+    """
+    Pods waiting for a scheduling decision, ordered by priority and age.
+
+    A pod whose decision failed is parked in a backoff tier for
+    `initial_backoff` seconds, doubled on every further failure up to
+    `max_backoff`, so that a pod that doesn't fit anywhere doesn't hold up the
+    ones behind it. A pod that doesn't fit anywhere is instead parked in the
+    unschedulable tier under its demand class until `wake` is called for that
+    class, because the cluster grew, or at the latest after `flush_interval`
+    seconds. Pods are known by uid: adding a pod that is already queued or
+    being decided on only refreshes it.
+    """
+
+    def __init__(
+        self,
+        initial_backoff: float = BACKOFF_INITIAL_SECONDS,
+        max_backoff: float = BACKOFF_MAX_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        flush_interval: float = UNSCHEDULABLE_FLUSH_SECONDS,
+    ) -> None:
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self._seq = itertools.count()
+        self._entries: dict[str, PendingPod] = {}
+        # (order, uid) of active pods and (ready_at, seq, uid) of backed off ones;
+        # entries of removed pods are dropped when they reach the top
+        self._active: list[tuple[tuple[int, float, int], str]] = []
+        self._backoff: list[tuple[float, int, str]] = []
+        self._in_flight: set[str] = set()
+        self._failures: dict[str, int] = {}
+        self._backing_off = 0
+        # demand class -> uids of the pods in the unschedulable tier
+        self._unschedulable: dict[Hashable, set[str]] = {}
+        self._parked = 0
+        self._wakes = 0
+        self._cond = threading.Condition()
+
+    def add(self, pod: Any, decision_start_time: Optional[str] = None) -> bool:
+        """Queue `pod`; False if it already was queued or being decided on."""
+        uid = pod.metadata.uid
+        with self._cond:
+            entry = self._entries.get(uid)
+            if entry is not None:
+                entry.pod = pod
+                return False
+            if uid in self._in_flight:
+                return False
+            entry = PendingPod(
+                pod, decision_start_time, pod_order(pod, next(self._seq))
+            )
+            self._entries[uid] = entry
+            heapq.heappush(self._active, (entry.order, uid))
+            self._publish()
+            self._cond.notify()
+            return True
+
+    def pop(self, timeout: Optional[float] = None) -> Optional[PendingPod]:
+        """
+        Take the first active pod, waiting up to `timeout` seconds (forever if
+        None) for one; it stays known as being decided on until `done` or
+        `backoff` is called for it.
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._cond:
+            while True:
+                self._promote()
+                while self._active:
+                    order, uid = heapq.heappop(self._active)
+                    entry = self._entries.get(uid)
+                    if (
+                        entry is None
+                        or entry.order != order
+                        or entry.ready_at is not None
+                    ):
+                        continue
+                    del self._entries[uid]
+                    entry.wakes = self._wakes
+                    self._in_flight.add(uid)
+                    self._publish()
+                    return entry
+
+                wait = self._backoff[0][0] - self.clock() if self._backoff else None
+                if deadline is not None:
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        return None
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
+
+    def pop_batch(self, size: int, timeout: Optional[float] = None) -> list[PendingPod]:
+        """`pop` one pod, then up to `size - 1` more that are ready right away."""
+        first = self.pop(timeout)
+        if first is None:
+            return []
+        batch = [first]
+        while len(batch) < size:
+            entry = self.pop(timeout=0)
+            if entry is None:
+                break
+            batch.append(entry)
+        return batch
+
+    def _promote(self) -> None:
+        """
+        Move the pods whose backoff or unschedulable flush interval is over
+        back to the active tier.
+        """
+        now = self.clock()
+        while self._backoff and self._backoff[0][0] <= now:
+            ready_at, _, uid = heapq.heappop(self._backoff)
+            entry = self._entries.get(uid)
+            if entry is None or entry.ready_at != ready_at:
+                continue
+            self._activate(uid, entry)
+
+    def _activate(self, uid: str, entry: PendingPod) -> None:
+        if entry.demand_class is not None:
+            self._unpark(uid, entry)
+        else:
+            self._backing_off -= 1
+        entry.ready_at = None
+        heapq.heappush(self._active, (entry.order, uid))
+
+    def _unpark(self, uid: str, entry: PendingPod) -> None:
+        uids = self._unschedulable[entry.demand_class]
+        uids.discard(uid)
+        if not uids:
+            del self._unschedulable[entry.demand_class]
+        entry.demand_class = None
+        self._parked -= 1
+
+    def done(self, uid: str) -> None:
+        """The decision for the pod was made."""
+        with self._cond:
+            self._in_flight.discard(uid)
+
+    def backoff(self, pod: Any, decision_start_time: Optional[str] = None) -> float:
+        """Park `pod` after a failed decision; returns its backoff in seconds."""
+        uid = pod.metadata.uid
+        with self._cond:
+            self._in_flight.discard(uid)
+            failures = self._failures.get(uid, 0) + 1
+            self._failures[uid] = failures
+            delay: float = min(
+                self.initial_backoff * 2 ** (failures - 1), self.max_backoff
+            )
+
+            entry = self._entries.get(uid)
+            if entry is None:
+                order = pod_order(pod, next(self._seq))
+                entry = PendingPod(pod, decision_start_time, order)
+                self._entries[uid] = entry
+            if entry.demand_class is not None:
+                self._unpark(uid, entry)
+                entry.ready_at = None
+            if entry.ready_at is None:
+                self._backing_off += 1
+            entry.ready_at = self.clock() + delay
+            heapq.heappush(self._backoff, (entry.ready_at, next(self._seq), uid))
+            self._publish()
+            self._cond.notify()
+        logger.debug("Pod {} backs off for {:.1f}s.", pod.metadata.name, delay)
+        return delay
+
+    def park(
+        self,
+        pod: Any,
+        demand_class: Hashable,
+        decision_start_time: Optional[str] = None,
+        wakes: Optional[int] = None,
+    ) -> bool:
+        """
+        Park `pod`, which fits nowhere, in the unschedulable tier. `wakes` is
+        the `PendingPod.wakes` of its decision: if `wake` was called since, the
+        decision may have missed the change and the pod is backed off instead.
+        Returns True if the pod was parked.
+        """
+        with self._cond:
+            if wakes is not None and wakes != self._wakes:
+                parked = False
+            else:
+                uid = pod.metadata.uid
+                self._in_flight.discard(uid)
+                entry = self._entries.get(uid)
+                if entry is None:
+                    order = pod_order(pod, next(self._seq))
+                    entry = PendingPod(pod, decision_start_time, order)
+                    self._entries[uid] = entry
+                elif entry.demand_class is not None:
+                    self._unpark(uid, entry)
+                elif entry.ready_at is not None:
+                    self._backing_off -= 1
+                entry.demand_class = demand_class
+                entry.ready_at = self.clock() + self.flush_interval
+                heapq.heappush(self._backoff, (entry.ready_at, next(self._seq), uid))
+                self._unschedulable.setdefault(demand_class, set()).add(uid)
+                self._parked += 1
+                self._publish()
+                self._cond.notify()
+                parked = True
+        if not parked:
+            self.backoff(pod, decision_start_time)
+        else:
+            logger.debug("Pod {} is unschedulable, parked.", pod.metadata.name)
+        return parked
+
+    def wake(self, fits: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """
+        The cluster grew: move the parked pods of the demand classes for which
+        `fits` is true (all of them if None) back to the active tier. Returns
+        the number of pods moved.
+        """
+        with self._cond:
+            self._wakes += 1
+            woken = [
+                demand_class
+                for demand_class in self._unschedulable
+                if fits is None or fits(demand_class)
+            ]
+            moved = 0
+            for demand_class in woken:
+                for uid in list(self._unschedulable[demand_class]):
+                    self._activate(uid, self._entries[uid])
+                    moved += 1
+            if moved:
+                self._publish()
+                self._cond.notify_all()
+        if moved:
+            logger.debug("Requeued {} unschedulable pods.", moved)
+        return moved
+
+    def remove(self, uid: str) -> None:
+        """The pod was bound or deleted, forget about it."""
+        with self._cond:
+            self._failures.pop(uid, None)
+            entry = self._entries.pop(uid, None)
+            if entry is not None:
+                if entry.demand_class is not None:
+                    self._unpark(uid, entry)
+                elif entry.ready_at is not None:
+                    self._backing_off -= 1
+                self._publish()
+
+    def backing_off(self) -> int:
+        """Number of pods in the backoff tier."""
+        return self._backing_off
+
+    def unschedulable(self) -> int:
+        """Number of pods in the unschedulable tier."""
+        return self._parked
+
+    def in_flight(self) -> int:
+        """Number of pods being decided on."""
+        return len(self._in_flight)
+
+    def _publish(self) -> None:
+        waiting = self._backing_off + self._parked
+        PENDING_PODS.labels(tier="active").set(len(self._entries) - waiting)
+        PENDING_PODS.labels(tier="backoff").set(self._backing_off)
+        PENDING_PODS.labels(tier="unschedulable").set(self._parked)
+
+    def __len__(self) -> int:
+        return len(self._entries)
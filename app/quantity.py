@@ -0,0 +1,155 @@
+# Parsing of Kubernetes resource quantities ("250m", "1.5Gi", "1e3", ...), the
+# same as kubernetes.utils.quantity.parse_quantity but without going through
+# Decimal for the usual forms, and cached.
+
+from typing import Any
+
+import re
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+from functools import lru_cache
+
+# nano units per base unit (core, byte, ...), the finest Kubernetes precision
+NANO = 10**9
+CACHE_SIZE = 4096
+# largest power of ten of a quantity's number, so that "1e999999999" doesn't
+# turn into a billion-digit integer
+MAX_EXPONENT = 100
+
+# suffix -> (base, exponent), as in kubernetes.utils.quantity
+_EXPONENTS = {
+    "n": -3,
+    "u": -2,
+    "m": -1,
+    "K": 1,
+    "k": 1,
+    "M": 2,
+    "G": 3,
+    "T": 4,
+    "P": 5,
+    "E": 6,
+}
+_SUFFIXES = {
+    **{suffix: (1000, exponent) for suffix, exponent in _EXPONENTS.items()},
+    **{
+        suffix + "i": (1024, exponent)
+        for suffix, exponent in _EXPONENTS.items()
+        if suffix != "k"
+    },
+}
+# suffix -> nano units per unit, where that is a whole number
+_NANOS_PER_UNIT: dict[str, int] = {
+    "": NANO,
+    **{
+        suffix: base**exponent * NANO
+        for suffix, (base, exponent) in _SUFFIXES.items()
+        if exponent >= 0
+    },
+    "m": 10**6,
+    "u": 10**3,
+    "n": 1,
+}
+# the other usual forms: sign, digits, fraction, exponent and suffix
+_FORM = re.compile(
+    r"([+-]?)([0-9]+)(?:\.([0-9]*))?(?:[eE]([+-]?[0-9]{1,2}))?"
+    r"([numkKMGTPE]|[KMGTPE]i)?"
+)
+
+
+def _ceil_div(a: int, b: int) -> int:
+    return -(-a // b)
+
+
+def _to_nanos(
+    negative: bool, digits: int, power10: int, base: int, exponent: int
+) -> int:
+    """`digits * 10**power10 * base**exponent` in nano units, rounded up."""
+    power10 += 9
+    numerator, denominator = digits, 1
+    if base == 1000:
+        power10 += 3 * exponent
+    elif exponent >= 0:
+        numerator *= base**exponent
+    else:
+        denominator *= base**-exponent
+    if power10 >= 0:
+        numerator *= 10**power10
+    else:
+        denominator *= 10**-power10
+    nanos = numerator if denominator == 1 else _ceil_div(numerator, denominator)
+    return -nanos if negative else nanos
+
+
+def _parse_slow(quantity: str) -> int:
+    """Any form `Decimal` reads, split from its suffix like Kubernetes does."""
+    number, suffix = quantity, ""
+    if len(quantity) >= 2 and quantity[-1] == "i":
+        if quantity[-2] in _EXPONENTS:
+            number, suffix = quantity[:-2], quantity[-2:]
+    elif len(quantity) >= 1 and quantity[-1] in _EXPONENTS:
+        number, suffix = quantity[:-1], quantity[-1:]
+    if suffix and suffix not in _SUFFIXES:
+        raise ValueError(f"{quantity} has unknown suffix")
+    try:
+        value = Decimal(number)
+    except InvalidOperation:
+        raise ValueError(f"Invalid number format: {number}")
+    if not value.is_finite() or (value and abs(value.adjusted()) > MAX_EXPONENT):
+        raise ValueError(f"{quantity} is out of range")
+
+    base, exponent = _SUFFIXES[suffix] if suffix else (1000, 0)
+    nanos = Fraction(abs(value)) * NANO * Fraction(base) ** exponent
+    rounded = _ceil_div(nanos.numerator, nanos.denominator)
+    return -rounded if value < 0 else rounded
+
+
+def _parse_nanos(quantity: str) -> int:
+    # whole numbers of a unit ("250m", "512Mi", "4") without a regex
+    if quantity[-1:] == "i":
+        number, suffix = quantity[:-2], quantity[-2:]
+    elif quantity[-1:].isdecimal():
+        number, suffix = quantity, ""
+    else:
+        number, suffix = quantity[:-1], quantity[-1:]
+    per_unit = _NANOS_PER_UNIT.get(suffix)
+    if per_unit is not None and number.isdecimal():
+        return int(number) * per_unit
+
+    match = _FORM.fullmatch(quantity)
+    if match is None:
+        return _parse_slow(quantity)
+    sign, whole, fraction, power10, suffix = match.groups()
+    fraction = fraction or ""
+    base, exponent = _SUFFIXES[suffix] if suffix else (1000, 0)
+    return _to_nanos(
+        sign == "-",
+        int(whole + fraction),
+        int(power10 or 0) - len(fraction),
+        base,
+        exponent,
+    )
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_nanos(quantity: str) -> int:
+    """
+    The quantity in integer nano units of its base unit (cores, bytes, ...),
+    rounded away from zero beyond nano precision like Kubernetes does (where
+    `kubernetes.utils.quantity` keeps the exact Decimal). Raises ValueError
+    for invalid, infinite or absurdly large quantities.
+    """
+    return _parse_nanos(quantity)
+
+
+def parse_quantity(quantity: Any) -> float:
+    """
+    The quantity in its base unit, rounded away from zero to nano units like
+    `parse_nanos`; within nano precision equal to `float` of what
+    `kubernetes.utils.quantity.parse_quantity` returns. Numbers are returned
+    as they are.
+    """
+    if isinstance(quantity, str):
+        return parse_nanos(quantity) / NANO
+    if isinstance(quantity, (int, float, Decimal)):
+        return float(quantity)
+    return parse_nanos(str(quantity)) / NANO
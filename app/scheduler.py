@@ -1,73 +1,93 @@
-from typing import Any
+from typing import Any, Callable, Optional
 
-import json
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 
 import requests
-from kubernetes import client, config, watch
+from kubernetes import watch
+from kubernetes.client.exceptions import ApiException
 from loguru import logger
 
+from app import fastjson, orchestration
+from app.assume import AssumeCache
 from app.consts import (
     ANNOT_DECISION_START_TIME,
     ANNOT_RETRIES,
     ANNOT_SCHEDULING_ATTEMPTED,
     ANNOT_SCHEDULING_SUCCESS,
+    BINPACK_BATCH_SIZE,
+    DECISION_DEADLINE_SECONDS,
+    DECISION_THREADS,
     ORCHESTRATION_API_URL,
+    RESOURCE_VERSION_SAVE_SECONDS,
     RETRY_EVERY_SECONDS,
-    WAM_URL,
+    SCHEDULING_METHOD,
+    STATE_FILE,
     get_timestamp,
     patch_decision_start,
     patch_fail,
     patch_success,
 )
-from app.schemas import NodeDetail
-from app.swarm.SwarmScheduler import SwarmScheduler
-from app.utils import (
-    classify_pod,
-    compute_node_slack,
-    diff_timestamps,
-    get_pod_requested_resources,
-)
-
-try:
-    config.load_incluster_config()
-except config.config_exception.ConfigException:
+from app.demand import demand_cache
+from app.k8s import clients
+from app.ledger import SlackLedger
+from app.metrics import COMMIT_CONFLICTS, DECISION_FALLBACKS, start_metrics_server
+from app.pending import FAILED, SCHEDULED, UNSCHEDULABLE, PendingQueue
+from app.schemas import NodeDetail, NodeResources
+from app.state import SchedulerState
+from app.swarm.snapshot import ClusterSnapshot, grown
+from app.swarm.SwarmScheduler import SwarmScheduler, Unschedulable
+from app.swarm.Worker import NodeGenerations
+from app.utils import compute_node_slack, diff_timestamps, is_active, iter_pods_in_k8s
+from app.wam import wam
+
+# warm state kept across restarts, opened by start_scheduler if STATE_FILE is set
+state: SchedulerState | None = None
+# generation numbers of the node snapshots, see SwarmScheduler.set_workers
+generations = NodeGenerations()
+# elastic pods charged to the slack of their host rigid pods while they run
+ledger = SlackLedger(generations)
+# node -> slack of its rigid pods, as last fetched, see get_node_details
+last_slack: dict[str, Optional[dict[str, NodeResources]]] = {}
+# pods waiting for a decision, taken by the schedule_pending threads
+pending = PendingQueue()
+# set when a pod ends or a reservation is dropped, for requeue_unschedulable to
+# look at the nodes right away
+cluster_changed = threading.Event()
+# snapshots that pods were found unschedulable on since requeue_unschedulable
+# last looked, by version
+parked_on: dict[int, ClusterSnapshot] = {}
+parked_on_lock = threading.Lock()
+# pods sent to bind, charged to their node until the cluster shows them
+assumed = AssumeCache(on_release=cluster_changed.set, generations=generations)
+# gathers the nodes and parameters of decisions, see gather_snapshot
+gatherers = ThreadPoolExecutor(DECISION_THREADS, thread_name_prefix="gather")
+# the gathering in flight, by whether it fetches what elastic pods need, and the
+# number of decisions waiting on each, see join_gathering
+gathering: dict[bool, Future[ClusterSnapshot]] = {}
+gathering_waiters: dict[Future[ClusterSnapshot], int] = {}
+gathering_lock = threading.Lock()
+
+
+def on_bind_done(pod: Any, retries: int, bind: "Future[None]") -> None:
+    """Mark the pod as failed if its asynchronous bind did not succeed."""
+    error = bind.exception()
+    if error is None:
+        return
+    assumed.forget(pod.metadata.uid)
+    ledger.release(pod.metadata.uid)
+    pending.backoff(pod)
+    logger.warning(
+        f"Binding failed for pod {pod.metadata.name}. {error} - Marking as failed."
+    )
     try:
-        config.load_kube_config()
-    except config.config_exception.ConfigException:
-        logger.error("No Kubernetes config found — running without cluster access")
-
-
-def send_scheduling_request(pod, node_name, id=1):
-    """Send the scheduling request to the external service."""
-    payload = {
-        "method": "action.Bind",
-        "params": [
-            {
-                "pod": {
-                    "namespace": pod.metadata.namespace,
-                    "name": pod.metadata.name,
-                },
-                "node": {"name": node_name},
-            }
-        ],
-        "id": str(id),
-    }
-
-    logger.debug(f"Payload:\n{json.dumps(payload, indent=2)}")
-
-    response = requests.post(WAM_URL, json=payload)
-    if response.status_code == 200:
-        logger.info(f"Successfully scheduled Pod {pod.metadata.name} on {node_name}")
-    else:
-        logger.error(
-            f"Failed to schedule Pod {pod.metadata.name}: "
-            f"{response.status_code} - {response.text}"
+        clients.core_v1().patch_namespaced_pod(
+            pod.metadata.name, pod.metadata.namespace, patch_fail(retries + 1)
         )
-        raise Exception(
-            f"Failed to schedule Pod {pod.metadata.name}: "
-            f"{response.status_code} - {response.text}"
+    except Exception:
+        logger.exception(
+            f"Failed to patch pod {pod.metadata.name} with failure status."
         )
 
 
@@ -120,32 +140,35 @@ def send_workload_request_decision(
             pod_parent_details["pod_parent_name"] = pod_parent["name"]
             pod_parent_details["pod_parent_kind"] = pod_parent["kind"]
 
-        demands = get_pod_requested_resources(pod)
+        demand = demand_cache.get(pod)
 
         response = requests.post(
             f"{ORCHESTRATION_API_URL}/workload_request_decision",
-            json={
-                "is_elastic": classify_pod(pod) == "elastic",
-                "queue_name": "",  # TODO find out what this could be
-                "demand_cpu": demands["cpu"],
-                "demand_memory": demands["memory"],
-                "demand_slack_cpu": 0,
-                "demand_slack_memory": 0,
-                "pod_id": pod.metadata.uid,
-                "pod_name": pod.metadata.name,
-                "namespace": pod.metadata.namespace,
-                "node_id": node.id,
-                "node_name": node.name,
-                "action_type": "bind",
-                "decision_status": "pending",
-                "pod_parent_id": pod_parent_details["pod_parent_id"],
-                "pod_parent_name": pod_parent_details["pod_parent_name"],
-                "pod_parent_kind": pod_parent_details["pod_parent_kind"].lower(),
-                "decision_start_time": decision_start_time,
-                "decision_end_time": decision_end_time,
-                # "created_at": "2025-09-22T17:44:50.831257Z",
-                # "deleted_at": "2025-09-23T08:38:53.751Z"
-            },
+            headers=fastjson.HEADERS,
+            data=fastjson.dumps(
+                {
+                    "is_elastic": demand.pod_class == "elastic",
+                    "queue_name": "",  # TODO find out what this could be
+                    "demand_cpu": demand.cpu,
+                    "demand_memory": demand.memory,
+                    "demand_slack_cpu": 0,
+                    "demand_slack_memory": 0,
+                    "pod_id": pod.metadata.uid,
+                    "pod_name": pod.metadata.name,
+                    "namespace": pod.metadata.namespace,
+                    "node_id": node.id,
+                    "node_name": node.name,
+                    "action_type": "bind",
+                    "decision_status": "pending",
+                    "pod_parent_id": pod_parent_details["pod_parent_id"],
+                    "pod_parent_name": pod_parent_details["pod_parent_name"],
+                    "pod_parent_kind": pod_parent_details["pod_parent_kind"].lower(),
+                    "decision_start_time": decision_start_time,
+                    "decision_end_time": decision_end_time,
+                    # "created_at": "2025-09-22T17:44:50.831257Z",
+                    # "deleted_at": "2025-09-23T08:38:53.751Z"
+                }
+            ),
         )
         if response.status_code == 200:
             logger.info(
@@ -158,37 +181,138 @@ def send_workload_request_decision(
 
 
 def get_node_details(get_slack: bool) -> dict[str, NodeDetail]:
+    """
+    The nodes, with the slack of their rigid pods if `get_slack`; otherwise
+    with the slack last fetched, so that a snapshot published for a rigid
+    decision doesn't wipe out the slack that elastic decisions need.
+    """
+    global last_slack
+    if state is not None and not state.reconciled.is_set():
+        logger.debug("Using the warm node snapshot until it is reconciled.")
+        nodes = state.load_nodes()
+    else:
+        nodes = fetch_node_details(get_slack)
+    if get_slack:
+        last_slack = {name: node.slack for name, node in nodes.items()}
+    else:
+        for name, node in nodes.items():
+            if node.slack is None:
+                node.slack = last_slack.get(name)
+    generations.stamp(nodes)
+    return nodes
+
+
+def fetch_node_details(get_slack: bool) -> dict[str, NodeDetail]:
     try:
-        response = requests.get(f"{ORCHESTRATION_API_URL}/k8s_node")
-        if response.status_code == 200:
+        nodes = orchestration.client.get("/k8s_node")
+        if nodes is not None:
             node_details = {}
             slack_per_node = compute_node_slack() if get_slack else None
 
-            for node in response.json():
+            for node in nodes:
                 node_detail = node.copy()
                 if slack_per_node:
                     node_detail["slack"] = slack_per_node.get(node["name"])
 
-                node_details[node["name"]] = NodeDetail.model_validate_json(
-                    json.dumps(node_detail)
-                )
+                node_details[node["name"]] = NodeDetail.model_validate(node_detail)
 
+            if state is not None:
+                state.save_nodes(node_details)
             return node_details
-        else:
-            logger.error(f"Status code {response.status_code}: {response.text}")
     except Exception:
         logger.exception("Failed to get node details.")
 
     return {}
 
 
+def join_gathering(
+    elastic: bool, gather: Callable[[], ClusterSnapshot]
+) -> Future[ClusterSnapshot]:
+    """
+    The gathering in flight that serves a decision on an elastic pod or not,
+    or a new one running `gather`. Rigid pods are served by either. Every
+    future returned must be handed back to `leave_gathering`.
+    """
+    with gathering_lock:
+        future = gathering.get(elastic)
+        if future is None or future.done():
+            future = None if elastic else gathering.get(True)
+        if future is None or future.done():
+            future = gatherers.submit(gather)
+            gathering[elastic] = future
+        gathering_waiters[future] = gathering_waiters.get(future, 0) + 1
+        return future
+
+
+def leave_gathering(future: Future[ClusterSnapshot]) -> None:
+    """Stop waiting on `future`, dropping it if it's still queued for nobody."""
+    with gathering_lock:
+        gathering_waiters[future] -= 1
+        if not gathering_waiters[future]:
+            del gathering_waiters[future]
+            future.cancel()
+
+
+def gather_snapshot(
+    pod: Any,
+    swarm_model: SwarmScheduler,
+    deadline: float = DECISION_DEADLINE_SECONDS,
+) -> ClusterSnapshot:
+    """
+    Snapshot to decide on `pod` against: the nodes, and for elastic pods the
+    parameters, fetched and published within `deadline` seconds. If that takes
+    longer, the last published snapshot is used instead, if it has what the
+    pod needs (slack, and parameters for SWARM, for elastic pods), and the
+    gathering goes on in the background, so that waiting for data never delays
+    a decision by more than `deadline`. Decisions share the gathering in
+    flight, see `join_gathering`.
+    """
+    elastic = demand_cache.get(pod).pod_class == "elastic"
+    with_params = elastic and swarm_model.method == "SWARM"
+
+    def gather() -> ClusterSnapshot:
+        nodes = get_node_details(elastic)
+        if not nodes:
+            logger.info("No available nodes to schedule the Pod.")
+            raise Exception("No available nodes to schedule the Pod.")
+        if with_params:
+            swarm_model.set_parameters()
+        return swarm_model.set_workers(nodes)
+
+    if not deadline:
+        return gather()
+    future = join_gathering(elastic, gather)
+    try:
+        return future.result(timeout=deadline)
+    except TimeoutError:
+        snapshot = swarm_model.snapshot
+        if (
+            not snapshot.workers
+            or (elastic and all(w.details.slack is None for w in snapshot.workers))
+            or (with_params and not snapshot.params)
+        ):
+            DECISION_FALLBACKS.labels(fallback="none").inc()
+            raise Exception(
+                f"No nodes gathered within {deadline}s and no snapshot to fall back to."
+            )
+        DECISION_FALLBACKS.labels(fallback="snapshot").inc()
+        logger.warning(
+            f"No nodes gathered within {deadline}s, deciding on pod "
+            f"{pod.metadata.name} with snapshot {snapshot.version}."
+        )
+        return snapshot
+    finally:
+        leave_gathering(future)
+
+
 def perform_scheduling(
     pod: Any, swarm_model: SwarmScheduler, decision_start_time: str | None = None
-) -> None:
+) -> str:
     """
-    Custom scheduling logic
+    Custom scheduling logic. Returns SCHEDULED, UNSCHEDULABLE if no node can
+    host the pod, or FAILED if no decision could be made for another reason.
     """
-    v1 = client.CoreV1Api()
+    v1 = clients.core_v1()
     annotations = pod.metadata.annotations or {}
 
     start_time_annot = annotations.get(ANNOT_DECISION_START_TIME)
@@ -196,10 +320,14 @@ def perform_scheduling(
     success = annotations.get(ANNOT_SCHEDULING_SUCCESS) == "true"
 
     logger.debug(
-        f"Annotations for pod {pod.metadata.name}:\n"
-        f"\t{ANNOT_DECISION_START_TIME}: {start_time_annot}\n"
-        f"\t{ANNOT_SCHEDULING_ATTEMPTED}: {attempted}\n"
-        f"\t{ANNOT_SCHEDULING_SUCCESS}: {success}"
+        "Annotations for pod {}:\n\t{}: {}\n\t{}: {}\n\t{}: {}",
+        pod.metadata.name,
+        ANNOT_DECISION_START_TIME,
+        start_time_annot,
+        ANNOT_SCHEDULING_ATTEMPTED,
+        attempted,
+        ANNOT_SCHEDULING_SUCCESS,
+        success,
     )
 
     if start_time_annot:
@@ -211,7 +339,7 @@ def perform_scheduling(
                     f"There was a scheduling attempt for pod {pod.metadata.name}"
                     ", but 'decision_start_time' doesn't exist."
                 )
-                return
+                return FAILED
             decision_start_time = get_timestamp()
         try:
             v1.patch_namespaced_pod(
@@ -223,13 +351,15 @@ def perform_scheduling(
             logger.warning(
                 f"Failed to patch pod {pod.metadata.name} with decision start time."
             )
-    logger.debug(f"Scheduling pod {pod.metadata.name} started at {decision_start_time}")
+    logger.debug(
+        "Scheduling pod {} started at {}", pod.metadata.name, decision_start_time
+    )
 
     if attempted and success:
         logger.debug(
-            f"Pod {pod.metadata.name} already successfully scheduled. Skipping."
+            "Pod {} already successfully scheduled. Skipping.", pod.metadata.name
         )
-        return
+        return SCHEDULED
 
     retries = int(annotations.get(ANNOT_RETRIES, "0"))
     # if retries >= 3:
@@ -240,26 +370,43 @@ def perform_scheduling(
 
     logger.info(f"Scheduling Pod {pod.metadata.name} (retry={retries})")
 
+    outcome = FAILED
     try:
-        nodes = get_node_details(classify_pod(pod) == "elastic")
-        if not nodes:
-            logger.info("No available nodes to schedule the Pod.")
-            raise Exception("No available nodes to schedule the Pod.")
-
-        swarm_model.set_workers(nodes)
-        selected_node = swarm_model.select_node(pod)
+        snapshot = gather_snapshot(pod, swarm_model)
+        try:
+            selected_node = swarm_model.select_node(
+                pod, snapshot=snapshot, refresh_parameters=False
+            )
+        except Unschedulable:
+            outcome = UNSCHEDULABLE
+            note_parked_on(snapshot)
+            raise
         if selected_node is None:
+            outcome = UNSCHEDULABLE
+            note_parked_on(snapshot)
             raise Exception(f"Couldn't select a node for pod '{pod.metadata.name}'")
+        if not swarm_model.commit(pod, selected_node):
+            COMMIT_CONFLICTS.inc()
+            raise Exception(
+                f"Node '{selected_node}' can no longer host pod '{pod.metadata.name}'"
+            )
 
         send_workload_request_decision(
-            pod, nodes[selected_node], decision_start_time, get_timestamp()
+            pod,
+            snapshot.workers_by_name[selected_node].details,
+            decision_start_time,
+            get_timestamp(),
         )
         v1.patch_namespaced_pod(
             pod.metadata.name, pod.metadata.namespace, patch_success()
         )
 
-        send_scheduling_request(pod, selected_node)
+        bind = wam.bind_async(pod, selected_node)
+        bind.add_done_callback(lambda done: on_bind_done(pod, retries, done))
+        return SCHEDULED
     except Exception as e:
+        assumed.forget(pod.metadata.uid)
+        ledger.release(pod.metadata.uid)
         logger.warning(
             f"Scheduling failed for pod {pod.metadata.name}. {e} - Marking as failed."
         )
@@ -271,13 +418,158 @@ def perform_scheduling(
             logger.exception(
                 f"Failed to patch pod {pod.metadata.name} with failure status."
             )
+        return outcome
+
+
+def schedule_pending(swarm_model: SwarmScheduler) -> None:
+    """
+    Decide on queued pods until the process ends, parking those that fit
+    nowhere until the cluster grows and backing off those that fail otherwise.
+    BINPACK places all the pods ready at once, up to BINPACK_BATCH_SIZE, jointly.
+    """
+    batch_size = BINPACK_BATCH_SIZE if swarm_model.method == "BINPACK" else 1
+    while True:
+        batch = pending.pop_batch(batch_size)
+        if len(batch) > 1:
+            pods = [entry.pod for entry in batch]
+            try:
+                # planned on fresh nodes, with slack if any pod may use it
+                elastic = [
+                    pod for pod in pods if demand_cache.get(pod).pod_class == "elastic"
+                ]
+                snapshot = gather_snapshot((elastic or pods)[0], swarm_model)
+                swarm_model.plan(pods, snapshot)
+            except Exception:
+                # e.g. a pod whose resources can't be parsed, decided on alone
+                logger.exception("Planning a batch failed, deciding pod by pod.")
+        for entry in batch:
+            pod = entry.pod
+            try:
+                outcome = perform_scheduling(
+                    pod, swarm_model, entry.decision_start_time
+                )
+            except Exception:
+                logger.exception(f"Scheduling crashed for pod {pod.metadata.name}.")
+                outcome = FAILED
+            if outcome == SCHEDULED:
+                pending.done(pod.metadata.uid)
+            elif outcome == UNSCHEDULABLE:
+                pending.park(
+                    pod,
+                    demand_cache.get(pod).demand_class,
+                    entry.decision_start_time,
+                    entry.wakes,
+                )
+            else:
+                pending.backoff(pod, entry.decision_start_time)
+
+
+def note_parked_on(snapshot: ClusterSnapshot) -> None:
+    """A pod fits nowhere in `snapshot`, see requeue_unschedulable."""
+    with parked_on_lock:
+        parked_on[snapshot.version] = snapshot
+
+
+def wake_unschedulable(before: ClusterSnapshot, after: ClusterSnapshot) -> int:
+    """
+    Requeue the parked pods that the nodes added, the resources freed or the
+    slack grown from `before` to `after` could host.
+    """
+    free, slack = grown(before, after)
+    if not free and not slack:
+        return 0
+
+    def fits(demand_class: Any) -> bool:
+        pod_class, demand = demand_class
+        # elastic pods that find no slack may be placed as rigid
+        vectors = free if pod_class == "rigid" else free + slack
+        return any(all(d <= v for d, v in zip(demand, vector)) for vector in vectors)
+
+    return pending.wake(fits)
+
+
+def requeue_unschedulable(swarm_model: SwarmScheduler) -> None:
+    """
+    While pods are parked or being decided on, look at the nodes every
+    RETRY_EVERY_SECONDS, or right away when a pod ends or a reservation is
+    dropped, and requeue the parked pods that the cluster can host now. The
+    nodes are compared with the last look and with every snapshot a pod was
+    found unschedulable on since, so that resources taken and freed again
+    between two looks still wake the pods.
+    """
+    last: Optional[ClusterSnapshot] = None
+    while True:
+        cluster_changed.wait(RETRY_EVERY_SECONDS)
+        cluster_changed.clear()
+        if not pending.unschedulable() and not pending.in_flight():
+            last = None
+            continue
+        try:
+            last = look_at_nodes(swarm_model, last)
+        except Exception:
+            logger.exception("Failed to requeue unschedulable pods.")
+
+
+def look_at_nodes(
+    swarm_model: SwarmScheduler, last: Optional[ClusterSnapshot]
+) -> Optional[ClusterSnapshot]:
+    """One look of requeue_unschedulable after `last`, returns the new last."""
+    nodes = get_node_details(get_slack=True)
+    if not nodes:
+        return last
+    snapshot = swarm_model.set_workers(nodes)
+    with parked_on_lock:
+        before = list(parked_on.values())
+        parked_on.clear()
+    if last is not None:
+        before.append(last)
+    for previous in before:
+        wake_unschedulable(previous, snapshot)
+    return snapshot
+
+
+def reconcile_ledger() -> None:
+    """Release the restored slack charges of the pods that no longer run."""
+    running = {pod["uid"] for pod in iter_pods_in_k8s(is_active)}
+    if None in running:
+        logger.warning("Pods without uid, keeping the restored slack charges.")
+        return
+    ledger.retain(running)
+
+
+def reconcile_state() -> None:
+    """Replace the warm snapshot with a fresh one, retrying until it succeeds."""
+    assert state is not None
+    while not fetch_node_details(get_slack=True):
+        time.sleep(RETRY_EVERY_SECONDS)
+    try:
+        reconcile_ledger()
+    except Exception:
+        logger.exception("Failed to reconcile the slack charges.")
+    state.reconciled.set()
+    logger.info("Warm state reconciled with the cluster.")
 
 
 def start_scheduler():
-    v1 = client.CoreV1Api()
+    global state
+
+    v1 = clients.core_v1()
     w = watch.Watch()
 
-    swarm_model = SwarmScheduler()
+    if STATE_FILE:
+        state = SchedulerState.open(STATE_FILE)
+        if state.has_nodes():
+            logger.info(f"Serving decisions from the warm state in {STATE_FILE}.")
+            threading.Thread(target=reconcile_state, daemon=True).start()
+        else:
+            state.reconciled.set()
+        assumed.attach(state)
+        ledger.attach(state)
+
+    swarm_model = SwarmScheduler(
+        method=SCHEDULING_METHOD, reservations=assumed, ledger=ledger
+    )
+    start_metrics_server()
 
     def retry_unscheduled():
         while True:
@@ -286,31 +578,79 @@ def start_scheduler():
                     field_selector="spec.schedulerName=resource-management-service"
                 ).items
                 for pod in pods:
-                    if not pod.spec.node_name and pod.status.phase == "Pending":
+                    if (
+                        not pod.spec.node_name
+                        and pod.status.phase == "Pending"
+                        and pending.add(pod)
+                    ):
                         logger.info(
                             f"[RETRY] Unscheduled pod found: {pod.metadata.name}"
                         )
-                        perform_scheduling(pod, swarm_model)
             except Exception:
                 logger.exception("[RETRY] Error during retry logic.")
             time.sleep(RETRY_EVERY_SECONDS)
 
     threading.Thread(target=retry_unscheduled, daemon=True).start()
+    threading.Thread(
+        target=requeue_unschedulable, args=(swarm_model,), daemon=True
+    ).start()
+    for _ in range(DECISION_THREADS):
+        threading.Thread(
+            target=schedule_pending, args=(swarm_model,), daemon=True
+        ).start()
 
     logger.info("Starting custom scheduler...")
 
+    # resume the watch where the previous run stopped
+    resource_version = state.resource_version if state is not None else None
+    saved_at = time.monotonic()
     try:
-        for event in w.stream(v1.list_pod_for_all_namespaces):
-            pod = event["object"]
-            if (
-                event["type"] == "ADDED"
-                and pod.spec.scheduler_name == "resource-management-service"
-                and not pod.spec.node_name
-            ):
-                logger.info(f"Found Pod to schedule: {pod.metadata.name}")
-                perform_scheduling(pod, swarm_model, get_timestamp())
-    except Exception:
-        logger.exception("Scheduler crashed.")
+        while True:
+            kwargs = {"resource_version": resource_version} if resource_version else {}
+            try:
+                for event in w.stream(v1.list_pod_for_all_namespaces, **kwargs):
+                    pod = event["object"]
+                    if (
+                        event["type"] == "ADDED"
+                        and pod.spec.scheduler_name == "resource-management-service"
+                        and not pod.spec.node_name
+                    ):
+                        logger.info(f"Found Pod to schedule: {pod.metadata.name}")
+                        pending.add(pod, get_timestamp())
+                    elif event["type"] == "DELETED":
+                        assumed.forget(pod.metadata.uid)
+                        ledger.release(pod.metadata.uid)
+                        pending.remove(pod.metadata.uid)
+                        if pod.spec.node_name:
+                            cluster_changed.set()
+                    elif pod.spec.node_name:
+                        pending.remove(pod.metadata.uid)
+                        if pod.status.phase != "Pending":
+                            assumed.confirm(pod.metadata.uid)
+                        if pod.status.phase in ("Succeeded", "Failed"):
+                            ledger.release(pod.metadata.uid)
+                            cluster_changed.set()
+                    if state is not None:
+                        resource_version = pod.metadata.resource_version
+                        # a write per event would cost more than replaying a
+                        # second of events after a restart
+                        if time.monotonic() - saved_at >= RESOURCE_VERSION_SAVE_SECONDS:
+                            state.resource_version = resource_version
+                            saved_at = time.monotonic()
+            except ApiException as e:
+                if e.status == 410 and resource_version:
+                    logger.warning("Stored resourceVersion expired, watching from now.")
+                    resource_version = None
+                    if state is not None:
+                        state.resource_version = None
+                    continue
+                logger.exception("Scheduler crashed.")
+            except Exception:
+                logger.exception("Scheduler crashed.")
+            return
+    finally:
+        if state is not None and resource_version:
+            state.resource_version = resource_version
 
 
 if __name__ == "__main__":
@@ -1,7 +1,23 @@
-from typing import Optional
+from typing import Any, Optional, Sequence
 
-from kubernetes.utils.quantity import parse_quantity
-from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic import BaseModel, ConfigDict, ValidationInfo, field_validator
+
+from app.quantity import parse_quantity
+
+
+def is_byte_resource(name: str) -> bool:
+    return name in ("memory", "ephemeral-storage") or name.startswith("hugepages-")
+
+
+def resource_value(name: str, quantity: Any) -> float:
+    """
+    Quantity of resource `name` in the scheduler's unit: MiB for memory-like
+    resources, the plain amount otherwise. Numbers are taken as already converted.
+    """
+    if isinstance(quantity, (int, float)):
+        return float(quantity)
+    value = parse_quantity(quantity)
+    return value / (1024**2) if is_byte_resource(name) else value
 
 
 class NodeResources(BaseModel):
@@ -16,18 +32,34 @@ class NodeResources(BaseModel):
         """Convert CPU usage string to cores."""
         if isinstance(cpu_usage, (int, float)):
             return float(cpu_usage)
-        return float(parse_quantity(cpu_usage))
+        return parse_quantity(cpu_usage)
 
     @field_validator("memory", mode="before")
     @classmethod
-    def convert_memory_usage(cls, memory_usage):
-        """Convert memory usage string to mebibytes."""
+    def convert_memory_usage(cls, memory_usage: Any, info: ValidationInfo) -> float:
+        """Convert memory usage string to mebibytes.
+
+        Plain numbers are bytes, unless validated with the context
+        `{"memory_in_mib": True}` (e.g. when reloading a dumped model).
+        """
         if isinstance(memory_usage, (int, float)):
             value = float(memory_usage)
+            if info.context and info.context.get("memory_in_mib"):
+                return value
         else:
-            value = float(parse_quantity(memory_usage))
+            value = parse_quantity(memory_usage)
         return value / (1024**2)  # bytes -> MiB
 
+    def vector(self, names: Sequence[str]) -> tuple[float, ...]:
+        """Values of the resources `names`, 0 for those that aren't reported."""
+        extra = self.model_extra or {}
+        return tuple(
+            getattr(self, name)
+            if name in ("cpu", "memory")
+            else resource_value(name, extra.get(name, 0))
+            for name in names
+        )
+
 
 class NodeDetail(BaseModel):
     name: str
@@ -39,4 +71,7 @@ class NodeDetail(BaseModel):
 
     slack: Optional[dict[str, NodeResources]] = None
 
+    # changes whenever the node's resources or slack change, None if unknown
+    generation: Optional[int] = None
+
     model_config = ConfigDict(extra="allow")
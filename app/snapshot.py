@@ -0,0 +1,120 @@
+from typing import Iterator, Optional
+
+import os
+import threading
+from enum import Enum
+
+from classy_fastapi import Routable, get
+from fastapi import Header, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+
+from app import fastjson
+from app.consts import STATE_FILE
+from app.state import SchedulerState, StateStore
+
+TAGS: list[str | Enum] = ["snapshot"]
+
+NDJSON = "application/x-ndjson"
+
+
+class SnapshotRoutes(Routable):
+    """
+    Read-only view of the scheduler's cached node/slack snapshot, streamed from
+    the state file that the scheduler process writes (see `app.state`).
+    """
+
+    def __init__(self, state_file: str) -> None:
+        super().__init__()
+        self.__state_file = state_file
+        self.__store: Optional[StateStore] = None
+        self.__lock = threading.Lock()
+
+    def _store(self) -> StateStore:
+        with self.__lock:
+            if self.__store is None:
+                if not self.__state_file or not os.path.exists(self.__state_file):
+                    raise HTTPException(
+                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        detail="No snapshot available",
+                    )
+                self.__store = StateStore(self.__state_file, readonly=True)
+            else:
+                self.__store.refresh()
+            return self.__store
+
+    @get(
+        "/snapshot/",
+        operation_id="snapshot__read",
+        summary="Stream the node snapshot as NDJSON",
+        response_class=StreamingResponse,
+        responses={
+            200: {"content": {NDJSON: {}}},
+            304: {"description": "Not modified since the given ETag"},
+        },
+        tags=TAGS,
+    )
+    async def read_snapshot(
+        self,
+        since: Optional[int] = None,
+        if_none_match: Optional[str] = Header(default=None),
+    ) -> Response:
+        """
+        One JSON object per line and node: `{"name", "generation", "node",
+        "slack"}`. With `since`, only nodes changed after that generation are
+        sent, plus `{"name", "generation", "deleted": true}` for removed nodes;
+        if the deletions are no longer known a full snapshot is sent instead
+        (`X-Snapshot-Full: true`). The generation of the snapshot, the last
+        change to a node or slack table, is its ETag.
+        """
+        store = self._store()
+        generation = store.last_seq(SchedulerState.NODE, SchedulerState.SLACK)
+        etag = f'"{generation}"'
+        headers = {"ETag": etag, "X-Snapshot-Generation": str(generation)}
+        if if_none_match is not None and etag in (
+            tag.strip() for tag in if_none_match.split(",")
+        ):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        full = since is None or since < store.compacted_seq
+        headers["X-Snapshot-Full"] = "true" if full else "false"
+        return StreamingResponse(
+            self._lines(store, 0 if full else since or 0, generation),
+            media_type=NDJSON,
+            headers=headers,
+        )
+
+    @staticmethod
+    def _lines(store: StateStore, since: int, generation: int) -> Iterator[bytes]:
+        """Build each line from the stored JSON, without decoding it."""
+        node_prefix, slack_prefix = SchedulerState.NODE, SchedulerState.SLACK
+        for key in store.keys(node_prefix):
+            name = key[len(node_prefix) :]
+            node_seq = store.seq_of(key) or 0
+            slack_seq = store.seq_of(slack_prefix + name) or 0
+            node_generation = max(node_seq, slack_seq)
+            if node_generation <= since or node_generation > generation:
+                continue
+            node = store.get_encoded(key)
+            if node is None:
+                continue
+            slack = store.get_encoded(slack_prefix + name) or b"null"
+            yield b"".join(
+                (
+                    b'{"name":',
+                    fastjson.dumps(name),
+                    b',"generation":',
+                    str(node_generation).encode(),
+                    b',"node":',
+                    node,
+                    b',"slack":',
+                    slack,
+                    b"}\n",
+                )
+            )
+        if since:
+            for key, seq in store.deleted(node_prefix, since):
+                line = {"name": key[len(node_prefix) :], "generation": seq}
+                yield fastjson.dumps({**line, "deleted": True}) + b"\n"
+
+
+routes = SnapshotRoutes(STATE_FILE)
@@ -0,0 +1,418 @@
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+import mmap
+import os
+import struct
+import threading
+
+from loguru import logger
+
+from app import fastjson
+
+if TYPE_CHECKING:
+    # imported lazily, the webserver only reads raw records (see app.snapshot)
+    from app.schemas import NodeDetail
+
+MAGIC = b"RMSSTATE"
+VERSION = 1
+# magic, version, end of the last committed record, last sequence number,
+# sequence number of the last compaction (older deletions are forgotten)
+HEADER = struct.Struct("<8sIQQQ")
+# key length, value length (TOMBSTONE for deletions), sequence number
+RECORD = struct.Struct("<IIQ")
+TOMBSTONE = 0xFFFFFFFF
+
+
+class StateStore:
+    """
+    Key-value store with the `Storage` interface, kept in a memory-mapped,
+    append-only file so that it survives restarts of the process.
+
+    Every `set`/`delete` appends a record and then commits it by moving the end
+    offset in the header; a record cut short by a crash is never committed.
+    Values are JSON and are only decoded on read. When the file is full it is
+    grown, or compacted into a fresh file if most of it is overwritten records.
+
+    Other processes may open the same file read-only and call `refresh` to pick
+    up new records.
+    """
+
+    def __init__(
+        self, path: str, initial_size: int = 1 << 20, readonly: bool = False
+    ) -> None:
+        self.path = path
+        self.initial_size = initial_size
+        self.readonly = readonly
+        self.seq = 0
+        self.compacted_seq = 0
+        self._lock = threading.RLock()
+        # key -> (offset of the value, value length, sequence number)
+        self._index: dict[str, tuple[int, int, int]] = {}
+        # key -> sequence number of its deletion
+        self._tombstones: dict[str, int] = {}
+        self._dead = 0
+        self._open()
+
+    def _open(self) -> None:
+        if not self.readonly and (
+            not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        ):
+            self._create(self.path, self.initial_size)
+
+        self._file = open(self.path, "rb" if self.readonly else "r+b")
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._map(os.fstat(self._file.fileno()).st_size)
+        magic, version, *_ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"'{self.path}' is not a state file of version {VERSION}")
+        self._index = {}
+        self._tombstones = {}
+        self._dead = 0
+        self._end = HEADER.size
+        self._scan()
+
+    @staticmethod
+    def _create(path: str, size: int) -> None:
+        with open(path, "wb") as f:
+            f.truncate(size)
+            f.write(HEADER.pack(MAGIC, VERSION, HEADER.size, 0, 0))
+
+    def _map(self, size: int) -> None:
+        access = mmap.ACCESS_READ if self.readonly else mmap.ACCESS_WRITE
+        self._mm = mmap.mmap(self._file.fileno(), size, access=access)
+        self._size = size
+
+    def _scan(self) -> None:
+        """Index the records committed after the ones already indexed."""
+        _, _, end, seq, compacted_seq = HEADER.unpack_from(self._mm, 0)
+        if end > self._size:
+            self._mm.close()
+            self._map(os.fstat(self._file.fileno()).st_size)
+        offset = self._end
+        while offset < end:
+            key_len, value_len, record_seq = RECORD.unpack_from(self._mm, offset)
+            key_start = offset + RECORD.size
+            key = self._mm[key_start : key_start + key_len].decode()
+            value_start = key_start + key_len
+            if key in self._index:
+                self._dead += 1
+            if value_len == TOMBSTONE:
+                self._index.pop(key, None)
+                self._tombstones[key] = record_seq
+                offset = value_start
+            else:
+                self._index[key] = (value_start, value_len, record_seq)
+                self._tombstones.pop(key, None)
+                offset = value_start + value_len
+        self._end = end
+        self.seq = seq
+        self.compacted_seq = compacted_seq
+
+    def refresh(self) -> None:
+        """Pick up records written by another process since the last read."""
+        with self._lock:
+            try:
+                inode = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                return
+            if inode != self._inode:
+                # the writer compacted the store into a new file
+                self._close()
+                self._open()
+            else:
+                self._scan()
+
+    def _append(self, key: str, value: Optional[bytes]) -> None:
+        if self.readonly:
+            raise PermissionError(f"State store '{self.path}' is read-only")
+        encoded_key = key.encode()
+        value_len = TOMBSTONE if value is None else len(value)
+        size = RECORD.size + len(encoded_key) + (len(value) if value else 0)
+        if self._end + size > self._size:
+            self._make_room(size)
+
+        self.seq += 1
+        offset = self._end
+        RECORD.pack_into(self._mm, offset, len(encoded_key), value_len, self.seq)
+        key_start = offset + RECORD.size
+        self._mm[key_start : key_start + len(encoded_key)] = encoded_key
+        value_start = key_start + len(encoded_key)
+        if value is not None:
+            self._mm[value_start : value_start + len(value)] = value
+
+        if key in self._index:
+            self._dead += 1
+        if value is None:
+            self._index.pop(key, None)
+            self._tombstones[key] = self.seq
+        else:
+            self._index[key] = (value_start, len(value), self.seq)
+            self._tombstones.pop(key, None)
+        self._end = offset + size
+        # commit
+        HEADER.pack_into(
+            self._mm, 0, MAGIC, VERSION, self._end, self.seq, self.compacted_seq
+        )
+
+    def _make_room(self, size: int) -> None:
+        if self._dead > len(self._index):
+            self.compact()
+        if self._end + size > self._size:
+            new_size = max(self._size * 2, self._end + size)
+            self._mm.close()
+            self._file.truncate(new_size)
+            self._map(new_size)
+
+    def compact(self) -> None:
+        """Rewrite the live records into a new file and swap it in atomically."""
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            live = [(key, self._read(key), self._index[key][2]) for key in self._index]
+            size = HEADER.size + sum(
+                RECORD.size + len(key.encode()) + len(value) for key, value, _ in live
+            )
+            self._create(tmp_path, max(self.initial_size, size * 2))
+            with open(tmp_path, "r+b") as f:
+                mm = mmap.mmap(f.fileno(), 0)
+                offset = HEADER.size
+                for key, value, record_seq in live:
+                    encoded_key = key.encode()
+                    RECORD.pack_into(
+                        mm, offset, len(encoded_key), len(value), record_seq
+                    )
+                    offset += RECORD.size
+                    mm[offset : offset + len(encoded_key)] = encoded_key
+                    offset += len(encoded_key)
+                    mm[offset : offset + len(value)] = value
+                    offset += len(value)
+                HEADER.pack_into(mm, 0, MAGIC, VERSION, offset, self.seq, self.seq)
+                mm.flush()
+                mm.close()
+            os.replace(tmp_path, self.path)
+            self._close()
+            self._open()
+            logger.debug(f"Compacted state store '{self.path}' to {size} bytes.")
+
+    def _read(self, key: str) -> bytes:
+        offset, length, _ = self._index[key]
+        return self._mm[offset : offset + length]
+
+    def has(self, key: str) -> bool:
+        return key in self._index
+
+    def seq_of(self, key: str) -> Optional[int]:
+        """Sequence number of the record holding the current value of `key`."""
+        entry = self._index.get(key)
+        return entry[2] if entry is not None else None
+
+    def get_encoded(self, key: str) -> Optional[bytes]:
+        """The stored JSON of `key`, without decoding it."""
+        with self._lock:
+            if key not in self._index:
+                return None
+            return self._read(key)
+
+    def deleted(self, prefix: str = "", since: int = 0) -> list[tuple[str, int]]:
+        """
+        Keys with `prefix` deleted after sequence number `since`; only complete
+        for `since >= compacted_seq`.
+        """
+        with self._lock:
+            return [
+                (key, seq)
+                for key, seq in self._tombstones.items()
+                if seq > since and key.startswith(prefix)
+            ]
+
+    def last_seq(self, *prefixes: str) -> int:
+        """
+        Sequence number of the last change to the keys with any of `prefixes`,
+        or of the last compaction, which forgets deletions, if that's later.
+        """
+        with self._lock:
+            written = max(
+                (
+                    seq
+                    for key, (_, _, seq) in self._index.items()
+                    if key.startswith(prefixes)
+                ),
+                default=0,
+            )
+            deleted = max(
+                (
+                    seq
+                    for key, seq in self._tombstones.items()
+                    if key.startswith(prefixes)
+                ),
+                default=0,
+            )
+            return max(written, deleted, self.compacted_seq)
+
+    def set(self, key: str, value: Any) -> None:
+        self.set_encoded(key, fastjson.dumps(value))
+
+    def set_encoded(self, key: str, value: bytes) -> None:
+        """Store an already JSON-encoded value."""
+        with self._lock:
+            self._append(key, value)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            if key not in self._index:
+                return None
+            return fastjson.loads(self._read(key))
+
+    def all(self) -> list[Any]:
+        return [value for _, value in self.items()]
+
+    def items(self, prefix: str = "") -> Iterator[tuple[str, Any]]:
+        """Decode the values one at a time, optionally only for keys with `prefix`."""
+        for key in self.keys(prefix):
+            with self._lock:
+                if key not in self._index:
+                    continue
+                raw = self._read(key)
+            yield key, fastjson.loads(raw)
+
+    def keys(self, prefix: str = "") -> list[str]:
+        with self._lock:
+            return [key for key in self._index if key.startswith(prefix)]
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key not in self._index:
+                raise KeyError(key)
+            self._append(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._index):
+                self._append(key, None)
+            self.compact()
+
+    def flush(self) -> None:
+        self._mm.flush()
+
+    def _close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+    def close(self) -> None:
+        with self._lock:
+            if not self.readonly:
+                self.flush()
+            self._close()
+
+
+class SchedulerState:
+    """
+    Warm state of the scheduler kept in a `StateStore`: node snapshots
+    (including their slack tables), reservations, slack charges and the last
+    seen watch `resourceVersion`.
+    """
+
+    NODE = "node/"
+    SLACK = "slack/"
+    RESERVATION = "reservation/"
+    SLACK_CHARGE = "slack-charge/"
+    RESOURCE_VERSION = "meta/resourceVersion"
+
+    def __init__(self, store: StateStore) -> None:
+        self.store = store
+        # set once the warm snapshot was replaced by a fresh one
+        self.reconciled = threading.Event()
+        self._saved: dict[str, str] = {}
+
+    @classmethod
+    def open(cls, path: str, readonly: bool = False) -> "SchedulerState":
+        directory = os.path.dirname(path)
+        if directory and not readonly:
+            os.makedirs(directory, exist_ok=True)
+        return cls(StateStore(path, readonly=readonly))
+
+    def _save(self, key: str, encoded: str) -> None:
+        if self._saved.get(key) != encoded:
+            self.store.set_encoded(key, encoded.encode())
+            self._saved[key] = encoded
+
+    def _delete(self, key: str) -> None:
+        if self.store.has(key):
+            self.store.delete(key)
+        self._saved.pop(key, None)
+
+    def save_nodes(self, nodes: dict[str, "NodeDetail"]) -> None:
+        """
+        Store the snapshot, writing only what changed. A node's slack table is
+        kept from an earlier snapshot if this one was fetched without slack.
+        """
+        for name, node in nodes.items():
+            self._save(
+                self.NODE + name,
+                node.model_dump_json(exclude={"slack", "generation"}),
+            )
+            if node.slack is not None:
+                self._save(
+                    self.SLACK + name,
+                    fastjson.dumps(
+                        {k: v.model_dump() for k, v in node.slack.items()}
+                    ).decode(),
+                )
+        for key in self.store.keys(self.NODE):
+            name = key[len(self.NODE) :]
+            if name not in nodes:
+                self._delete(key)
+                self._delete(self.SLACK + name)
+
+    def load_nodes(self) -> dict[str, "NodeDetail"]:
+        from app.schemas import NodeDetail
+
+        nodes = {}
+        for key, value in self.store.items(self.NODE):
+            name = key[len(self.NODE) :]
+            value["slack"] = self.store.get(self.SLACK + name)
+            nodes[name] = NodeDetail.model_validate(
+                value, context={"memory_in_mib": True}
+            )
+        return nodes
+
+    def has_nodes(self) -> bool:
+        return bool(self.store.keys(self.NODE))
+
+    def set_reservation(self, pod_key: str, reservation: dict[str, Any]) -> None:
+        self.store.set(self.RESERVATION + pod_key, reservation)
+
+    def delete_reservation(self, pod_key: str) -> None:
+        if self.store.has(self.RESERVATION + pod_key):
+            self.store.delete(self.RESERVATION + pod_key)
+
+    def reservations(self) -> dict[str, Any]:
+        return {
+            key[len(self.RESERVATION) :]: value
+            for key, value in self.store.items(self.RESERVATION)
+        }
+
+    def set_slack_charge(self, pod_key: str, charge: dict[str, Any]) -> None:
+        self.store.set(self.SLACK_CHARGE + pod_key, charge)
+
+    def delete_slack_charge(self, pod_key: str) -> None:
+        if self.store.has(self.SLACK_CHARGE + pod_key):
+            self.store.delete(self.SLACK_CHARGE + pod_key)
+
+    def slack_charges(self) -> dict[str, Any]:
+        return {
+            key[len(self.SLACK_CHARGE) :]: value
+            for key, value in self.store.items(self.SLACK_CHARGE)
+        }
+
+    @property
+    def resource_version(self) -> Optional[str]:
+        value = self.store.get(self.RESOURCE_VERSION)
+        return str(value) if value is not None else None
+
+    @resource_version.setter
+    def resource_version(self, value: Optional[str]) -> None:
+        if value is None:
+            if self.store.has(self.RESOURCE_VERSION):
+                self.store.delete(self.RESOURCE_VERSION)
+        else:
+            self.store.set(self.RESOURCE_VERSION, value)
@@ -1,149 +1,560 @@
-from typing import Any
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Iterable, Mapping, Optional, Sequence
 
+import math
 import random
+import threading
 
+import numpy as np
 from loguru import logger
 
+from app.consts import (
+    BINPACK_SLACK,
+    NEIGHBOR_BUCKETS,
+    RESOURCES,
+    THRESHOLDS_REFRESH_SECONDS,
+    THRESHOLDS_SOURCE,
+)
+from app.demand import demand_cache
 from app.schemas import NodeDetail
+from app.swarm import binpack
+from app.swarm.buckets import (
+    BucketKey,
+    bucket_key,
+    bucket_keys,
+    key_label,
+    n_buckets,
+    neighbor_keys,
+)
+from app.swarm.feasibility import FeasibilityCache, elastic_fits, rigid_fits
+from app.swarm.snapshot import ClusterSnapshot, Entry
+from app.swarm.thresholds import ThresholdEstimator
 from app.swarm.Worker import Worker
-from app.utils import classify_pod, get_parameters, get_pod_requested_resources
+from app.utils import get_parameters
+
+if TYPE_CHECKING:
+    from app.assume import AssumeCache
+    from app.ledger import SlackLedger
+
+
+class Unschedulable(Exception):
+    """No node or slack entry can host the pod in the snapshot."""
 
 
 class SwarmScheduler:
-    workers: list[Worker]
-    lookup_table: dict[tuple[str], list[dict[str, Any]]]
-    params: dict[str, float]
+    """
+    Places pods on the workers of the current `ClusterSnapshot`.
+
+    Snapshots are published by `set_workers`, `set_parameters` and
+    `create_lookup_table`, and reservations are taken by `commit`, all under
+    one lock; a decision itself only reads published snapshots, so any number
+    of decisions can run in parallel. `commit` checks the choice against the
+    newest snapshot and charges it, a placement computed on an outdated
+    snapshot that no longer fits is refused.
+    """
 
     def __init__(
         self,
-        method="SWARM",
-    ):
+        method: str = "SWARM",
+        thresholds_source: str = THRESHOLDS_SOURCE,
+        dimensions: Sequence[str] = RESOURCES,
+        neighbor_buckets: bool = NEIGHBOR_BUCKETS,
+        reservations: Optional["AssumeCache"] = None,
+        ledger: Optional["SlackLedger"] = None,
+        binpack_slack: bool = BINPACK_SLACK,
+    ) -> None:
         self.method = method
+        self.thresholds_source = thresholds_source
+        self.dimensions = tuple(dimensions)
+        self.neighbor_buckets = neighbor_buckets
+        # BINPACK: place elastic pods into rigid pod slack before free capacity
+        self.binpack_slack = binpack_slack
+        # charged to every node set and taken by commit, if given
+        self.reservations = reservations
+        # elastic pods charged to the slack they were placed into, if given
+        self.ledger = ledger
+        self.feasibility = FeasibilityCache()
+        self.threshold_estimator = ThresholdEstimator(
+            dimensions=len(self.dimensions), refresh_seconds=THRESHOLDS_REFRESH_SECONDS
+        )
+        # node -> keys of its slack entries already observed by the estimator
+        self._observed_slack: dict[str, frozenset[str]] = {}
+        self.rng = np.random.default_rng()
+
+        self.snapshot = ClusterSnapshot()
+        # the node details last set, before the reservations were charged
+        self._details: dict[str, NodeDetail] = {}
+        self._lock = threading.Lock()
+        # BINPACK: pod uid -> node planned for it by `plan`
+        self._planned: dict[str, str] = {}
+        # elastic pod uid -> (node, rigid pod key) chosen to host it
+        self._hosts: dict[str, Entry] = {}
+
+        self.satisfied_elastic: list[Any] = []
+        self.un_satisfied_elastic: list[Any] = []
+        self.satisfied_rigid: list[Any] = []
+        self.un_satisfied_rigid: list[Any] = []
+
+    @property
+    def workers(self) -> tuple[Worker, ...]:
+        return self.snapshot.workers
+
+    @property
+    def workers_by_name(self) -> Mapping[str, Worker]:
+        return self.snapshot.workers_by_name
+
+    @property
+    def lookup_table(self) -> tuple[Mapping[Entry, dict[str, Any]], ...]:
+        return self.snapshot.lookup_table
+
+    @property
+    def bucket_of(self) -> Mapping[Entry, BucketKey]:
+        return self.snapshot.bucket_of
+
+    @property
+    def params(self) -> Mapping[str, float]:
+        return self.snapshot.params
+
+    @params.setter
+    def params(self, params: Mapping[str, float]) -> None:
+        with self._lock:
+            self.snapshot = self.snapshot.replace(params=MappingProxyType(dict(params)))
+
+    def set_workers(self, workers: dict[str, NodeDetail]) -> ClusterSnapshot:
+        """Publish a snapshot of `workers`, rebuilding only the changed ones."""
+        logger.opt(lazy=True).debug(
+            "Setting up the model workers with {} nodes:\n{}",
+            lambda: len(workers),
+            lambda: "\n".join(f"{name}: {node}" for name, node in workers.items()),
+        )
 
-        self.satisfied_elastic = []
-        self.un_satisfied_elastic = []
-        self.satisfied_rigid = []
-        self.un_satisfied_rigid = []
+        with self._lock:
+            self._details = workers
+            workers = self._charged(workers)
 
-    def set_workers(self, workers: dict[str, NodeDetail]) -> None:
-        logger.debug(f"Setting up the model workers with {len(workers)} nodes:")
-        for worker in workers:
-            logger.debug(f"{worker}: {workers[worker]}")
+            snapshot = self.snapshot
+            workers_by_name = snapshot.workers_by_name
+            changed = []
+            for name, details in workers.items():
+                worker = workers_by_name.get(name)
+                if (
+                    worker is None
+                    or details.generation is None
+                    or details.generation != worker.details.generation
+                ):
+                    changed.append(Worker(self, name, details))
+            removed = workers_by_name.keys() - workers.keys()
+            if not changed and not removed:
+                return snapshot
 
-        self.workers = [
-            Worker(self, unique_id, workers[unique_id]) for unique_id in workers
-        ]
+            logger.debug("{} workers changed, {} removed.", len(changed), len(removed))
+            self._publish_workers(changed, removed)
+            return self.snapshot
+
+    def _publish_workers(self, changed: list[Worker], removed: Iterable[str]) -> None:
+        snapshot = self.snapshot
+        workers_by_name = dict(snapshot.workers_by_name)
+        for name in removed:
+            del workers_by_name[name]
+        for worker in changed:
+            workers_by_name[worker.unique_id] = worker
+        self.feasibility.update(changed, removed)
+        self.snapshot = snapshot.replace(
+            workers_by_name=MappingProxyType(workers_by_name),
+            lookup_stale=snapshot.lookup_stale
+            | {w.unique_id for w in changed}
+            | set(removed),
+        )
+
+    def _charged(self, workers: dict[str, NodeDetail]) -> dict[str, NodeDetail]:
+        if self.reservations is not None:
+            workers = self.reservations.apply(workers)
+        if self.ledger is not None:
+            workers = self.ledger.apply(workers)
+        return workers
+
+    def commit(self, pod: Any, node: str) -> bool:
+        """
+        Reserve `node` for `pod` unless it can't host the pod anymore in the
+        newest snapshot; the only step that serializes parallel decisions.
+        An elastic pod placed into the slack of a rigid pod is charged to that
+        slack in the ledger.
+        """
+        demand = demand_cache.get(pod)
+        host = self._hosts.pop(pod.metadata.uid, None)
+        with self._lock:
+            worker = self.snapshot.workers_by_name.get(node)
+            if worker is None:
+                return False
+            if host is not None and host[0] == node:
+                slack = worker.slack.get(host[1])
+                if slack is None or any(d > s for d, s in zip(demand.vector, slack)):
+                    return False
+            elif not rigid_fits(worker, demand.vector) and not (
+                demand.pod_class == "elastic" and elastic_fits(worker, demand.vector)
+            ):
+                return False
+            else:
+                host = None
+
+            if self.reservations is not None:
+                self.reservations.assume(pod, node)
+            if self.ledger is not None and host is not None:
+                self.ledger.charge(pod, node, host[1])
+            if node in self._details and (
+                self.reservations is not None or self.ledger is not None
+            ):
+                charged = self._charged({node: self._details[node]})
+                self._publish_workers([Worker(self, node, charged[node])], ())
+            return True
 
     def set_parameters(self):
         params = get_parameters()
         if params and len(params) > 0:
             self.params = params[0]
-        logger.debug(f"Latest parameters:\n{self.params}")
+        logger.debug("Latest parameters:\n{}", self.params)
 
-    def generate_key(self, slack_values, thresholds, slack_estimation_error):
-        key = []
-        for value, threshold in zip(slack_values, thresholds):
-            if value < threshold:
-                key.append("L")
-            else:
-                key.append("H")
+    def get_thresholds(
+        self, params: Optional[Mapping[str, float]] = None
+    ) -> tuple[float, ...]:
+        """
+        Thresholds of every dimension: (alpha, beta) from `params`, by default
+        the latest parameters, or the local streaming estimate when
+        `thresholds_source` is "local" and enough values were observed.
+        Dimensions beyond cpu and memory always use the local estimate, and
+        stay in the L bucket until it is ready.
+        """
+        if params is None:
+            params = self.params
+        estimate = (
+            self.threshold_estimator.thresholds()
+            if self.threshold_estimator.ready
+            else ()
+        )
+        if self.thresholds_source == "local" and estimate:
+            logger.debug("Local thresholds: {}", estimate)
+            return estimate
+        return (params["alpha"], params["beta"]) + tuple(
+            estimate[i] if estimate else math.inf
+            for i in range(2, len(self.dimensions))
+        )
+
+    def generate_key(
+        self,
+        slack_values: Sequence[float],
+        thresholds: Sequence[float],
+        slack_estimation_error: float,
+        key: BucketKey | None = None,
+    ) -> BucketKey:
+        """
+        Bucket key of `slack_values`; pass a precomputed `key` to skip the
+        threshold comparisons.
+        """
+        if key is None:
+            key = bucket_key(slack_values, thresholds)
 
         # Robustness: randomly assign the bucket for a specific
         # percentage of rigid pods' slacks
         if random.random() < slack_estimation_error:
-            key = random.choice([["L", "L"], ["L", "H"], ["H", "L"], ["H", "H"]])
-
-        return tuple(key)
-
-    def create_lookup_table(self, thresholds, slack_estimation_error):
-        self.lookup_table = {}
-        for worker in self.workers:
-            if worker.details.slack:
-                for pod_key in worker.details.slack:
-                    cpu_slack = worker.details.slack[pod_key].cpu
-                    mem_slack = worker.details.slack[pod_key].memory
-                    lookup_key = self.generate_key(
-                        (cpu_slack, mem_slack), thresholds, slack_estimation_error
-                    )
-
-                    lookup_value = {
+            key = random.randrange(n_buckets(len(thresholds)))
+
+        return key
+
+    def generate_keys(
+        self,
+        values: np.ndarray,
+        thresholds: Sequence[float],
+        slack_estimation_error: float,
+    ) -> np.ndarray:
+        """`generate_key` for every row of the (n, dimensions) array `values`."""
+        keys = bucket_keys(values, thresholds)
+        noisy = self.rng.random(len(keys)) < slack_estimation_error
+        keys[noisy] = self.rng.integers(
+            n_buckets(len(thresholds)), size=int(noisy.sum())
+        )
+        return keys
+
+    def create_lookup_table(self, thresholds, slack_estimation_error, snapshot=None):
+        """
+        Snapshot with an up-to-date slack lookup table: only the entries of
+        nodes that changed since the last call are re-bucketed, unless the
+        thresholds or the estimation error changed. Buckets are copied on their
+        first change. The table of the newest snapshot (by default) is
+        published; that of an older `snapshot` is only returned.
+        """
+        params = (tuple(thresholds), slack_estimation_error)
+        with self._lock:
+            newest = snapshot is None or snapshot is self.snapshot
+            if snapshot is None:
+                snapshot = self.snapshot
+            workers_by_name = snapshot.workers_by_name
+            if params != snapshot.lookup_params:
+                table: list[Mapping[Entry, dict[str, Any]]] = [
+                    {} for _ in range(n_buckets(len(thresholds)))
+                ]
+                copied = set(range(len(table)))
+                bucket_of: dict[Entry, BucketKey] = {}
+                entries_of: dict[str, tuple[Entry, ...]] = {}
+                stale: Iterable[str] = workers_by_name.keys()
+            elif snapshot.lookup_stale:
+                table = list(snapshot.lookup_table)
+                copied = set()
+                bucket_of = dict(snapshot.bucket_of)
+                entries_of = dict(snapshot.entries_of)
+                stale = snapshot.lookup_stale
+            else:
+                return snapshot
+
+            def bucket(key: BucketKey) -> dict[Entry, dict[str, Any]]:
+                if key not in copied:
+                    table[key] = dict(table[key])
+                    copied.add(key)
+                return table[key]  # type: ignore[return-value]
+
+            for name in stale:
+                for entry in entries_of.pop(name, ()):
+                    del bucket(bucket_of.pop(entry))[entry]
+
+            entries = [
+                (name, pod_key, slack)
+                for name in stale
+                if name in workers_by_name
+                for pod_key, slack in workers_by_name[name].slack.items()
+            ]
+            for name in stale:
+                worker = workers_by_name.get(name)
+                seen = self._observed_slack.pop(name, frozenset())
+                if worker is not None:
+                    # every slack entry counts once, not on every rebuild
+                    for pod_key, slack in worker.slack.items():
+                        if pod_key not in seen:
+                            self.threshold_estimator.observe(slack)
+                    self._observed_slack[name] = frozenset(worker.slack)
+            if entries:
+                values = np.array([slack for _, _, slack in entries])
+                keys = self.generate_keys(values, thresholds, slack_estimation_error)
+
+                node_entries: dict[str, list[Entry]] = {}
+                for (node, pod_key, slack), lookup_key in zip(entries, keys.tolist()):
+                    bucket(lookup_key)[(node, pod_key)] = {
                         "pod": pod_key,
-                        "node": worker.unique_id,
-                        "slack": (cpu_slack, mem_slack),
+                        "node": node,
+                        "slack": slack,
                     }
-                    try:
-                        self.lookup_table[lookup_key].append(lookup_value)
-                    except KeyError:
-                        self.lookup_table[lookup_key] = [lookup_value]
+                    bucket_of[(node, pod_key)] = lookup_key
+                    node_entries.setdefault(node, []).append((node, pod_key))
+                for node, node_keys in node_entries.items():
+                    entries_of[node] = tuple(node_keys)
+
+            with_table = snapshot.replace(
+                lookup_params=params,
+                lookup_table=tuple(
+                    MappingProxyType(b) if key in copied else b
+                    for key, b in enumerate(table)
+                ),
+                bucket_of=MappingProxyType(bucket_of),
+                entries_of=MappingProxyType(entries_of),
+                lookup_stale=frozenset(),
+            )
+            if newest:
+                self.snapshot = with_table
+            return with_table
 
-    def schedule_elastic(self, pod, thresholds, slack_estimation_error):
-        self.create_lookup_table(thresholds, slack_estimation_error)
-        pod_demand = get_pod_requested_resources(pod)
+    def schedule_elastic(self, pod, thresholds, slack_estimation_error, snapshot=None):
+        newest = snapshot is None or snapshot is self.snapshot
+        snapshot = self.create_lookup_table(
+            thresholds, slack_estimation_error, snapshot
+        )
+        demand = demand_cache.get(pod)
+        self.threshold_estimator.observe(demand.vector)
 
         lookup_key = self.generate_key(
-            (pod_demand["cpu"], pod_demand["memory"]),
+            demand.vector,
             thresholds,
             slack_estimation_error,
+            key=demand.bucket_key(thresholds),
         )
 
-        logger.debug(f"lookup_key = {lookup_key}")
+        logger.opt(lazy=True).debug(
+            "lookup_key = {}", lambda: key_label(lookup_key, len(thresholds))
+        )
 
-        if lookup_key in self.lookup_table:
-            choice = random.choice(self.lookup_table[lookup_key])
-            logger.debug(f"Choice: '{choice}'.")
-            if (
-                pod_demand["cpu"] <= choice["slack"][0]
-                and pod_demand["memory"] <= choice["slack"][1]
-            ):
-                return str(choice["node"])
-            elif random.random() < self.params["gamma"]:
+        keys = [lookup_key]
+        if self.neighbor_buckets:
+            keys += neighbor_keys(lookup_key, len(thresholds))
+        keys = [key for key in keys if snapshot.lookup_table[key]]
+
+        if keys:
+            # only the rigid pods whose slack hosts the demand, by bucket
+            feasible: dict[BucketKey, list[Entry]] = {}
+            if newest:
+                fitting = self.feasibility.feasible_slack(demand.vector)
+            else:
+                # the feasibility cache follows the newest snapshot only
+                fitting = [
+                    (w.unique_id, pod_key)
+                    for w in snapshot.workers
+                    for pod_key in elastic_fits(w, demand.vector)
+                ]
+            for entry in fitting:
+                feasible.setdefault(snapshot.bucket_of.get(entry, -1), []).append(entry)
+            candidates = next((feasible[k] for k in keys if k in feasible), None)
+            if candidates:
+                node, pod_key = random.choice(candidates)
+                logger.debug("Choice: '{}' on '{}'.", pod_key, node)
+                self._hosts[pod.metadata.uid] = (node, pod_key)
+                return str(node)
+            elif random.random() < snapshot.params["gamma"]:
                 logger.info(
                     f"Couldn't schedule pod '{pod.metadata.name}', "
                     "trying to schedule as rigid."
                 )
-                return self.schedule_rigid(pod)
+                return self.schedule_rigid(pod, snapshot)
             else:
                 error_msg = (
                     f"The resource requests of pod '{pod.metadata.name}' are "
-                    "higher than the slack of the chosen rigid pod."
+                    "higher than the slack of any rigid pod in its bucket"
+                    + (" or the neighboring ones." if self.neighbor_buckets else ".")
                 )
                 logger.error(error_msg)
-                raise Exception(error_msg)
+        else:
+            error_msg = (
+                f"No rigid pod has slack in the bucket of pod '{pod.metadata.name}'"
+                + (" or the neighboring ones." if self.neighbor_buckets else ".")
+            )
+        if self._free_nodes(demand.vector, snapshot, newest):
+            # the pod may get slack, or go rigid, on its next attempt
+            raise Exception(error_msg)
+        if keys:
+            raise Unschedulable(error_msg)
         return None
 
-    def schedule_rigid(self, pod):
-        pod_demand = get_pod_requested_resources(pod)
-        choice = random.choice(self.workers)
-        logger.debug(f"Choice: '{choice}'.")
+    def _free_nodes(self, demand, snapshot, newest):
+        """Nodes of `snapshot` whose free capacity hosts `demand`."""
+        if newest:
+            return self.feasibility.feasible_nodes(demand)
+        # the feasibility cache follows the newest snapshot only
+        return [w.unique_id for w in snapshot.workers if rigid_fits(w, demand)]
 
-        cpu_available = choice.resource_capacity[0] - choice.current_cpu_utilization
-        mem_available = choice.resource_capacity[1] - choice.current_mem_utilization
-
-        if pod_demand["cpu"] <= cpu_available and pod_demand["memory"] <= mem_available:
-            return choice.unique_id
+    def schedule_rigid(self, pod, snapshot=None):
+        demand = demand_cache.get(pod).vector
+        if snapshot is None:
+            snapshot = self.snapshot
+        feasible = self._free_nodes(demand, snapshot, snapshot is self.snapshot)
+        if feasible:
+            choice = random.choice(feasible)
+            logger.debug("Choice: '{}'.", choice)
+            return choice
         else:
             error_msg = (
                 f"The resource requests of pod '{pod.metadata.name}' are "
-                "higher than the available resources on chosen node."
+                "higher than the available resources on any node."
             )
             logger.error(error_msg)
-            raise Exception(error_msg)
+            raise Unschedulable(error_msg)
+
+    def select_nodes(
+        self, pods: Sequence[Any], snapshot: Optional[ClusterSnapshot] = None
+    ) -> list[Optional[str]]:
+        """
+        BINPACK: joint best-fit decreasing placement of `pods` on the workers
+        of `snapshot`, None for the pods that don't fit. Elastic pods go into
+        the slack of rigid pods first if `binpack_slack` is set, and use free
+        capacity otherwise.
+        """
+        if snapshot is None:
+            snapshot = self.snapshot
+        workers = snapshot.workers
+        nodes: list[Optional[str]] = [None] * len(pods)
+        if not pods or not workers:
+            return nodes
+
+        capacity = np.array([w.resource_capacity for w in workers], dtype=float)
+        free = capacity - np.array([w.usage for w in workers], dtype=float)
+        scale = capacity.max(axis=0)
+        demands = [demand_cache.get(pod) for pod in pods]
+
+        rigid = list(range(len(pods)))
+        if self.binpack_slack:
+            elastic = [i for i in rigid if demands[i].pod_class == "elastic"]
+            entries = [
+                ((w.unique_id, pod_key), slack)
+                for w in workers
+                for pod_key, slack in w.slack.items()
+            ]
+            if elastic and entries:
+                placed, _ = binpack.pack(
+                    np.array([demands[i].vector for i in elastic], dtype=float),
+                    np.array([slack for _, slack in entries], dtype=float),
+                    scale,
+                )
+                for i, entry in zip(elastic, placed.tolist()):
+                    if entry >= 0:
+                        host = entries[entry][0]
+                        nodes[i] = host[0]
+                        self._hosts[pods[i].metadata.uid] = host
+                rigid = [i for i in rigid if nodes[i] is None]
 
-    def select_node(self, new_pod, slack_estimation_error=0.2):
+        if rigid:
+            placed, _ = binpack.pack(
+                np.array([demands[i].vector for i in rigid], dtype=float), free, scale
+            )
+            for i, worker in zip(rigid, placed.tolist()):
+                self._hosts.pop(pods[i].metadata.uid, None)
+                if worker >= 0:
+                    nodes[i] = workers[worker].unique_id
+        return nodes
+
+    def plan(
+        self, pods: Sequence[Any], snapshot: Optional[ClusterSnapshot] = None
+    ) -> None:
+        """BINPACK: place `pods` jointly, `select_node` then returns their node."""
+        for pod, node in zip(pods, self.select_nodes(pods, snapshot)):
+            if node is not None:
+                self._planned[pod.metadata.uid] = node
+            else:
+                self._planned.pop(pod.metadata.uid, None)
+
+    def select_node(
+        self,
+        new_pod,
+        slack_estimation_error=0.2,
+        snapshot=None,
+        refresh_parameters=True,
+    ):
+        """
+        Node for `new_pod` in `snapshot`, by default the newest one. For
+        elastic pods the parameters are fetched first if `refresh_parameters`,
+        and the thresholds are those of the snapshot's parameters.
+        """
+        newest = snapshot is None
+        if snapshot is None:
+            snapshot = self.snapshot
         if self.method == "RND":
-            mock_choice = random.choice(self.workers)
-            logger.debug(f"Mock choice: '{mock_choice.unique_id}'.")
+            mock_choice = random.choice(snapshot.workers)
+            logger.debug("Mock choice: '{}'.", mock_choice.unique_id)
             return mock_choice.unique_id
 
+        elif self.method == "BINPACK":
+            choice = self._planned.pop(new_pod.metadata.uid, None)
+            if choice is None:
+                choice = self.select_nodes([new_pod], snapshot)[0]
+            logger.debug("Choice: '{}'.", choice)
+            return choice
+
         elif self.method == "SWARM":
-            if classify_pod(new_pod) == "elastic":
+            if demand_cache.get(new_pod).pod_class == "elastic":
                 logger.info(f"Scheduling pod {new_pod.metadata.name} as elastic.")
-                self.set_parameters()
+                if refresh_parameters:
+                    self.set_parameters()
+                    if newest:
+                        snapshot = self.snapshot
                 return self.schedule_elastic(
                     new_pod,
-                    (self.params["alpha"], self.params["beta"]),
+                    self.get_thresholds(snapshot.params),
                     slack_estimation_error,
+                    snapshot,
                 )
             else:
                 logger.info(f"Scheduling pod {new_pod.metadata.name} as rigid.")
-                return self.schedule_rigid(new_pod)
+                return self.schedule_rigid(new_pod, snapshot)
@@ -1,5 +1,8 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Hashable, Sequence
 
+import itertools
+
+from app.consts import RESOURCES
 from app.schemas import NodeDetail
 from app.swarm import algorithms
 
@@ -7,20 +10,97 @@ if TYPE_CHECKING:
     from app.swarm.SwarmScheduler import SwarmScheduler
 
 
+def node_fingerprint(
+    details: NodeDetail, dimensions: Sequence[str] = RESOURCES
+) -> Hashable:
+    """Value that changes whenever the node's resources or slack change."""
+    slack = (
+        tuple(
+            (pod_key, resources.vector(dimensions))
+            for pod_key, resources in details.slack.items()
+        )
+        if details.slack
+        else ()
+    )
+    return (
+        details.usage.vector(dimensions),
+        details.allocatable.vector(dimensions),
+        slack,
+    )
+
+
+class NodeGenerations:
+    """
+    Stamps node snapshots with generation numbers: a node keeps its generation
+    while its fingerprint stays the same and gets a new one when it changes.
+    """
+
+    def __init__(self, dimensions: Sequence[str] = RESOURCES) -> None:
+        self.dimensions = dimensions
+        self._numbers = itertools.count(1)
+        self._seen: dict[str, tuple[Hashable, int]] = {}
+        self._derived: dict[tuple[str, str], tuple[Hashable, int]] = {}
+
+    def stamp(self, nodes: dict[str, NodeDetail]) -> None:
+        seen = {}
+        for name, details in nodes.items():
+            fingerprint = node_fingerprint(details, self.dimensions)
+            previous = self._seen.get(name)
+            if previous is not None and previous[0] == fingerprint:
+                generation = previous[1]
+            else:
+                generation = next(self._numbers)
+            details.generation = generation
+            seen[name] = (fingerprint, generation)
+        self._seen = seen
+
+    def derive(self, name: str, key: Hashable, source: str = "") -> int:
+        """
+        Generation of node `name` changed by something else than the snapshot,
+        such as charges: the same as long as `key`, which includes the node's
+        own generation, stays the same. Each `source` of changes keeps its own.
+        """
+        previous = self._derived.get((source, name))
+        if previous is not None and previous[0] == key:
+            return previous[1]
+        generation = next(self._numbers)
+        self._derived[(source, name)] = (key, generation)
+        return generation
+
+
 class Worker:
     def __init__(self, model: "SwarmScheduler", unique_id: str, details: NodeDetail):
         self.unique_id = unique_id
         self.details = details
         self.model = model
 
-        # vector of resource capacities, for now (cpu_cap, mem_cap)
-        self.resource_capacity = (details.allocatable.cpu, details.allocatable.memory)
+        # vectors over the model's resource dimensions, (cpu, mem, ...)
+        self.resource_capacity = details.allocatable.vector(model.dimensions)
+        self.usage = details.usage.vector(model.dimensions)
+        # rigid pod key -> slack vector, by decreasing slack of the first
+        # dimension so that fit checks can stop at the first one too small
+        self.slack = dict(
+            sorted(
+                (
+                    (pod_key, resources.vector(model.dimensions))
+                    for pod_key, resources in (details.slack or {}).items()
+                ),
+                key=lambda item: -item[1][0],
+            )
+        )
 
         self.current_cpu_assignment = details.usage.cpu
         self.current_mem_assignment = details.usage.memory
         self.current_cpu_utilization = details.usage.cpu
         self.current_mem_utilization = details.usage.memory
 
+        # state generation of the node, see FeasibilityCache
+        self.generation: Hashable = (
+            details.generation
+            if details.generation is not None
+            else node_fingerprint(details, model.dimensions)
+        )
+
         # track the utilization of worker over time
         # self.cpu_utilization = []
         # self.mem_utilization = []
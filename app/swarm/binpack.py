@@ -0,0 +1,60 @@
+from typing import Optional
+
+import numpy as np
+
+BEST_FIT = "best"
+FIRST_FIT = "first"
+
+
+def pack(
+    demands: np.ndarray,
+    free: np.ndarray,
+    scale: Optional[np.ndarray] = None,
+    strategy: str = BEST_FIT,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Joint placement of the (n, dimensions) `demands` into the (m, dimensions)
+    `free` resources of the bins, largest demand first (first-fit or best-fit
+    decreasing). Every demand is checked against all bins at once.
+
+    Dimensions are compared relative to `scale`, by default the largest bin
+    of each dimension. Best fit picks the bin left with the least free
+    resources. Returns the bin of every demand, -1 if none fits, and what is
+    left free of every bin.
+    """
+    free = np.array(free, dtype=float).reshape(-1, demands.shape[1])
+    assignment = np.full(len(demands), -1, dtype=int)
+    if not len(demands) or not len(free):
+        return assignment, free
+
+    if scale is None:
+        scale = free.max(axis=0)
+    scale = np.where(scale > 0, scale, 1.0)
+    normalized = demands / scale
+    order = np.argsort(-normalized.max(axis=1), kind="stable")
+    sizes = normalized.sum(axis=1)
+    # one contiguous row per dimension, and the normalized free total per bin
+    # kept up to date instead of recomputed for every demand
+    columns = np.ascontiguousarray(free.T)
+    left = (columns / scale[:, None]).sum(axis=0)
+
+    for i in order.tolist():
+        demand = demands[i]
+        fits = columns[0] >= demand[0]
+        for k in range(1, len(demand)):
+            fits &= columns[k] >= demand[k]
+        if strategy == FIRST_FIT:
+            j = int(fits.argmax())
+        else:
+            j = int(np.where(fits, left, np.inf).argmin())
+        if not fits[j]:
+            continue
+        assignment[i] = j
+        columns[:, j] -= demand
+        left[j] -= sizes[i]
+    return assignment, np.ascontiguousarray(columns.T)
+
+
+def bins_used(assignment: np.ndarray) -> int:
+    """Number of distinct bins an assignment places demands in."""
+    return len(np.unique(assignment[assignment >= 0]))
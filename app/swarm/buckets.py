@@ -0,0 +1,43 @@
+from typing import Sequence
+
+import numpy as np
+
+# Bucket keys are small integers: bit i is set when dimension i of a resource
+# vector is at or above its threshold ("H"), and clear below it ("L").
+BucketKey = int
+
+
+def n_buckets(dimensions: int) -> int:
+    return 1 << dimensions
+
+
+def bucket_key(values: Sequence[float], thresholds: Sequence[float]) -> BucketKey:
+    """Bucket key of one resource vector given per-dimension thresholds."""
+    key = 0
+    for i, (value, threshold) in enumerate(zip(values, thresholds)):
+        if value >= threshold:
+            key |= 1 << i
+    return key
+
+
+def bucket_keys(values: np.ndarray, thresholds: Sequence[float]) -> np.ndarray:
+    """Bucket key of every row of the (n, dimensions) array `values`."""
+    bits = values >= np.asarray(thresholds)
+    keys: np.ndarray = (bits << np.arange(values.shape[1])).sum(axis=1)
+    return keys
+
+
+def neighbor_keys(key: BucketKey, dimensions: int) -> list[BucketKey]:
+    """
+    Keys one dimension away from `key`: first those where an L dimension is H
+    (more slack there), then those where an H dimension is L.
+    """
+    bits = [1 << i for i in range(dimensions)]
+    return [key | bit for bit in bits if not key & bit] + [
+        key & ~bit for bit in bits if key & bit
+    ]
+
+
+def key_label(key: BucketKey, dimensions: int) -> str:
+    """Readable form of a key, e.g. "LH" for a low CPU and high memory vector."""
+    return "".join("H" if key >> i & 1 else "L" for i in range(dimensions))
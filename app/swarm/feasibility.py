@@ -0,0 +1,139 @@
+from typing import TYPE_CHECKING, Any, Hashable, Iterable
+
+import threading
+from collections import OrderedDict
+
+if TYPE_CHECKING:
+    from app.swarm.Worker import Worker
+
+RIGID = "rigid"
+ELASTIC = "elastic"
+
+# resource vector over the scheduler's dimensions
+Demand = tuple[float, ...]
+
+
+def rigid_fits(worker: "Worker", demand: Demand) -> bool:
+    return all(
+        d <= capacity - used
+        for d, capacity, used in zip(demand, worker.resource_capacity, worker.usage)
+    )
+
+
+def elastic_fits(worker: "Worker", demand: Demand) -> list[str]:
+    """Keys of the rigid pods on `worker` whose slack can host `demand`."""
+    fits = []
+    for pod_key, slack in worker.slack.items():
+        if slack[0] < demand[0]:
+            break  # sorted by decreasing slack of the first dimension
+        if all(d <= s for d, s in zip(demand, slack)):
+            fits.append(pod_key)
+    return fits
+
+
+class EquivalenceClass:
+    """Feasibility of one (placement, demand) pair, tracked node by node."""
+
+    def __init__(self, placement: str, demand: Demand) -> None:
+        self.placement = placement
+        self.demand = demand
+        # node name -> rigid: True, elastic: fitting rigid pod keys
+        self.feasible: dict[str, Any] = {}
+        # nodes whose feasibility must be (re)computed before the next read
+        self.dirty: set[str] = set()
+
+    def evaluate(self, workers: dict[str, "Worker"]) -> None:
+        for name in self.dirty:
+            worker = workers[name]
+            if self.placement == RIGID:
+                fits: Any = rigid_fits(worker, self.demand)
+            else:
+                fits = elastic_fits(worker, self.demand)
+            if fits:
+                self.feasible[name] = fits
+            else:
+                self.feasible.pop(name, None)
+        self.dirty.clear()
+
+
+class FeasibilityCache:
+    """Feasible nodes (rigid) or slack entries (elastic) per equivalence class.
+
+    Pods with the same demand vector and placement share a class. A class keeps
+    its result across decisions and only re-checks nodes whose generation
+    changed since the last `sync`.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._generations: dict[str, Hashable] = {}
+        self._workers: dict[str, "Worker"] = {}
+        self._classes: OrderedDict[Hashable, EquivalenceClass] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def sync(self, workers: list["Worker"]) -> None:
+        """Adopt a new worker set, invalidating only nodes that changed."""
+        current = {worker.unique_id: worker for worker in workers}
+        with self._lock:
+            removed = self._generations.keys() - current.keys()
+            changed = [
+                worker
+                for name, worker in current.items()
+                if self._generations.get(name) != worker.generation
+            ]
+        self.update(changed, removed)
+
+    def update(self, changed: list["Worker"], removed: Iterable[str]) -> None:
+        """Replace the `changed` workers and drop the `removed` nodes."""
+        with self._lock:
+            for name in removed:
+                self._workers.pop(name, None)
+                self._generations.pop(name, None)
+                for eq_class in self._classes.values():
+                    eq_class.feasible.pop(name, None)
+                    eq_class.dirty.discard(name)
+            names = set()
+            for worker in changed:
+                if self._generations.get(worker.unique_id) != worker.generation:
+                    names.add(worker.unique_id)
+                self._workers[worker.unique_id] = worker
+                self._generations[worker.unique_id] = worker.generation
+            for eq_class in self._classes.values():
+                eq_class.dirty |= names
+
+    def _lookup(self, placement: str, demand: Demand) -> list[tuple[str, Any]]:
+        key = (placement, demand)
+        with self._lock:
+            eq_class = self._classes.get(key)
+            if eq_class is None:
+                self.misses += 1
+                eq_class = EquivalenceClass(placement, demand)
+                eq_class.dirty = set(self._workers)
+                self._classes[key] = eq_class
+                if len(self._classes) > self.maxsize:
+                    self._classes.popitem(last=False)
+            else:
+                self.hits += 1
+                self._classes.move_to_end(key)
+            eq_class.evaluate(self._workers)
+            return list(eq_class.feasible.items())
+
+    def feasible_nodes(self, demand: Demand) -> list[str]:
+        """Nodes with enough free capacity to host `demand` as a rigid pod."""
+        return [node for node, _ in self._lookup(RIGID, demand)]
+
+    def feasible_slack(self, demand: Demand) -> list[tuple[str, str]]:
+        """(node, rigid pod key) pairs whose slack can host `demand`."""
+        return [
+            (node, pod_key)
+            for node, pod_keys in self._lookup(ELASTIC, demand)
+            for pod_key in pod_keys
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._classes.clear()
+            self.hits = 0
+            self.misses = 0
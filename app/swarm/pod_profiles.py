@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 """
 This module defines the pod profiles and some functions to
-get a pod with specific profile
+get a pod with specific profile, one at a time or as a whole trace
 """
 
+from typing import Optional, Sequence
+
+import os
 import random
 
 import numpy as np
@@ -14,73 +17,89 @@ profiles: define [(cpu_demand, mem_demand), (cpu_slack, mem_slack)]
 demand_steps: list of required steps to execute the pod, uniform distribution
 """
 
-
-def get_small_pod(demand_steps=(20, 30)):
-    # considered small pod profiles
-    small_profiles = [
-        [(1, 1), (0, 0)],
-        [(1, 2), (0, 0)],
-        [(2, 1), (0, 0)],
-        [(2, 2), (0, 0)],
+# considered small pod profiles
+SMALL_PROFILES = [
+    [(1, 1), (0, 0)],
+    [(1, 2), (0, 0)],
+    [(2, 1), (0, 0)],
+    [(2, 2), (0, 0)],
+]
+
+# considered medium pod profiles
+MEDIUM_PROFILES = [
+    [(4, 4), (1, 1)],
+    [(4, 4), (1, 2)],
+    [(4, 4), (2, 1)],
+    [(4, 6), (1, 2)],
+    [(4, 6), (2, 1)],
+    [(4, 6), (2, 2)],
+    [(6, 4), (1, 2)],
+    [(6, 4), (2, 1)],
+    [(6, 4), (2, 2)],
+    [(6, 6), (1, 2)],
+    [(6, 6), (2, 1)],
+    [(6, 6), (2, 2)],
+]
+
+# MEDIUM_PROFILES = [[(4,4),(0,0)], [(4,4),(0,0)], [(4,4),(0,0)],\
+#                    [(4,6),(0,0)], [(4,6),(0,0)], [(4,6),(0,0)],\
+#                    [(6,4),(0,0)], [(6,4),(0,0)], [(6,4),(0,0)],\
+#                    [(6,6),(0,0)], [(6,6),(0,0)], [(6,6),(0,0)]]
+
+# considered large pod profiles
+LARGE_PROFILES = [
+    [(8, 8), (4, 4)],
+    [(8, 16), (4, 4)],
+    [(8, 16), (4, 6)],
+    [(16, 8), (4, 4)],
+    [(16, 8), (6, 4)],
+    [(16, 16), (4, 6)],
+    [(16, 16), (6, 4)],
+    [(16, 16), (6, 6)],
+]
+
+# LARGE_PROFILES = [[(8,8),(0,0)],\
+#                   [(8,16),(0,0)], [(8,16),(0,0)],\
+#                   [(16,8),(0,0)], [(16,8),(0,0)],\
+#                   [(16,16),(0,0)], [(16,16),(0,0)], [(16,16),(0,0)]]
+
+# small, medium and large profiles with the demand steps get_pod_profile uses
+CATEGORIES = (
+    (SMALL_PROFILES, (60, 120)),
+    (MEDIUM_PROFILES, (100, 200)),
+    (LARGE_PROFILES, (150, 300)),
+)
+
+# one pod of a trace, see generate_pods
+POD_DTYPE = np.dtype(
+    [
+        ("demand", np.float64, (2,)),
+        ("slack", np.float64, (2,)),
+        ("steps", np.int64),
+        ("elastic", np.bool_),
+        ("tolerance", np.int64),
+        ("arrival", np.int64),
     ]
+)
 
-    prob1 = 1.0 / len(small_profiles) * np.ones(len(small_profiles))
-    demand, slack = random.choices(small_profiles, weights=list(prob1), k=1)[0]
+
+def get_small_pod(demand_steps=(20, 30)):
+    # all profiles are equally likely
+    demand, slack = random.choice(SMALL_PROFILES)
 
     demand_step = random.randint(demand_steps[0], demand_steps[1])
     return demand, demand_step, slack
 
 
 def get_medium_pod(demand_steps=(50, 130)):
-    # considered medium pod profiles
-    medium_profiles = [
-        [(4, 4), (1, 1)],
-        [(4, 4), (1, 2)],
-        [(4, 4), (2, 1)],
-        [(4, 6), (1, 2)],
-        [(4, 6), (2, 1)],
-        [(4, 6), (2, 2)],
-        [(6, 4), (1, 2)],
-        [(6, 4), (2, 1)],
-        [(6, 4), (2, 2)],
-        [(6, 6), (1, 2)],
-        [(6, 6), (2, 1)],
-        [(6, 6), (2, 2)],
-    ]
-
-    # medium_profiles = [[(4,4),(0,0)], [(4,4),(0,0)], [(4,4),(0,0)],\
-    #                       [(4,6),(0,0)], [(4,6),(0,0)], [(4,6),(0,0)],\
-    #                       [(6,4),(0,0)], [(6,4),(0,0)], [(6,4),(0,0)],\
-    #                       [(6,6),(0,0)], [(6,6),(0,0)], [(6,6),(0,0)]]
-
-    prob1 = 1.0 / len(medium_profiles) * np.ones(len(medium_profiles))
-
-    demand, slack = random.choices(medium_profiles, weights=list(prob1), k=1)[0]
+    demand, slack = random.choice(MEDIUM_PROFILES)
 
     demand_step = random.randint(demand_steps[0], demand_steps[1])
     return demand, demand_step, slack
 
 
 def get_large_pod(demand_steps=(200, 400)):
-    # considered large pod profiles
-    large_profiles = [
-        [(8, 8), (4, 4)],
-        [(8, 16), (4, 4)],
-        [(8, 16), (4, 6)],
-        [(16, 8), (4, 4)],
-        [(16, 8), (6, 4)],
-        [(16, 16), (4, 6)],
-        [(16, 16), (6, 4)],
-        [(16, 16), (6, 6)],
-    ]
-
-    # large_profiles = [[(8,8),(0,0)],\
-    #                   [(8,16),(0,0)], [(8,16),(0,0)],\
-    #                   [(16,8),(0,0)], [(16,8),(0,0)],\
-    #                   [(16,16),(0,0)], [(16,16),(0,0)], [(16,16),(0,0)]]
-
-    prob1 = 1.0 / len(large_profiles) * np.ones(len(large_profiles))
-    demand, slack = random.choices(large_profiles, weights=list(prob1), k=1)[0]
+    demand, slack = random.choice(LARGE_PROFILES)
 
     demand_step = random.randint(demand_steps[0], demand_steps[1])
 
@@ -134,3 +153,79 @@ def get_pod_demand(
     demand_step = random.choices(demand_steps, weights=prob, k=1)[0]
 
     return (cpu, mem), demand_step
+
+
+def generate_pods(
+    n_pods: int,
+    arrival_rate: float = 1.0,
+    categories_prob: Sequence[float] = (0.4, 0.4, 0.2),
+    prob_elasticity: float = 0.5,
+    seed: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Draw `n_pods` pods at once, with the same distribution as
+    `get_pod_profile`, into an array of `POD_DTYPE`. Inter-arrival times are
+    exponential with mean 1 / `arrival_rate` ticks. The same `seed` always
+    gives the same trace.
+    """
+    rng = np.random.default_rng(seed)
+    pods = np.zeros(n_pods, dtype=POD_DTYPE)
+
+    rnd = rng.random(n_pods)
+    category = (rnd >= categories_prob[0]).astype(np.int64) + (
+        rnd >= categories_prob[0] + categories_prob[1]
+    )
+    for c, (profiles, (low, high)) in enumerate(CATEGORIES):
+        pods_of = np.flatnonzero(category == c)
+        table = np.array(profiles, dtype=np.float64)
+        profile = rng.integers(len(table), size=len(pods_of))
+        pods["demand"][pods_of] = table[profile, 0]
+        pods["slack"][pods_of] = table[profile, 1]
+        pods["steps"][pods_of] = rng.integers(low, high + 1, size=len(pods_of))
+
+    # large pods are never elastic
+    elastic = (category < 2) & (rng.random(n_pods) < prob_elasticity)
+    pods["elastic"] = elastic
+    pods["slack"][elastic] = 0
+    pods["tolerance"] = np.where(
+        elastic, 0.3 * pods["steps"], 0.1 * pods["steps"]
+    ).astype(np.int64)
+    pods["arrival"] = np.floor(
+        np.cumsum(rng.exponential(1.0 / arrival_rate, size=n_pods))
+    ).astype(np.int64)
+    return pods
+
+
+def trace_path(path: str) -> str:
+    """
+    The file a trace for `path` is kept in: `path` itself if it ends in `.npy`
+    or `.npz`, or else `path` with `.npz` appended, as numpy does when saving.
+    """
+    if os.path.splitext(path)[1] in (".npy", ".npz"):
+        return path
+    return path + ".npz"
+
+
+def save_trace(path: str, pods: np.ndarray) -> str:
+    """
+    Write a trace of `generate_pods` to `path`: a `.npy` file, which
+    `load_trace` maps into memory, or else a compressed `.npz` archive.
+    Returns the path written, see `trace_path`.
+    """
+    path = trace_path(path)
+    if path.endswith(".npy"):
+        np.save(path, pods)
+    else:
+        np.savez_compressed(path, pods=pods)
+    return path
+
+
+def load_trace(path: str, mmap: bool = True) -> np.ndarray:
+    """Read a trace written by `save_trace`; `.npy` files are memory-mapped."""
+    path = trace_path(path)
+    if path.endswith(".npy"):
+        pods: np.ndarray = np.load(path, mmap_mode="r" if mmap else None)
+        return pods
+    with np.load(path) as archive:
+        pods = archive["pods"]
+    return pods
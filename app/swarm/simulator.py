@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+"""
+Discrete-time cluster simulator for the peer selection methods (RND, BEST, SWARM).
+
+Replaces the agent-per-pod Mesa model: workers and pods are stored as NumPy
+structure-of-arrays and every tick releases finished pods, admits arrivals and
+places the waiting pods in vectorized batches.
+
+Per tick, in order:
+    1. pods whose `demand_steps` elapsed release their resources (an elastic pod
+       gives its demand back to the slack of its host rigid pod, if still running)
+    2. pods whose tolerance expired while waiting are counted as unsatisfied
+    3. newly arrived pods join the waiting queue
+    4. waiting rigid pods try one uniformly drawn worker each
+    5. waiting elastic pods try one rigid peer chosen by the method; on failure
+       they fall back to rigid placement with probability `gamma`
+
+Concurrent picks of the same worker (or peer) in one tick are resolved in
+arrival order: a pod is admitted only if the running total of all earlier picks
+of that target, its own demand included, still fits.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+from app.swarm.buckets import bucket_keys, n_buckets
+from app.swarm.pod_profiles import generate_pods
+
+METHODS = ("RND", "BEST", "SWARM")
+
+# pod states
+NOT_ARRIVED, WAITING, RUNNING, FINISHED, UNSATISFIED = range(5)
+
+
+class Workload:
+    """Pods as structure-of-arrays, sorted by arrival tick."""
+
+    def __init__(
+        self,
+        demand: np.ndarray,
+        slack: np.ndarray,
+        steps: np.ndarray,
+        elastic: np.ndarray,
+        tolerance: np.ndarray,
+        arrival: np.ndarray,
+    ) -> None:
+        arrival = np.asarray(arrival, dtype=np.int64)
+        # a sorted (e.g. memory-mapped) trace is used without copying it
+        order = (
+            slice(None)
+            if np.all(arrival[:-1] <= arrival[1:])
+            else np.argsort(arrival, kind="stable")
+        )
+        self.demand = np.asarray(demand, dtype=np.float64)[order]
+        self.slack = np.asarray(slack, dtype=np.float64)[order]
+        self.steps = np.asarray(steps, dtype=np.int64)[order]
+        self.elastic = np.asarray(elastic, dtype=bool)[order]
+        self.tolerance = np.asarray(tolerance, dtype=np.int64)[order]
+        self.arrival = arrival[order]
+
+    def __len__(self) -> int:
+        return len(self.arrival)
+
+    @classmethod
+    def from_trace(cls, pods: np.ndarray) -> "Workload":
+        """Workload of an array of `pod_profiles.POD_DTYPE`, see `load_trace`."""
+        return cls(
+            pods["demand"],
+            pods["slack"],
+            pods["steps"],
+            pods["elastic"],
+            pods["tolerance"],
+            pods["arrival"],
+        )
+
+    @classmethod
+    def from_pod_profiles(
+        cls,
+        n_pods: int,
+        arrival_rate: float = 1.0,
+        categories_prob: Sequence[float] = (0.4, 0.4, 0.2),
+        prob_elasticity: float = 0.5,
+        seed: Optional[int] = None,
+    ) -> "Workload":
+        """
+        Draw `n_pods` pods with `pod_profiles.generate_pods`; inter-arrival
+        times are exponential with mean 1 / `arrival_rate` ticks.
+        """
+        return cls.from_trace(
+            generate_pods(n_pods, arrival_rate, categories_prob, prob_elasticity, seed)
+        )
+
+
+class SimulationResult:
+    def __init__(self, n_ticks: int) -> None:
+        self.cpu_utilization = np.zeros(n_ticks)
+        self.mem_utilization = np.zeros(n_ticks)
+        self.running = np.zeros(n_ticks, dtype=np.int64)
+        self.waiting = np.zeros(n_ticks, dtype=np.int64)
+
+        self.satisfied_rigid = 0
+        self.satisfied_elastic = 0
+        self.un_satisfied_rigid = 0
+        self.un_satisfied_elastic = 0
+        # elastic pods that ended up placed as rigid (gamma fallback)
+        self.elastic_as_rigid = 0
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "satisfied_rigid": self.satisfied_rigid,
+            "satisfied_elastic": self.satisfied_elastic,
+            "un_satisfied_rigid": self.un_satisfied_rigid,
+            "un_satisfied_elastic": self.un_satisfied_elastic,
+            "elastic_as_rigid": self.elastic_as_rigid,
+            "mean_cpu_utilization": float(self.cpu_utilization.mean()),
+            "mean_mem_utilization": float(self.mem_utilization.mean()),
+        }
+
+
+def admit_in_order(
+    target: np.ndarray, demand: np.ndarray, free: np.ndarray
+) -> np.ndarray:
+    """
+    Mask of the picks that fit when several pods choose the same target.
+
+    Picks of one target are admitted in the given order for as long as their
+    cumulative demand fits into the target's free resources.
+    """
+    if len(target) == 0:
+        return np.zeros(0, dtype=bool)
+    order = np.argsort(target, kind="stable")
+    sorted_target = target[order]
+    cumulative = np.cumsum(demand[order], axis=0)
+    group_start = np.flatnonzero(np.r_[True, sorted_target[1:] != sorted_target[:-1]])
+    group_offset = np.repeat(
+        np.vstack((np.zeros((1, demand.shape[1])), cumulative[group_start[1:] - 1])),
+        np.diff(np.r_[group_start, len(target)]),
+        axis=0,
+    )
+    fits = np.all(cumulative - group_offset <= free[sorted_target], axis=1)
+    admitted = np.empty(len(target), dtype=bool)
+    admitted[order] = fits
+    return admitted
+
+
+class ClusterSimulator:
+    def __init__(
+        self,
+        n_workers: int,
+        workload: Workload,
+        method: str = "SWARM",
+        capacity: Sequence[float] = (64, 64),
+        thresholds: Sequence[float] = (2, 2),
+        slack_estimation_error: float = 0.2,
+        gamma: float = 0.5,
+        seed: Optional[int] = None,
+    ) -> None:
+        if method not in METHODS:
+            raise ValueError(f"Unknown method '{method}', expected one of {METHODS}")
+
+        self.method = method
+        self.thresholds = tuple(thresholds)
+        self.slack_estimation_error = slack_estimation_error
+        self.gamma = gamma
+        self.rng = np.random.default_rng(seed)
+
+        # workers
+        self.capacity = np.broadcast_to(
+            np.asarray(capacity, dtype=np.float64), (n_workers, 2)
+        ).copy()
+        self.assigned = np.zeros((n_workers, 2))
+        self.used = np.zeros((n_workers, 2))
+
+        # pods
+        self.pods = workload
+        n_pods = len(workload)
+        self.state = np.full(n_pods, NOT_ARRIVED, dtype=np.int8)
+        self.as_rigid = ~workload.elastic
+        self.worker = np.full(n_pods, -1, dtype=np.int64)
+        self.peer = np.full(n_pods, -1, dtype=np.int64)
+        self.end = np.zeros(n_pods, dtype=np.int64)
+        self.free_slack = workload.slack.copy()
+
+        self.tick = 0
+        self._next_arrival = 0
+        self._waiting = np.zeros(0, dtype=np.int64)
+        self._running = np.zeros(0, dtype=np.int64)
+
+    def run(self, n_ticks: Optional[int] = None) -> SimulationResult:
+        """Step until every pod is done, or for `n_ticks` ticks."""
+        if n_ticks is None:
+            pods = self.pods
+            n_ticks = int(
+                (pods.arrival + pods.tolerance + pods.steps).max() + 1 - self.tick
+            )
+        result = SimulationResult(n_ticks)
+        for i in range(n_ticks):
+            self.step(result, i)
+        return result
+
+    def step(self, result: SimulationResult, i: int) -> None:
+        self._release()
+        self._expire(result)
+        self._arrive()
+
+        waiting = self._waiting
+        rigid = waiting[self.as_rigid[waiting]]
+        elastic = waiting[~self.as_rigid[waiting]]
+        self._place_rigid(rigid, result)
+        self._place_elastic(elastic, result)
+        self._waiting = waiting[self.state[waiting] == WAITING]
+
+        total = self.capacity.sum(axis=0)
+        used = self.used.sum(axis=0) / total
+        result.cpu_utilization[i], result.mem_utilization[i] = used
+        result.running[i] = len(self._running)
+        result.waiting[i] = len(self._waiting)
+        self.tick += 1
+
+    def _release(self) -> None:
+        running = self._running
+        done = running[self.end[running] <= self.tick]
+        if len(done) == 0:
+            return
+        self._running = running[self.end[running] > self.tick]
+        self.state[done] = FINISHED
+
+        demand = self.pods.demand
+        rigid = done[self.peer[done] < 0]
+        elastic = done[self.peer[done] >= 0]
+
+        np.subtract.at(self.assigned, self.worker[rigid], demand[rigid])
+        np.subtract.at(
+            self.used, self.worker[rigid], demand[rigid] - self.pods.slack[rigid]
+        )
+
+        np.subtract.at(self.used, self.worker[elastic], demand[elastic])
+        peers = self.peer[elastic]
+        alive = self.state[peers] == RUNNING
+        np.add.at(self.free_slack, peers[alive], demand[elastic[alive]])
+
+    def _expire(self, result: SimulationResult) -> None:
+        waiting = self._waiting
+        pods = self.pods
+        expired = waiting[pods.arrival[waiting] + pods.tolerance[waiting] < self.tick]
+        if len(expired) == 0:
+            return
+        self.state[expired] = UNSATISFIED
+        n_elastic = int(pods.elastic[expired].sum())
+        result.un_satisfied_elastic += n_elastic
+        result.un_satisfied_rigid += len(expired) - n_elastic
+        self._waiting = waiting[self.state[waiting] == WAITING]
+
+    def _arrive(self) -> None:
+        start = self._next_arrival
+        stop = int(np.searchsorted(self.pods.arrival, self.tick, side="right"))
+        if stop == start:
+            return
+        arrived = np.arange(start, stop)
+        self.state[arrived] = WAITING
+        self._waiting = np.concatenate((self._waiting, arrived))
+        self._next_arrival = stop
+
+    def _start(self, pods: np.ndarray, worker: np.ndarray) -> None:
+        self.state[pods] = RUNNING
+        self.worker[pods] = worker
+        self.end[pods] = self.tick + self.pods.steps[pods]
+        self._running = np.concatenate((self._running, pods))
+
+    def _place_rigid(self, pods: np.ndarray, result: SimulationResult) -> None:
+        if len(pods) == 0:
+            return
+        demand = self.pods.demand[pods]
+        choice = self.rng.integers(len(self.capacity), size=len(pods))
+        admitted = admit_in_order(choice, demand, self.capacity - self.assigned)
+
+        placed, worker = pods[admitted], choice[admitted]
+        np.add.at(self.assigned, worker, demand[admitted])
+        np.add.at(self.used, worker, demand[admitted] - self.pods.slack[placed])
+        self._start(placed, worker)
+
+        n_elastic = int(self.pods.elastic[placed].sum())
+        result.satisfied_elastic += n_elastic
+        result.elastic_as_rigid += n_elastic
+        result.satisfied_rigid += len(placed) - n_elastic
+
+    def _peers(self) -> np.ndarray:
+        """Running rigid pods with some slack left in every dimension."""
+        running = self._running
+        peers = running[self.peer[running] < 0]
+        return peers[np.all(self.free_slack[peers] > 0, axis=1)]
+
+    def _place_elastic(self, pods: np.ndarray, result: SimulationResult) -> None:
+        if len(pods) == 0:
+            return
+        peers = self._peers()
+        if self.method == "BEST":
+            choice = self._best_peers(pods, peers)
+        elif self.method == "SWARM":
+            choice = self._swarm_peers(pods, peers)
+        else:
+            choice = np.full(len(pods), -1, dtype=np.int64)
+            if len(peers):
+                choice = peers[self.rng.integers(len(peers), size=len(pods))]
+
+        demand = self.pods.demand[pods]
+        found = choice >= 0
+        admitted = np.zeros(len(pods), dtype=bool)
+        admitted[found] = admit_in_order(choice[found], demand[found], self.free_slack)
+
+        placed, host = pods[admitted], choice[admitted]
+        np.subtract.at(self.free_slack, host, demand[admitted])
+        np.add.at(self.used, self.worker[host], demand[admitted])
+        self.peer[placed] = host
+        self._start(placed, self.worker[host])
+        result.satisfied_elastic += len(placed)
+
+        failed = pods[~admitted]
+        fallback = failed[self.rng.random(len(failed)) < self.gamma]
+        self.as_rigid[fallback] = True
+
+    def _swarm_peers(self, pods: np.ndarray, peers: np.ndarray) -> np.ndarray:
+        """Uniform pick among the peers sharing the pod's L/H bucket."""
+        choice = np.full(len(pods), -1, dtype=np.int64)
+        if len(peers) == 0:
+            return choice
+        buckets = n_buckets(len(self.thresholds))
+        peer_keys = self._robust(bucket_keys(self.free_slack[peers], self.thresholds))
+        pod_keys = self._robust(bucket_keys(self.pods.demand[pods], self.thresholds))
+
+        order = np.argsort(peer_keys, kind="stable")
+        counts = np.bincount(peer_keys, minlength=buckets)
+        starts = np.r_[0, np.cumsum(counts)[:-1]]
+        available = counts[pod_keys] > 0
+        offset = (
+            self.rng.random(int(available.sum())) * counts[pod_keys[available]]
+        ).astype(np.int64)
+        choice[available] = peers[order[starts[pod_keys[available]] + offset]]
+        return choice
+
+    def _robust(self, keys: np.ndarray) -> np.ndarray:
+        """Reassign a random bucket to a `slack_estimation_error` share of keys."""
+        noisy = self.rng.random(len(keys)) < self.slack_estimation_error
+        keys[noisy] = self.rng.integers(
+            n_buckets(len(self.thresholds)), size=int(noisy.sum())
+        )
+        return keys
+
+    def _best_peers(self, pods: np.ndarray, peers: np.ndarray) -> np.ndarray:
+        """
+        Full-information best fit, see `algorithms.matching_score`.
+
+        Pods with the same demand are served together: feasible peers are ranked
+        by leftover slack, then by how close their remaining steps are to the
+        pods' demand steps, and filled in that order up to the number of such
+        pods each peer's slack can host.
+        """
+        choice = np.full(len(pods), -1, dtype=np.int64)
+        if len(peers) == 0:
+            return choice
+        slack = self.free_slack[peers].copy()
+        remaining = self.end[peers] - self.tick
+        demand = self.pods.demand[pods]
+
+        classes, inverse = np.unique(demand, axis=0, return_inverse=True)
+        for c, class_demand in enumerate(classes):
+            members = np.flatnonzero(inverse.ravel() == c)
+            feasible = np.flatnonzero(np.all(slack >= class_demand, axis=1))
+            if len(feasible) == 0:
+                continue
+            leftover = (slack[feasible] - class_demand).sum(axis=1)
+            steps = np.median(self.pods.steps[pods[members]])
+            ranked = feasible[
+                np.lexsort((np.abs(remaining[feasible] - steps), leftover))
+            ]
+            with np.errstate(divide="ignore"):
+                fits = np.floor(slack[ranked] / class_demand).min(axis=1)
+            capacity = np.cumsum(np.minimum(fits, len(members)).astype(np.int64))
+            n_served = min(len(members), int(capacity[-1]))
+            slot = np.searchsorted(capacity, np.arange(n_served), side="right")
+            choice[members[:n_served]] = peers[ranked[slot]]
+            np.subtract.at(slack, ranked[slot], class_demand)
+        return choice
@@ -0,0 +1,108 @@
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Mapping, Optional
+
+from app.swarm.buckets import BucketKey
+
+if TYPE_CHECKING:
+    from app.swarm.Worker import Worker
+
+# (node, rigid pod key) of a slack entry
+Entry = tuple[str, str]
+# resource vector over the scheduler's dimensions
+Vector = tuple[float, ...]
+
+EMPTY: Mapping[Any, Any] = MappingProxyType({})
+
+
+class ClusterSnapshot:
+    """
+    Immutable, versioned view of the cluster that decisions are made against.
+
+    `SwarmScheduler` never changes a published snapshot: it builds the next
+    version next to it, copying only what changed, and swaps it in with a
+    single assignment. A decision started on one version keeps reading that
+    version however many are published meanwhile. The mappings are read-only
+    proxies of dicts that are never written after publication.
+    """
+
+    __slots__ = (
+        "version",
+        "workers_by_name",
+        "workers",
+        "params",
+        "lookup_params",
+        "lookup_table",
+        "bucket_of",
+        "entries_of",
+        "lookup_stale",
+    )
+
+    def __init__(
+        self,
+        version: int = 0,
+        workers_by_name: Mapping[str, "Worker"] = EMPTY,
+        params: Mapping[str, float] = EMPTY,
+        lookup_params: tuple[Any, ...] = (),
+        lookup_table: tuple[Mapping[Entry, dict[str, Any]], ...] = (),
+        bucket_of: Mapping[Entry, BucketKey] = EMPTY,
+        entries_of: Mapping[str, tuple[Entry, ...]] = EMPTY,
+        lookup_stale: frozenset[str] = frozenset(),
+        workers: Optional[tuple["Worker", ...]] = None,
+    ) -> None:
+        self.version = version
+        self.workers_by_name = workers_by_name
+        self.workers = (
+            workers if workers is not None else tuple(self.workers_by_name.values())
+        )
+        self.params = params
+        # (thresholds, slack_estimation_error) the lookup table was built with
+        self.lookup_params = lookup_params
+        # indexed by bucket key, (node, rigid pod key) -> entry
+        self.lookup_table = lookup_table
+        self.bucket_of = bucket_of
+        # node -> its entries in the lookup table
+        self.entries_of = entries_of
+        # nodes changed or removed since the lookup table was last patched
+        self.lookup_stale = lookup_stale
+
+    def replace(self, **changes: Any) -> "ClusterSnapshot":
+        """The next version, with `changes` applied."""
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        if "workers_by_name" in changes:
+            fields["workers"] = None
+        fields.update(changes, version=self.version + 1)
+        return ClusterSnapshot(**fields)
+
+
+def grown(
+    before: ClusterSnapshot, after: ClusterSnapshot
+) -> tuple[list[Vector], list[Vector]]:
+    """
+    What can host more in `after` than in `before`: the free resources of the
+    nodes that were added or have more free resources, and the slack of the
+    entries that were added or grew. Only the workers that changed are looked
+    at.
+    """
+    free: list[Vector] = []
+    slack: list[Vector] = []
+    previous_workers = before.workers_by_name
+    for name, worker in after.workers_by_name.items():
+        previous = previous_workers.get(name)
+        if previous is worker:
+            continue
+        available = tuple(
+            capacity - used
+            for capacity, used in zip(worker.resource_capacity, worker.usage)
+        )
+        if previous is None or any(
+            now > capacity - used
+            for now, capacity, used in zip(
+                available, previous.resource_capacity, previous.usage
+            )
+        ):
+            free.append(available)
+        for pod_key, vector in worker.slack.items():
+            was = previous.slack.get(pod_key) if previous is not None else None
+            if was is None or any(now > then for now, then in zip(vector, was)):
+                slack.append(vector)
+    return free, slack
@@ -0,0 +1,140 @@
+from typing import Callable, Optional, Sequence
+
+import threading
+import time
+
+
+class P2Quantile:
+    """
+    Streaming estimate of one quantile with the P-square algorithm
+    (Jain & Chlamtac, 1985): five markers, O(1) time and memory per observation.
+    """
+
+    def __init__(self, p: float) -> None:
+        self.p = p
+        self.n = 0
+        self.heights: list[float] = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        q = self.heights
+        if self.n <= 5:
+            q.append(x)
+            q.sort()
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                height = self._parabolic(i, step)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+                q[i] = height
+                n[i] += step
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self) -> Optional[float]:
+        if self.n == 0:
+            return None
+        if self.n <= 5:
+            return self.heights[round(self.p * (self.n - 1))]
+        return self.heights[2]
+
+
+class WindowedQuantile:
+    """
+    P-square estimate over roughly the last `window` to `2 * window` observations,
+    so the estimate follows a changing distribution.
+    """
+
+    def __init__(self, p: float, window: int) -> None:
+        self.p = p
+        self.window = window
+        self.active = P2Quantile(p)
+        self.standby = P2Quantile(p)
+
+    def add(self, x: float) -> None:
+        self.active.add(x)
+        if self.active.n > self.window:
+            self.standby.add(x)
+        if self.active.n >= 2 * self.window:
+            self.active, self.standby = self.standby, P2Quantile(self.p)
+
+    def value(self) -> Optional[float]:
+        return self.active.value()
+
+    @property
+    def n(self) -> int:
+        return self.active.n
+
+
+class ThresholdEstimator:
+    """
+    Local estimate of the L/H bucket thresholds (alpha, beta, ...).
+
+    Every observed resource vector, rigid-pod slack as well as elastic demand,
+    updates a per-dimension quantile estimate. With the default median the L and
+    H side of every dimension receive about the same number of entries. The
+    thresholds handed out are recomputed at most every `refresh_seconds`.
+    """
+
+    def __init__(
+        self,
+        dimensions: int = 2,
+        quantile: float = 0.5,
+        window: int = 10_000,
+        min_observations: int = 5,
+        refresh_seconds: float = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.min_observations = min_observations
+        self.refresh_seconds = refresh_seconds
+        self.clock = clock
+        self.estimates = [WindowedQuantile(quantile, window) for _ in range(dimensions)]
+        self._lock = threading.Lock()
+        # (thresholds, when they were computed)
+        self._last: Optional[tuple[tuple[float, ...], float]] = None
+
+    def observe(self, values: Sequence[float]) -> None:
+        with self._lock:
+            for estimate, value in zip(self.estimates, values):
+                estimate.add(float(value))
+
+    @property
+    def ready(self) -> bool:
+        return all(e.n >= self.min_observations for e in self.estimates)
+
+    def thresholds(self) -> tuple[float, ...]:
+        now = self.clock()
+        with self._lock:
+            if self._last is None or now - self._last[1] >= self.refresh_seconds:
+                values = tuple(float(e.value() or 0.0) for e in self.estimates)
+                self._last = (values, now)
+            return self._last[0]
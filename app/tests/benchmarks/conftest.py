@@ -0,0 +1,116 @@
+"""
+Benchmarks of the scheduler hot paths, run at every number of nodes and pods in
+`BENCHMARK_SCALES` (default 10,100; e.g. 10,100,1000,10000) for
+`BENCHMARK_ROUNDS` measured rounds each. With `BENCHMARK_JSON=PATH` the timings
+are written to PATH as JSON, for comparing releases.
+"""
+
+from typing import Any, Callable, Iterator, Optional
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+import pytest
+from pytest_mock import MockerFixture
+
+from .fake_api import FakeOrchestrationAPI
+
+DEFAULT_SCALES = "10,100"
+RESULTS = pytest.StashKey[list[dict[str, Any]]]()
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.stash[RESULTS] = []
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    if "scale" in metafunc.fixturenames:
+        scales = os.getenv("BENCHMARK_SCALES", DEFAULT_SCALES)
+        metafunc.parametrize("scale", [int(s) for s in scales.split(",") if s])
+
+
+class Benchmark:
+    def __init__(self, name: str, scale: Optional[int], rounds: int) -> None:
+        self.name = name
+        self.scale = scale
+        self.rounds = rounds
+        self.result: Optional[dict[str, Any]] = None
+
+    def __call__(
+        self,
+        fn: Callable[[], Any],
+        setup: Optional[Callable[[], Any]] = None,
+        rounds: Optional[int] = None,
+    ) -> Any:
+        """Time `fn` after one warm-up call; `setup` runs untimed before each."""
+        if setup is not None:
+            setup()
+        value = fn()
+        samples = []
+        for _ in range(rounds or self.rounds):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        self.result = {
+            "name": self.name,
+            "scale": self.scale,
+            "rounds": len(samples),
+            "min_s": min(samples),
+            "median_s": statistics.median(samples),
+            "mean_s": statistics.fmean(samples),
+            "max_s": max(samples),
+        }
+        return value
+
+
+@pytest.fixture
+def benchmark(request: pytest.FixtureRequest) -> Iterator[Benchmark]:
+    params = dict(request.node.callspec.params)
+    scale = params.pop("scale", None)
+    name = request.node.originalname
+    if params:
+        name += "[" + "-".join(str(v) for v in params.values()) + "]"
+    bench = Benchmark(name, scale, int(os.getenv("BENCHMARK_ROUNDS", "5")))
+    yield bench
+    if bench.result is not None:
+        request.config.stash[RESULTS].append(bench.result)
+
+
+@pytest.fixture
+def fake_api(mocker: MockerFixture, scale: int) -> FakeOrchestrationAPI:
+    api = FakeOrchestrationAPI(n_nodes=scale, n_pods=scale)
+    api.install(mocker)
+    return api
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    path = os.getenv("BENCHMARK_JSON")
+    results = session.config.stash[RESULTS]
+    if not path or not results:
+        return
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "commit": _commit(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "benchmarks": results,
+            },
+            f,
+            indent=2,
+        )
@@ -0,0 +1,145 @@
+from typing import Any, Iterator, Optional
+
+import gzip
+import hashlib
+import json
+import random
+from urllib.parse import urlparse
+
+from pytest_mock import MockerFixture
+
+
+class FakeResponse:
+    def __init__(
+        self,
+        body: Any,
+        status_code: int = 200,
+        headers: Optional[dict[str, str]] = None,
+        content: Optional[bytes] = None,
+    ) -> None:
+        self.status_code = status_code
+        self.headers = headers or {}
+        # decoded, as requests does for a gzip Content-Encoding
+        self.content = json.dumps(body).encode() if content is None else content
+        self.text = self.content.decode()
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start : start + chunk_size]
+
+    def __enter__(self) -> "FakeResponse":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+class FakeOrchestrationAPI:
+    """
+    In-process stand-in for the orchestration API and the pod metrics API,
+    serving a generated cluster of `n_nodes` nodes and `n_pods` pods.
+
+    Like the orchestration API, responses carry an ETag of their content and
+    are not sent again (304) to a request with a matching `If-None-Match`, and
+    they are gzip-encoded for requests that accept it; `conditional` and
+    `compress` turn either off. `bytes_sent` counts the body bytes on the wire.
+    """
+
+    def __init__(
+        self,
+        n_nodes: int,
+        n_pods: int,
+        seed: int = 0,
+        conditional: bool = True,
+        compress: bool = True,
+    ) -> None:
+        self.conditional = conditional
+        self.compress = compress
+        self.bytes_sent = 0
+        self.not_modified = 0
+        # content digest -> gzip-encoded size
+        self._gzipped: dict[str, int] = {}
+        rng = random.Random(seed)
+        self.nodes = [
+            {
+                "name": f"node-{i}",
+                "id": f"id-{i}",
+                "usage": {"cpu": f"{rng.randint(0, 8000)}m", "memory": "12Gi"},
+                "capacity": {"cpu": "16", "memory": "64Gi"},
+                "allocatable": {"cpu": "15800m", "memory": "62Gi"},
+            }
+            for i in range(n_nodes)
+        ]
+        self.pods: list[dict[str, Any]] = []
+        for i in range(n_pods):
+            rigid = i % 2 == 0
+            cpu, memory = f"{rng.randint(1, 40) * 50}m", f"{rng.randint(1, 32) * 64}Mi"
+            self.pods.append(
+                {
+                    "uid": f"uid-pod-{i}",
+                    "name": f"pod-{i}",
+                    "namespace": "default",
+                    "node_name": f"node-{rng.randrange(max(n_nodes, 1))}",
+                    "status": "Running",
+                    "containers": [
+                        {
+                            "cpu_request": cpu,
+                            "memory_request": memory,
+                            "cpu_limit": cpu if rigid else None,
+                            "memory_limit": memory if rigid else None,
+                        }
+                    ],
+                }
+            )
+        self.metrics = {
+            "items": [
+                {
+                    "metadata": {"namespace": pod["namespace"], "name": pod["name"]},
+                    "containers": [
+                        {"usage": {"cpu": f"{rng.randint(0, 50)}m", "memory": "32Mi"}}
+                    ],
+                }
+                for pod in self.pods
+            ]
+        }
+        self.parameters = [{"alpha": 1.0, "beta": 1024.0, "gamma": 0.5}]
+
+    def get(
+        self, url: str, headers: Optional[dict[str, str]] = None, **kwargs: Any
+    ) -> FakeResponse:
+        path = urlparse(url).path
+        if path == "/k8s_node":
+            return self.respond(self.nodes, headers or {})
+        if path == "/k8s_pod":
+            return self.respond(self.pods, headers or {})
+        if path.startswith("/tuning_parameters/"):
+            return self.respond(self.parameters, headers or {})
+        return FakeResponse({"detail": "Not Found"}, status_code=404)
+
+    def respond(self, body: Any, headers: dict[str, str]) -> FakeResponse:
+        content = json.dumps(body).encode()
+        digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+        response_headers = {}
+        if self.conditional:
+            response_headers["ETag"] = f'"{digest}"'
+            if headers.get("If-None-Match") == response_headers["ETag"]:
+                self.not_modified += 1
+                return FakeResponse(None, 304, response_headers, content=b"")
+
+        size = len(content)
+        if self.compress and "gzip" in headers.get("Accept-Encoding", ""):
+            response_headers["Content-Encoding"] = "gzip"
+            if digest not in self._gzipped:
+                self._gzipped[digest] = len(gzip.compress(content))
+            size = self._gzipped[digest]
+        self.bytes_sent += size
+        return FakeResponse(body, headers=response_headers, content=content)
+
+    def install(self, mocker: MockerFixture) -> None:
+        mocker.patch("requests.get", side_effect=self.get)
+        custom_objects = mocker.Mock()
+        custom_objects.list_cluster_custom_object.return_value = self.metrics
+        mocker.patch("app.k8s.clients.custom_objects", return_value=custom_objects)
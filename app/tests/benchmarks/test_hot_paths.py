@@ -0,0 +1,228 @@
+from types import SimpleNamespace
+from typing import Any, Callable
+
+import random
+
+import pytest
+from kubernetes.utils.quantity import parse_quantity as kubernetes_parse_quantity
+from pytest_mock import MockerFixture
+
+from ... import orchestration, quantity, scheduler, utils
+from ...schemas import NodeDetail, NodeResources
+from ...swarm import pod_profiles
+from ...swarm.SwarmScheduler import SwarmScheduler
+from ...swarm.Worker import Worker
+from ..fakes import make_node, make_pod
+from .conftest import Benchmark
+from .fake_api import FakeOrchestrationAPI
+
+pytestmark = pytest.mark.benchmark
+
+QUANTITIES = ["250m", "1", "1.5", "512Mi", "2Gi", "128974848", "1e3", "64Ki"]
+
+
+def cluster(scale: int, slack_per_node: int = 4) -> dict[str, NodeDetail]:
+    rng = random.Random(scale)
+    return {
+        f"node-{i}": make_node(
+            f"node-{i}",
+            cpu=16,
+            memory=65536,
+            used_cpu=rng.uniform(0, 8),
+            used_memory=rng.uniform(0, 32768),
+            slack={
+                f"ns;pod-{i}-{j}": (rng.uniform(0, 2), rng.uniform(0, 2048))
+                for j in range(slack_per_node)
+            },
+        )
+        for i in range(scale)
+    }
+
+
+def model_of(nodes: dict[str, NodeDetail], method: str = "SWARM") -> SwarmScheduler:
+    model = SwarmScheduler(method=method)
+    model.params = {"alpha": 1.0, "beta": 1024.0, "gamma": 0.5}
+    model.set_workers(nodes)
+    return model
+
+
+@pytest.mark.parametrize("parser", ["kubernetes", "uncached", "cached"])
+def test_parse_quantity(benchmark: Benchmark, scale: int, parser: str) -> None:
+    """Parse `scale` requests (few distinct values) and usages (all distinct)."""
+    rng = random.Random(scale)
+    quantities = [QUANTITIES[i % len(QUANTITIES)] for i in range(scale)] + [
+        f"{rng.randrange(10**9)}n" if i % 2 else f"{rng.randrange(10**8)}Ki"
+        for i in range(scale)
+    ]
+    parse: Callable[[str], float]
+    if parser == "kubernetes":
+        parse = lambda q: float(kubernetes_parse_quantity(q))  # noqa: E731
+    elif parser == "uncached":
+        parse = lambda q: quantity._parse_nanos(q) / quantity.NANO  # noqa: E731
+    else:
+        parse = utils.parse_quantity
+    values = benchmark(lambda: [parse(q) for q in quantities])
+    assert values == [float(kubernetes_parse_quantity(q)) for q in quantities]
+
+
+def test_node_resources_validation(benchmark: Benchmark, scale: int) -> None:
+    raw = [{"cpu": f"{i % 16000}m", "memory": f"{i % 64}Gi"} for i in range(scale)]
+    benchmark(lambda: [NodeResources.model_validate(r) for r in raw])
+
+
+def test_get_node_details(
+    benchmark: Benchmark, fake_api: FakeOrchestrationAPI, mocker: MockerFixture
+) -> None:
+    mocker.patch.object(scheduler, "state", None)
+    nodes = benchmark(
+        lambda: scheduler.get_node_details(get_slack=False),
+        setup=orchestration.client.clear,
+    )
+    assert len(nodes) == len(fake_api.nodes)
+
+
+def test_compute_node_slack(
+    benchmark: Benchmark, fake_api: FakeOrchestrationAPI
+) -> None:
+    slack = benchmark(utils.compute_node_slack, setup=orchestration.client.clear)
+    assert sum(len(s) for s in slack.values()) == (len(fake_api.pods) + 1) // 2
+
+
+@pytest.mark.parametrize("fetch", ["full", "conditional"])
+def test_refetch_unchanged_cluster(
+    benchmark: Benchmark, mocker: MockerFixture, scale: int, fetch: str
+) -> None:
+    """
+    Nodes and slack of a cluster that didn't change since the last fetch, from
+    an API without ETags and compression or with both.
+    """
+    api = FakeOrchestrationAPI(
+        n_nodes=scale,
+        n_pods=scale,
+        conditional=fetch == "conditional",
+        compress=fetch == "conditional",
+    )
+    api.install(mocker)
+    mocker.patch.object(orchestration, "client", orchestration.OrchestrationClient())
+    mocker.patch.object(scheduler, "state", None)
+    sent: list[int] = []
+
+    def refetch() -> dict[str, NodeDetail]:
+        before = api.bytes_sent
+        nodes = scheduler.get_node_details(get_slack=True)
+        sent.append(api.bytes_sent - before)
+        return nodes
+
+    assert len(benchmark(refetch)) == scale
+    assert benchmark.result is not None
+    benchmark.result["bytes_per_round"] = sent[-1]
+    assert (sent[-1] == 0) == (fetch == "conditional")
+
+
+def test_create_lookup_table(benchmark: Benchmark, scale: int) -> None:
+    model = model_of(cluster(scale))
+
+    def rebuild() -> None:
+        model.snapshot = model.snapshot.replace(lookup_params=())
+
+    benchmark(lambda: model.create_lookup_table((1.0, 1024.0), 0.2), setup=rebuild)
+    assert len(model.bucket_of) == 4 * scale
+
+
+def test_generate_key(benchmark: Benchmark, scale: int) -> None:
+    model = SwarmScheduler()
+    rng = random.Random(scale)
+    values = [(rng.uniform(0, 2), rng.uniform(0, 2048)) for _ in range(scale)]
+    benchmark(lambda: [model.generate_key(v, (1.0, 1024.0), 0.2) for v in values])
+
+
+@pytest.mark.parametrize(
+    "method, pod_class", [("RND", "rigid"), ("SWARM", "rigid"), ("SWARM", "elastic")]
+)
+def test_select_node(
+    benchmark: Benchmark,
+    fake_api: FakeOrchestrationAPI,
+    scale: int,
+    method: str,
+    pod_class: str,
+) -> None:
+    model = model_of(cluster(scale), method=method)
+    pods = [
+        make_pod(
+            f"p{i}",
+            cpu=f"{50 * (i % 10 + 1)}m",
+            memory="128Mi",
+            rigid=pod_class == "rigid",
+        )
+        for i in range(scale)
+    ]
+
+    choices = benchmark(lambda: [model.select_node(pod) for pod in pods])
+    # the pods are small enough for the free capacity or slack of some node
+    assert all(choice in model.workers_by_name for choice in choices)
+
+
+@pytest.mark.parametrize("method", ["SWARM", "BINPACK"])
+def test_place_backlog(benchmark: Benchmark, scale: int, method: str) -> None:
+    """Decide on and commit a backlog of `scale` rigid pods."""
+    nodes = cluster(scale)
+    pods = [make_pod(f"p{i}", cpu=f"{250 * (i % 8 + 1)}m") for i in range(scale)]
+    model = model_of(nodes, method=method)
+
+    def reset() -> None:
+        model.set_workers({name: node.model_copy() for name, node in nodes.items()})
+
+    def place_all() -> int:
+        if method == "BINPACK":
+            model.plan(pods)
+        placed = set()
+        for pod in pods:
+            try:
+                node = model.select_node(pod)
+            except Exception:
+                continue
+            if node is not None and model.commit(pod, node):
+                placed.add(node)
+        return len(placed)
+
+    assert benchmark(place_all, setup=reset) > 0
+
+
+@pytest.mark.parametrize("generator", ["get_pod_profile", "generate_pods"])
+def test_generate_workload(benchmark: Benchmark, scale: int, generator: str) -> None:
+    """Draw 100 pods per unit of scale, one at a time or at once."""
+    n_pods = 100 * scale
+    if generator == "generate_pods":
+        pods = benchmark(lambda: pod_profiles.generate_pods(n_pods))
+    else:
+        pods = benchmark(
+            lambda: [pod_profiles.get_pod_profile() for _ in range(n_pods)]
+        )
+    assert len(pods) == n_pods
+
+
+def test_worker_accounting(benchmark: Benchmark, scale: int) -> None:
+    model = model_of(cluster(scale))
+    workers = list(model.workers_by_name.values())
+    pods: list[Any] = [
+        SimpleNamespace(
+            demand=(0.1, 64.0),
+            demand_slack=[0.05, 32.0],
+            assigned_worker=None,
+            assigned_cpu=0.0,
+            assigned_mem=0.0,
+            is_elastic=False,
+        )
+        for _ in range(scale)
+    ]
+
+    def accept_and_release() -> None:
+        placed = []
+        for i, pod in enumerate(pods):
+            worker: Worker = workers[i % len(workers)]
+            if worker.accept_as_rigid(pod):
+                placed.append((worker, pod))
+        for worker, pod in placed:
+            worker.release_resources(pod)
+
+    benchmark(accept_and_release)
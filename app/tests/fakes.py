@@ -0,0 +1,84 @@
+from typing import Optional
+
+from kubernetes.client import (
+    V1Container,
+    V1ObjectMeta,
+    V1OwnerReference,
+    V1Pod,
+    V1PodSpec,
+    V1ResourceRequirements,
+)
+
+from app.schemas import NodeDetail
+
+
+def make_pod(
+    name: str,
+    cpu: str = "500m",
+    memory: str = "256Mi",
+    rigid: bool = True,
+    owner: Optional[str] = None,
+    namespace: str = "default",
+    extended: Optional[dict[str, str]] = None,
+) -> V1Pod:
+    resources = {"cpu": cpu, "memory": memory, **(extended or {})}
+    owner_references = None
+    if owner is not None:
+        owner_references = [
+            V1OwnerReference(
+                api_version="apps/v1",
+                kind="ReplicaSet",
+                name=f"rs-{owner}",
+                uid=owner,
+                controller=True,
+            )
+        ]
+    return V1Pod(
+        metadata=V1ObjectMeta(
+            name=name,
+            namespace=namespace,
+            uid=f"uid-{name}",
+            owner_references=owner_references,
+        ),
+        spec=V1PodSpec(
+            containers=[
+                V1Container(
+                    name="main",
+                    resources=V1ResourceRequirements(
+                        limits=resources if rigid else None,
+                        requests=resources,
+                    ),
+                )
+            ],
+            scheduler_name="resource-management-service",
+        ),
+    )
+
+
+def make_node(
+    name: str,
+    cpu: float = 4,
+    memory: float = 8192,
+    used_cpu: float = 0,
+    used_memory: float = 0,
+    slack: Optional[dict[str, tuple[float, float]]] = None,
+) -> NodeDetail:
+    """NodeDetail with `memory`/`used_memory`/`slack` given in MiB."""
+    mib = 1024**2
+    return NodeDetail.model_validate(
+        {
+            "name": name,
+            "id": f"id-{name}",
+            "usage": {"cpu": used_cpu, "memory": used_memory * mib},
+            "capacity": {"cpu": cpu, "memory": memory * mib},
+            "allocatable": {"cpu": cpu, "memory": memory * mib},
+            "slack": (
+                {
+                    pod: {"cpu": cpu_slack, "memory": mem_slack * mib}
+                    for pod, (cpu_slack, mem_slack) in slack.items()
+                }
+                if slack is not None
+                else None
+            ),
+        }
+    )
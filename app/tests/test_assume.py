@@ -0,0 +1,124 @@
+from pathlib import Path
+
+from .. import assume
+from ..state import SchedulerState
+from ..swarm.Worker import NodeGenerations
+from .fakes import make_node, make_pod
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestAssumeCache:
+    def test_assumed_demand_is_charged_to_the_node(self) -> None:
+        cache = assume.AssumeCache(ttl=30)
+        nodes = {"a": make_node("a", used_cpu=1), "b": make_node("b")}
+
+        cache.assume(make_pod("p1", cpu="500m", memory="256Mi"), "a")
+        cache.assume(make_pod("p2", cpu="1", memory="1Gi"), "a")
+        charged = cache.apply(nodes)
+
+        assert charged["a"].usage.cpu == 2.5
+        assert charged["a"].usage.memory == 1280
+        assert charged["b"] is nodes["b"]
+        # the snapshot itself is left alone
+        assert nodes["a"].usage.cpu == 1
+
+    def test_every_requested_resource_is_charged(self) -> None:
+        cache = assume.AssumeCache(ttl=30)
+        node = make_node("a")
+        node.usage = node.usage.model_copy(update={"nvidia.com/gpu": "1"})
+
+        cache.assume(make_pod("p1", extended={"nvidia.com/gpu": "2"}), "a")
+        usage = cache.apply({"a": node})["a"].usage
+
+        assert usage.vector(("cpu", "nvidia.com/gpu")) == (0.5, 3.0)
+
+    def test_charged_nodes_keep_a_derived_generation(self) -> None:
+        generations = NodeGenerations()
+        cache = assume.AssumeCache(ttl=30, generations=generations)
+        nodes = {"a": make_node("a")}
+        generations.stamp(nodes)
+
+        cache.assume(make_pod("p1"), "a")
+        first = cache.apply(nodes)["a"].generation
+        assert first is not None and first != nodes["a"].generation
+        assert cache.apply(nodes)["a"].generation == first
+        cache.assume(make_pod("p2"), "a")
+        assert cache.apply(nodes)["a"].generation not in (first, None)
+
+    def test_confirm_and_forget_release_the_charge(self) -> None:
+        cache = assume.AssumeCache(ttl=30)
+        nodes = {"a": make_node("a")}
+        p1, p2 = make_pod("p1"), make_pod("p2")
+        cache.assume(p1, "a")
+        cache.assume(p2, "a")
+
+        cache.confirm("uid-p1")
+        assert cache.apply(nodes)["a"].usage.cpu == 0.5
+        cache.forget("uid-p2")
+        assert cache.apply(nodes)["a"].usage.cpu == 0
+        assert len(cache) == 0
+
+    def test_charge_expires(self) -> None:
+        clock = FakeClock()
+        cache = assume.AssumeCache(ttl=30, clock=clock)
+        cache.assume(make_pod("p1"), "a")
+
+        clock.now += 29
+        assert cache.apply({"a": make_node("a")})["a"].usage.cpu == 0.5
+        clock.now += 1
+        assert cache.apply({"a": make_node("a")})["a"].usage.cpu == 0
+
+    def test_dropped_charges_are_released(self) -> None:
+        clock = FakeClock()
+        released = []
+        cache = assume.AssumeCache(
+            ttl=30, clock=clock, on_release=lambda: released.append(True)
+        )
+        cache.assume(make_pod("p1"), "a")
+        cache.assume(make_pod("p2"), "a")
+        cache.assume(make_pod("p3"), "a")
+
+        cache.confirm("uid-p1")
+        assert released == []
+        cache.forget("uid-p2")
+        assert released == [True]
+        clock.now += 30
+        cache.expire()
+        assert released == [True, True]
+
+    def test_unknown_nodes_are_ignored(self) -> None:
+        cache = assume.AssumeCache(ttl=30)
+        cache.assume(make_pod("p1"), "gone")
+        assert cache.apply({"a": make_node("a")})["a"].usage.cpu == 0
+
+    def test_assumed_pods_survive_a_restart(self, tmp_path: Path) -> None:
+        path = str(tmp_path / "state.bin")
+        cache = assume.AssumeCache(ttl=30)
+        cache.attach(SchedulerState.open(path))
+        cache.assume(make_pod("p1"), "a")
+
+        restored = assume.AssumeCache(ttl=30)
+        restored.attach(SchedulerState.open(path))
+        assert restored.apply({"a": make_node("a")})["a"].usage.cpu == 0.5
+
+        restored.confirm("uid-p1")
+        assert SchedulerState.open(path).reservations() == {}
+
+    def test_reservations_of_cpu_and_memory_are_restored(self, tmp_path: Path) -> None:
+        path = str(tmp_path / "state.bin")
+        state = SchedulerState.open(path)
+        state.set_reservation(
+            "uid-p1", {"node": "a", "cpu": 0.5, "memory": 256, "expires_at": 1e12}
+        )
+
+        cache = assume.AssumeCache(ttl=30)
+        cache.attach(state)
+        usage = cache.apply({"a": make_node("a")})["a"].usage
+        assert (usage.cpu, usage.memory) == (0.5, 256)
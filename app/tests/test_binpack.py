@@ -0,0 +1,79 @@
+import numpy as np
+
+from ..swarm import binpack
+from ..swarm.SwarmScheduler import SwarmScheduler
+from .fakes import make_node, make_pod
+
+
+class TestPack:
+    def test_largest_demands_first(self) -> None:
+        demands = np.array([[1.0, 1.0], [3.0, 3.0], [2.0, 2.0], [2.0, 2.0]])
+        assignment, free = binpack.pack(demands, np.array([[4.0, 4.0], [4.0, 4.0]]))
+        # 3 + 1 and 2 + 2 fill both bins exactly
+        assert assignment[0] == assignment[1] != assignment[2] == assignment[3]
+        assert (free == 0).all()
+
+    def test_best_fit_takes_the_tightest_bin(self) -> None:
+        free = np.array([[4.0, 4.0], [1.0, 1.0], [2.0, 2.0]])
+        demands = np.array([[1.0, 1.0]])
+        best, _ = binpack.pack(demands, free)
+        first, _ = binpack.pack(demands, free, strategy=binpack.FIRST_FIT)
+        assert best.tolist() == [1]
+        assert first.tolist() == [0]
+
+    def test_every_dimension_must_fit(self) -> None:
+        assignment, free = binpack.pack(
+            np.array([[1.0, 3.0], [3.0, 1.0]]), np.array([[4.0, 2.0]])
+        )
+        assert assignment.tolist() == [-1, 0]
+        assert free.tolist() == [[1.0, 1.0]]
+
+
+class TestBinpackMethod:
+    def model(self, binpack_slack: bool = True) -> SwarmScheduler:
+        return SwarmScheduler(method="BINPACK", binpack_slack=binpack_slack)
+
+    def test_batch_uses_the_fewest_nodes(self) -> None:
+        model = self.model()
+        model.set_workers({f"n{i}": make_node(f"n{i}", cpu=4) for i in range(4)})
+        pods = [make_pod(f"p{i}", cpu="1") for i in range(8)]
+
+        nodes = model.select_nodes(pods)
+        assert None not in nodes
+        assert len(set(nodes)) == 2
+
+    def test_pods_that_do_not_fit(self) -> None:
+        model = self.model()
+        model.set_workers({"a": make_node("a", cpu=4)})
+        nodes = model.select_nodes([make_pod("big", cpu="3"), make_pod("p", cpu="2")])
+        assert nodes == ["a", None]
+
+    def test_elastic_pods_go_into_slack(self) -> None:
+        nodes = {
+            "slack": make_node("slack", cpu=4, used_cpu=4, slack={"ns;r": (2, 1024)}),
+            "free": make_node("free", cpu=4),
+        }
+        pods = [
+            make_pod(f"e{i}", cpu="1", memory="256Mi", rigid=False) for i in range(3)
+        ]
+
+        model = self.model()
+        model.set_workers(nodes)
+        assert model.select_nodes(pods) == ["slack", "slack", "free"]
+
+        model = self.model(binpack_slack=False)
+        model.set_workers(nodes)
+        assert model.select_nodes(pods) == ["free", "free", "free"]
+
+    def test_select_node_follows_the_plan(self) -> None:
+        model = self.model()
+        model.set_workers({"a": make_node("a", cpu=2), "b": make_node("b", cpu=4)})
+        pods = [
+            make_pod("p1", cpu="2"),
+            make_pod("p2", cpu="2"),
+            make_pod("p3", cpu="2"),
+        ]
+        model.plan(pods)
+
+        # one at a time, without commits in between, all three would get "a"
+        assert sorted(model.select_node(pod) for pod in pods) == ["a", "b", "b"]
@@ -0,0 +1,25 @@
+import numpy as np
+
+from ..swarm import buckets
+
+
+class TestBucketKeys:
+    def test_bits_follow_the_dimensions(self) -> None:
+        thresholds = (2, 2, 2)
+        assert buckets.bucket_key((1, 1, 1), thresholds) == 0
+        assert buckets.bucket_key((3, 1, 1), thresholds) == 0b001
+        assert buckets.bucket_key((1, 2, 3), thresholds) == 0b110
+        assert buckets.key_label(0b110, 3) == "LHH"
+
+    def test_vectorized_keys_match(self) -> None:
+        rng = np.random.default_rng(3)
+        values = rng.uniform(0, 4, size=(200, 4))
+        thresholds = (1.0, 2.0, 3.0, 0.5)
+        assert buckets.bucket_keys(values, thresholds).tolist() == [
+            buckets.bucket_key(row, thresholds) for row in values
+        ]
+
+    def test_neighbor_keys(self) -> None:
+        # LHL: raising cpu or storage first, then lowering memory
+        assert buckets.neighbor_keys(0b010, 3) == [0b011, 0b110, 0b000]
+        assert buckets.neighbor_keys(0b11, 2) == [0b10, 0b01]
@@ -0,0 +1,63 @@
+from pytest_mock import MockerFixture
+
+from .. import demand
+from ..swarm.buckets import key_label
+from .fakes import make_pod
+
+
+class TestDemandCache:
+    def test_replicas_share_one_entry(self, mocker: MockerFixture) -> None:
+        compute = mocker.Mock(side_effect=demand.PodDemand.from_pod)
+        cache = demand.DemandCache(compute=compute)
+
+        pods = [make_pod(f"web-{i}", cpu="250m", owner="rs-1") for i in range(50)]
+        demands = [cache.get(pod) for pod in pods]
+
+        assert compute.call_count == 1
+        assert all(d is demands[0] for d in demands)
+        assert cache.hits == 49 and cache.misses == 1
+        assert demands[0].cpu == 0.25
+        assert demands[0].memory == 256
+        assert demands[0].pod_class == "rigid"
+
+    def test_template_change_is_a_new_entry(self) -> None:
+        cache = demand.DemandCache()
+        small = cache.get(make_pod("a", cpu="250m", owner="rs-1"))
+        large = cache.get(make_pod("b", cpu="2", owner="rs-1"))
+        elastic = cache.get(make_pod("c", cpu="2", owner="rs-1", rigid=False))
+
+        assert small.cpu == 0.25 and large.cpu == 2
+        assert elastic.pod_class == "elastic"
+        assert len(cache) == 3
+
+    def test_owners_are_kept_apart(self) -> None:
+        cache = demand.DemandCache()
+        cache.get(make_pod("a", owner="rs-1"))
+        cache.get(make_pod("b", owner="rs-2"))
+        cache.get(make_pod("c"))
+        assert len(cache) == 3
+
+    def test_bounded(self) -> None:
+        cache = demand.DemandCache(maxsize=2)
+        for i in range(5):
+            cache.get(make_pod(f"p{i}", owner=f"rs-{i}"))
+        assert len(cache) == 2
+
+    def test_bucket_key_is_memoized(self) -> None:
+        pod_demand = demand.PodDemand(cpu=0.5, memory=4096, pod_class="elastic")
+        key = pod_demand.bucket_key((1.0, 1024.0))
+        assert key_label(key, 2) == "LH"
+        assert pod_demand.bucket_key((1.0, 1024.0)) is key
+        assert key_label(pod_demand.bucket_key((0.1, 8192.0)), 2) == "HL"
+
+    def test_extended_resources(self) -> None:
+        pod = make_pod(
+            "gpu", extended={"nvidia.com/gpu": "2", "ephemeral-storage": "1Gi"}
+        )
+        pod_demand = demand.PodDemand.from_pod(pod)
+
+        assert pod_demand.extended == {
+            "nvidia.com/gpu": 2.0,
+            "ephemeral-storage": 1024.0,
+        }
+        assert pod_demand.vector == (0.5, 256.0)
@@ -0,0 +1,22 @@
+import json
+
+import pytest
+
+from .. import fastjson
+
+
+class TestIterArray:
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1024])
+    def test_any_chunking(self, chunk_size: int) -> None:
+        values = [{"name": "pód", "containers": [{"cpu": "1"}]}, 12345, "x", None, []]
+        data = json.dumps(values, ensure_ascii=False, indent=1).encode()
+        chunks = [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)]
+        assert list(fastjson.iter_array(chunks)) == values
+
+    def test_empty(self) -> None:
+        assert list(fastjson.iter_array([b" [ ", b"]"])) == []
+
+    @pytest.mark.parametrize("data", [b'{"a": 1}', b'[{"a": 1}', b"[1, 2"])
+    def test_invalid(self, data: bytes) -> None:
+        with pytest.raises(ValueError):
+            list(fastjson.iter_array([data]))
@@ -0,0 +1,127 @@
+from pytest_mock import MockerFixture
+
+from ..schemas import NodeDetail
+from ..swarm.feasibility import FeasibilityCache, elastic_fits
+from ..swarm.SwarmScheduler import SwarmScheduler
+from ..swarm.Worker import Worker
+from .fakes import make_node, make_pod
+
+
+def workers_of(model: SwarmScheduler, *nodes: NodeDetail) -> list[Worker]:
+    return [Worker(model, node.name, node) for node in nodes]
+
+
+class TestFeasibilityCache:
+    def test_feasible_nodes(self) -> None:
+        model = SwarmScheduler()
+        cache = FeasibilityCache()
+        cache.sync(
+            workers_of(
+                model,
+                make_node("a", cpu=4, used_cpu=3.5),
+                make_node("b", cpu=4, used_cpu=1),
+                make_node("c", cpu=8),
+            )
+        )
+        assert sorted(cache.feasible_nodes((1.0, 512.0))) == ["b", "c"]
+        assert cache.feasible_nodes((16.0, 512.0)) == []
+
+    def test_feasible_slack(self) -> None:
+        model = SwarmScheduler()
+        cache = FeasibilityCache()
+        cache.sync(
+            workers_of(
+                model,
+                make_node("a", slack={"ns;big": (2, 1024), "ns;small": (0.1, 64)}),
+                make_node("b", slack={"ns;mid": (1, 512)}),
+                make_node("c"),
+            )
+        )
+        assert sorted(cache.feasible_slack((0.5, 256.0))) == [
+            ("a", "ns;big"),
+            ("b", "ns;mid"),
+        ]
+
+    def test_only_changed_nodes_are_reevaluated(self, mocker: MockerFixture) -> None:
+        model = SwarmScheduler()
+        cache = FeasibilityCache()
+        nodes = [make_node(f"n{i}", cpu=4) for i in range(10)]
+        cache.sync(workers_of(model, *nodes))
+        cache.feasible_nodes((1.0, 512.0))
+
+        rigid_fits = mocker.patch(
+            "app.swarm.feasibility.rigid_fits", side_effect=lambda w, d: False
+        )
+        nodes[3] = make_node("n3", cpu=4, used_cpu=3.5)
+        cache.sync(workers_of(model, *nodes))
+        feasible = cache.feasible_nodes((1.0, 512.0))
+
+        rigid_fits.assert_called_once()
+        assert "n3" not in feasible and len(feasible) == 9
+        assert cache.hits == 1 and cache.misses == 1
+
+    def test_removed_nodes_are_dropped(self) -> None:
+        model = SwarmScheduler()
+        cache = FeasibilityCache()
+        cache.sync(workers_of(model, make_node("a"), make_node("b")))
+        cache.feasible_nodes((1.0, 512.0))
+        cache.sync(workers_of(model, make_node("b"), make_node("c")))
+        assert sorted(cache.feasible_nodes((1.0, 512.0))) == ["b", "c"]
+
+
+class TestSwarmSchedulerFeasibility:
+    def test_rigid_only_picks_feasible_nodes(self) -> None:
+        model = SwarmScheduler()
+        model.set_workers(
+            {
+                "full": make_node("full", cpu=4, used_cpu=4),
+                "free": make_node("free", cpu=4),
+            }
+        )
+        for i in range(20):
+            assert model.select_node(make_pod(f"p{i}", cpu="1")) == "free"
+
+    def test_elastic_only_picks_fitting_slack(self, mocker: MockerFixture) -> None:
+        mocker.patch(
+            "app.swarm.SwarmScheduler.get_parameters",
+            return_value=[{"alpha": 1.0, "beta": 1024.0, "gamma": 0.0}],
+        )
+        model = SwarmScheduler()
+        model.set_workers(
+            {
+                "a": make_node("a", slack={"ns;tight": (0.3, 300)}),
+                "b": make_node("b", slack={"ns;roomy": (0.9, 900)}),
+            }
+        )
+        for i in range(20):
+            pod = make_pod(f"p{i}", cpu="500m", memory="256Mi", rigid=False)
+            assert model.select_node(pod, slack_estimation_error=0) == "b"
+
+
+class TestDimensions:
+    def test_extended_resources_are_checked(self) -> None:
+        model = SwarmScheduler(dimensions=("cpu", "memory", "nvidia.com/gpu"))
+        gpu_node = make_node("gpu")
+        gpu_node.allocatable = gpu_node.allocatable.model_copy(
+            update={"nvidia.com/gpu": "2"}
+        )
+        cache = FeasibilityCache()
+        cache.sync(workers_of(model, make_node("cpu"), gpu_node))
+
+        assert sorted(cache.feasible_nodes((1.0, 512.0, 0.0))) == ["cpu", "gpu"]
+        assert cache.feasible_nodes((1.0, 512.0, 1.0)) == ["gpu"]
+        assert cache.feasible_nodes((1.0, 512.0, 4.0)) == []
+
+    def test_slack_is_checked_in_every_dimension(self) -> None:
+        model = SwarmScheduler()
+        worker = Worker(
+            model,
+            "a",
+            make_node(
+                "a",
+                slack={"ns;cpu": (4, 64), "ns;both": (2, 2048), "ns;tiny": (0.1, 8)},
+            ),
+        )
+        assert list(worker.slack) == ["ns;cpu", "ns;both", "ns;tiny"]
+        assert elastic_fits(worker, (1.0, 512.0)) == ["ns;both"]
+        assert elastic_fits(worker, (3.0, 32.0)) == ["ns;cpu"]
@@ -0,0 +1,39 @@
+from pytest_mock import MockerFixture
+
+from .. import k8s
+
+
+class TestKubernetesClients:
+    def test_config_is_not_loaded_until_first_use(self, mocker: MockerFixture) -> None:
+        load_incluster = mocker.patch("kubernetes.config.load_incluster_config")
+        mocker.patch("kubernetes.client.CoreV1Api")
+
+        clients = k8s.KubernetesClients()
+        load_incluster.assert_not_called()
+
+        clients.core_v1()
+        load_incluster.assert_called_once()
+
+    def test_clients_are_reused(self, mocker: MockerFixture) -> None:
+        load_incluster = mocker.patch("kubernetes.config.load_incluster_config")
+        core_v1 = mocker.patch("kubernetes.client.CoreV1Api")
+        custom_objects = mocker.patch("kubernetes.client.CustomObjectsApi")
+
+        clients = k8s.KubernetesClients()
+        assert clients.core_v1() is clients.core_v1()
+        assert clients.custom_objects() is clients.custom_objects()
+
+        load_incluster.assert_called_once()
+        core_v1.assert_called_once()
+        custom_objects.assert_called_once()
+
+    def test_reset(self, mocker: MockerFixture) -> None:
+        load_incluster = mocker.patch("kubernetes.config.load_incluster_config")
+        mocker.patch("kubernetes.client.CoreV1Api")
+
+        clients = k8s.KubernetesClients()
+        clients.core_v1()
+        clients.reset()
+        clients.core_v1()
+
+        assert load_incluster.call_count == 2
@@ -0,0 +1,113 @@
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from ..ledger import SlackLedger
+from ..state import SchedulerState
+from ..swarm.SwarmScheduler import SwarmScheduler
+from ..swarm.Worker import NodeGenerations
+from .fakes import make_node, make_pod
+
+
+class TestSlackLedger:
+    def test_charges_reduce_the_host_slack(self) -> None:
+        ledger = SlackLedger()
+        nodes = {"a": make_node("a", slack={"ns;r1": (2, 1024), "ns;r2": (1, 512)})}
+
+        ledger.charge(
+            make_pod("e1", cpu="500m", memory="256Mi", rigid=False), "a", "ns;r1"
+        )
+        ledger.charge(
+            make_pod("e2", cpu="2", memory="256Mi", rigid=False), "a", "ns;r1"
+        )
+        charged = ledger.apply(nodes)
+
+        slack = charged["a"].slack or {}
+        assert (slack["ns;r1"].cpu, slack["ns;r1"].memory) == (0, 512)
+        assert slack["ns;r2"] == (nodes["a"].slack or {})["ns;r2"]
+        assert charged["a"].generation is None
+        # the snapshot itself is left alone
+        assert (nodes["a"].slack or {})["ns;r1"].cpu == 2
+
+        ledger.release("uid-e2")
+        assert (ledger.apply(nodes)["a"].slack or {})["ns;r1"].cpu == 1.5
+        ledger.release("uid-e1")
+        assert ledger.apply(nodes)["a"] is nodes["a"]
+
+    def test_charges_of_ended_pods_are_released(self) -> None:
+        ledger = SlackLedger()
+        ledger.charge(make_pod("e1", rigid=False), "a", "ns;r")
+        ledger.charge(make_pod("e2", rigid=False), "a", "ns;r")
+        nodes = {"a": make_node("a", slack={"ns;r": (2, 1024)})}
+
+        ledger.retain({"uid-e2", "uid-other"})
+        assert len(ledger) == 1
+        assert (ledger.apply(nodes)["a"].slack or {})["ns;r"].cpu == 1.5
+
+    def test_charged_nodes_keep_a_derived_generation(self) -> None:
+        generations = NodeGenerations()
+        ledger = SlackLedger(generations)
+        nodes = {"a": make_node("a", slack={"ns;r": (2, 1024)})}
+        generations.stamp(nodes)
+        ledger.charge(make_pod("e1", rigid=False), "a", "ns;r")
+
+        first = ledger.apply(nodes)["a"].generation
+        assert first is not None and first != nodes["a"].generation
+        assert ledger.apply(nodes)["a"].generation == first
+        ledger.charge(make_pod("e2", rigid=False), "a", "ns;r")
+        assert ledger.apply(nodes)["a"].generation not in (first, None)
+
+    def test_ended_hosts_are_ignored(self) -> None:
+        ledger = SlackLedger()
+        ledger.charge(make_pod("e", rigid=False), "a", "ns;gone")
+        nodes = {"a": make_node("a", slack={"ns;r": (2, 1024)})}
+        assert ledger.apply(nodes)["a"].slack == nodes["a"].slack
+
+    def test_charges_survive_a_restart(self, tmp_path: Path) -> None:
+        path = str(tmp_path / "state.bin")
+        ledger = SlackLedger()
+        ledger.attach(SchedulerState.open(path))
+        ledger.charge(make_pod("e1", rigid=False), "a", "ns;r")
+        ledger.charge(make_pod("e2", rigid=False), "a", "ns;r")
+        ledger.release("uid-e1")
+
+        restored = SlackLedger()
+        restored.attach(SchedulerState.open(path))
+        assert len(restored) == 1
+        nodes = {"a": make_node("a", slack={"ns;r": (2, 1024)})}
+        assert (restored.apply(nodes)["a"].slack or {})["ns;r"].cpu == 1.5
+
+
+class TestElasticColocation:
+    @pytest.fixture(autouse=True)
+    def parameters(self, mocker: MockerFixture) -> None:
+        mocker.patch(
+            "app.swarm.SwarmScheduler.get_parameters",
+            return_value=[{"alpha": 0.5, "beta": 256, "gamma": 0}],
+        )
+
+    def test_exhausted_slack_is_not_picked_again(self) -> None:
+        model = SwarmScheduler(ledger=SlackLedger())
+        model.set_workers({"a": make_node("a", used_cpu=4, slack={"ns;r": (2, 1024)})})
+        pods = [
+            make_pod(f"e{i}", cpu="1", memory="256Mi", rigid=False) for i in range(3)
+        ]
+
+        for pod in pods[:2]:
+            node = model.select_node(pod, slack_estimation_error=0)
+            assert node == "a" and model.commit(pod, node)
+        assert list(model.workers_by_name["a"].slack["ns;r"]) == [0, 512]
+        # what is left is re-bucketed, out of the bucket of the pod
+        assert model.select_node(pods[2], slack_estimation_error=0) is None
+
+    def test_commit_refuses_a_host_used_up_meanwhile(self) -> None:
+        model = SwarmScheduler(ledger=SlackLedger())
+        model.set_workers({"a": make_node("a", used_cpu=4, slack={"ns;r": (1, 1024)})})
+        first, second = (make_pod(f"e{i}", cpu="1", rigid=False) for i in range(2))
+
+        # both decided before either commits
+        assert model.select_node(first, slack_estimation_error=0) == "a"
+        assert model.select_node(second, slack_estimation_error=0) == "a"
+        assert model.commit(first, "a")
+        assert not model.commit(second, "a")
@@ -0,0 +1,55 @@
+import pytest
+
+from .. import limiter
+
+
+class TestAdaptiveLimiter:
+    def test_fast_successes_grow_the_limit(self) -> None:
+        lim = limiter.AdaptiveLimiter(initial_limit=4, name="test")
+        for _ in range(20):
+            lim.acquire()
+            lim.release(0.01, ok=True)
+        assert lim.limit > 5
+        assert lim.in_flight == 0
+
+    def test_errors_and_slow_calls_shrink_the_limit(self) -> None:
+        lim = limiter.AdaptiveLimiter(initial_limit=10, backoff=0.5, name="test")
+        lim.acquire()
+        lim.release(0.01, ok=True)
+        lim.acquire()
+        lim.release(0.01, ok=False)
+        assert lim.limit == pytest.approx((10 + 1 / 10) * 0.5)
+
+        limit = lim.limit
+        lim.acquire()
+        lim.release(1.0, ok=True)
+        assert lim.limit == pytest.approx(limit * 0.5)
+
+    def test_limit_is_clamped(self) -> None:
+        lim = limiter.AdaptiveLimiter(
+            initial_limit=2, min_limit=2, max_limit=3, name="test"
+        )
+        for _ in range(5):
+            lim.acquire()
+            lim.release(0.01, ok=False)
+        assert lim.limit == 2
+        for _ in range(50):
+            lim.acquire()
+            lim.release(0.01, ok=True)
+        assert lim.limit == 3
+
+    def test_acquire_blocks_at_the_limit(self) -> None:
+        lim = limiter.AdaptiveLimiter(initial_limit=1, max_limit=1, name="test")
+        lim.acquire()
+        with pytest.raises(limiter.LimitExceeded):
+            lim.acquire(timeout=0.01)
+        lim.release(0.01, ok=True)
+        lim.acquire(timeout=0.01)
+
+    def test_slot_records_failures(self) -> None:
+        lim = limiter.AdaptiveLimiter(initial_limit=4, backoff=0.5, name="test")
+        with pytest.raises(RuntimeError):
+            with lim.slot():
+                raise RuntimeError
+        assert lim.limit == 2
+        assert lim.in_flight == 0
@@ -0,0 +1,72 @@
+from pytest_mock import MockerFixture
+
+from .. import orchestration, utils
+from ..orchestration import OrchestrationClient
+from .benchmarks.fake_api import FakeOrchestrationAPI
+
+
+def installed_api(mocker: MockerFixture, **kwargs: bool) -> FakeOrchestrationAPI:
+    api = FakeOrchestrationAPI(n_nodes=3, n_pods=10, **kwargs)
+    api.install(mocker)
+    return api
+
+
+class TestOrchestrationClient:
+    def test_unchanged_resource_is_not_sent_again(self, mocker: MockerFixture) -> None:
+        api = installed_api(mocker)
+        client = OrchestrationClient("http://api")
+        decode = mocker.Mock(side_effect=orchestration.decode_json)
+
+        nodes = client.get("/k8s_node", decode)
+        sent = api.bytes_sent
+        assert client.get("/k8s_node", decode) is nodes
+        assert api.not_modified == 1 and api.bytes_sent == sent
+        assert decode.call_count == 1
+
+    def test_changed_resource_is_fetched(self, mocker: MockerFixture) -> None:
+        api = installed_api(mocker)
+        client = OrchestrationClient("http://api")
+        client.get("/k8s_node")
+
+        api.nodes[0]["usage"] = {"cpu": "1", "memory": "1Gi"}
+        nodes = client.get("/k8s_node")
+        assert nodes[0]["usage"]["cpu"] == "1"
+        assert api.not_modified == 0
+
+    def test_responses_are_compressed(self, mocker: MockerFixture) -> None:
+        api = installed_api(mocker)
+        plain = installed_api(mocker, compress=False)
+        mocker.patch("requests.get", side_effect=api.get)
+        OrchestrationClient("http://api").get("/k8s_pod")
+        mocker.patch("requests.get", side_effect=plain.get)
+        OrchestrationClient("http://api").get("/k8s_pod")
+        assert 0 < api.bytes_sent < plain.bytes_sent
+
+    def test_without_etag_nothing_is_kept(self, mocker: MockerFixture) -> None:
+        api = installed_api(mocker, conditional=False)
+        client = OrchestrationClient("http://api")
+        client.get("/k8s_node")
+        sent = api.bytes_sent
+        client.get("/k8s_node")
+        assert api.bytes_sent == 2 * sent
+
+    def test_error_status(self, mocker: MockerFixture) -> None:
+        installed_api(mocker)
+        assert OrchestrationClient("http://api").get("/unknown") is None
+
+
+class TestConditionalPodList:
+    def test_pod_list_is_decoded_once_per_change(self, mocker: MockerFixture) -> None:
+        api = installed_api(mocker)
+        mocker.patch.object(orchestration, "client", OrchestrationClient())
+        decode = mocker.spy(utils, "decode_pods")
+
+        assert len(utils.get_pods_in_k8s()) == 10
+        rigid, _ = utils.get_pods_by_type()
+        assert len(rigid) == 5
+        assert decode.call_count == 1
+
+        api.pods[0]["status"] = "Succeeded"
+        rigid, _ = utils.get_pods_by_type()
+        assert len(rigid) == 4
+        assert decode.call_count == 2
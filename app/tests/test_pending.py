@@ -0,0 +1,309 @@
+from typing import Any, Optional
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pytest_mock import MockerFixture
+
+from .. import scheduler
+from ..demand import demand_cache
+from ..pending import FAILED, SCHEDULED, UNSCHEDULABLE, PendingQueue
+from ..swarm.SwarmScheduler import SwarmScheduler
+from .fakes import make_node, make_pod
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def pending_pod(name: str, priority: Optional[int] = None, age: float = 0) -> Any:
+    pod: Any = make_pod(name)
+    pod.spec.priority = priority
+    pod.metadata.creation_timestamp = datetime(
+        2025, 1, 1, tzinfo=timezone.utc
+    ) - timedelta(seconds=age)
+    return pod
+
+
+def names(queue: PendingQueue) -> list[str]:
+    popped = []
+    while (entry := queue.pop(timeout=0)) is not None:
+        popped.append(entry.pod.metadata.name)
+        queue.done(entry.pod.metadata.uid)
+    return popped
+
+
+class TestPendingQueue:
+    def test_priority_then_age(self) -> None:
+        queue = PendingQueue()
+        queue.add(pending_pod("young", age=1))
+        queue.add(pending_pod("old", age=10))
+        queue.add(pending_pod("important", priority=1000))
+        assert names(queue) == ["important", "old", "young"]
+
+    def test_known_pods_are_not_queued_twice(self) -> None:
+        queue = PendingQueue()
+        assert queue.add(pending_pod("a"))
+        assert not queue.add(pending_pod("a"))
+        entry = queue.pop(timeout=0)
+        assert entry is not None
+        # being decided on
+        assert not queue.add(pending_pod("a"))
+        queue.done("uid-a")
+        assert queue.add(pending_pod("a"))
+
+    def test_failed_pod_does_not_block_the_head(self) -> None:
+        clock = FakeClock()
+        queue = PendingQueue(initial_backoff=1, max_backoff=4, clock=clock)
+        queue.add(pending_pod("large", priority=1000))
+        queue.add(pending_pod("small"))
+
+        entry = queue.pop(timeout=0)
+        assert entry is not None and entry.pod.metadata.name == "large"
+        assert queue.backoff(entry.pod) == 1
+        assert queue.backing_off() == 1
+        assert names(queue) == ["small"]
+
+        clock.now += 1
+        entry = queue.pop(timeout=0)
+        assert entry is not None and entry.pod.metadata.name == "large"
+        assert queue.backoff(entry.pod) == 2
+        clock.now += 2
+        entry = queue.pop(timeout=0)
+        assert entry is not None
+        assert queue.backoff(entry.pod) == 4
+        clock.now += 4
+        entry = queue.pop(timeout=0)
+        assert entry is not None
+        assert queue.backoff(entry.pod) == 4
+
+    def test_remove_forgets_the_pod(self) -> None:
+        clock = FakeClock()
+        queue = PendingQueue(initial_backoff=1, clock=clock)
+        queue.add(pending_pod("a"))
+        queue.add(pending_pod("b"))
+        queue.backoff(pending_pod("b"))
+
+        queue.remove("uid-a")
+        queue.remove("uid-b")
+        clock.now += 10
+        assert len(queue) == 0 and queue.backing_off() == 0
+        assert queue.pop(timeout=0) is None
+        # failures are forgotten too
+        queue.add(pending_pod("b"))
+        assert queue.backoff(pending_pod("b")) == 1
+
+    def test_batches_take_the_ready_pods(self) -> None:
+        clock = FakeClock()
+        queue = PendingQueue(clock=clock)
+        for i in range(3):
+            queue.add(pending_pod(f"p{i}", age=10 - i))
+        queue.backoff(pending_pod("parked"))
+
+        batch = queue.pop_batch(5, timeout=0)
+        assert [entry.pod.metadata.name for entry in batch] == ["p0", "p1", "p2"]
+        assert queue.pop_batch(5, timeout=0) == []
+
+
+class TestUnschedulableTier:
+    def test_parked_until_their_class_is_woken(self) -> None:
+        queue = PendingQueue()
+        for name, demand_class in (("small", "s"), ("large", "l"), ("large2", "l")):
+            queue.add(pending_pod(name))
+            entry = queue.pop(timeout=0)
+            assert entry is not None
+            assert queue.park(entry.pod, demand_class, wakes=entry.wakes)
+        assert queue.unschedulable() == 3 and queue.backing_off() == 0
+        assert queue.pop(timeout=0) is None
+        # parked pods are known, the retry loop doesn't queue them again
+        assert not queue.add(pending_pod("small"))
+
+        assert queue.wake(lambda demand_class: demand_class == "l") == 2
+        assert queue.unschedulable() == 1
+        assert sorted(names(queue)) == ["large", "large2"]
+        assert queue.wake() == 1
+        assert names(queue) == ["small"]
+
+    def test_flushed_without_wake(self) -> None:
+        clock = FakeClock()
+        queue = PendingQueue(clock=clock, flush_interval=300)
+        queue.park(pending_pod("a"), "a")
+        clock.now += 299
+        assert queue.pop(timeout=0) is None
+        clock.now += 1
+        assert names(queue) == ["a"]
+        assert queue.unschedulable() == 0
+
+    def test_woken_while_deciding_backs_off(self) -> None:
+        queue = PendingQueue()
+        queue.add(pending_pod("a"))
+        entry = queue.pop(timeout=0)
+        assert entry is not None
+        # the cluster grew after the decision looked at it
+        queue.wake()
+        assert not queue.park(entry.pod, "a", wakes=entry.wakes)
+        assert queue.unschedulable() == 0 and queue.backing_off() == 1
+
+    def test_remove_and_backoff_leave_the_tier(self) -> None:
+        queue = PendingQueue()
+        queue.park(pending_pod("a"), "a")
+        queue.park(pending_pod("b"), "b")
+        queue.remove("uid-a")
+        queue.backoff(pending_pod("b"))
+        assert queue.unschedulable() == 0 and queue.backing_off() == 1
+        assert queue.wake() == 0
+
+
+class TestSchedulePending:
+    def test_failures_are_backed_off(self, mocker: MockerFixture) -> None:
+        queue = PendingQueue()
+        mocker.patch.object(scheduler, "pending", queue)
+        queue.add(pending_pod("fits"), "t0")
+        queue.add(pending_pod("too-large", priority=1000), "t1")
+
+        perform = mocker.patch.object(
+            scheduler,
+            "perform_scheduling",
+            side_effect=lambda pod, *_: (
+                SCHEDULED if pod.metadata.name == "fits" else FAILED
+            ),
+        )
+        # stop after the two queued pods
+        mocker.patch.object(queue, "pop", side_effect=[queue.pop(0), queue.pop(0)])
+        with pytest.raises(StopIteration):
+            scheduler.schedule_pending(mocker.Mock())
+
+        assert [c.args[2] for c in perform.call_args_list] == [
+            "t1",
+            "t0",
+        ]
+        assert queue.backing_off() == 1
+
+    def test_unschedulable_pods_are_parked(self, mocker: MockerFixture) -> None:
+        queue = PendingQueue()
+        mocker.patch.object(scheduler, "pending", queue)
+        queue.add(pending_pod("too-large"))
+        mocker.patch.object(scheduler, "perform_scheduling", return_value=UNSCHEDULABLE)
+        mocker.patch.object(queue, "pop", side_effect=[queue.pop(0)])
+        with pytest.raises(StopIteration):
+            scheduler.schedule_pending(mocker.Mock())
+        assert queue.unschedulable() == 1 and queue.backing_off() == 0
+
+
+class TestWakeUnschedulable:
+    def parked(self, mocker: MockerFixture) -> PendingQueue:
+        queue = PendingQueue()
+        mocker.patch.object(scheduler, "pending", queue)
+        for name, cpu, rigid in (
+            ("rigid-2", "2", True),
+            ("rigid-6", "6", True),
+            ("elastic-1", "1", False),
+        ):
+            pod = make_pod(name, cpu=cpu, memory="256Mi", rigid=rigid)
+            queue.park(pod, demand_cache.get(pod).demand_class)
+        return queue
+
+    def woken(self, queue: PendingQueue) -> list[str]:
+        return sorted(names(queue))
+
+    def test_nothing_grew(self, mocker: MockerFixture) -> None:
+        queue = self.parked(mocker)
+        model = SwarmScheduler()
+        before = model.set_workers({"a": make_node("a", used_cpu=3)})
+        after = model.set_workers({"a": make_node("a", used_cpu=3.5)})
+        assert scheduler.wake_unschedulable(before, after) == 0
+        assert queue.unschedulable() == 3
+
+    def test_freed_resources(self, mocker: MockerFixture) -> None:
+        queue = self.parked(mocker)
+        model = SwarmScheduler()
+        before = model.set_workers({"a": make_node("a", used_cpu=3.5)})
+        after = model.set_workers({"a": make_node("a", used_cpu=1.5)})
+        # 2.5 cpus free: rigid-6 still fits nowhere
+        assert scheduler.wake_unschedulable(before, after) == 2
+        assert self.woken(queue) == ["elastic-1", "rigid-2"]
+
+    def test_added_node(self, mocker: MockerFixture) -> None:
+        queue = self.parked(mocker)
+        model = SwarmScheduler()
+        before = model.set_workers({"a": make_node("a", used_cpu=4)})
+        after = model.set_workers(
+            {"a": make_node("a", used_cpu=4), "b": make_node("b", cpu=8)}
+        )
+        assert scheduler.wake_unschedulable(before, after) == 3
+        assert queue.unschedulable() == 0
+
+    def test_grown_slack(self, mocker: MockerFixture) -> None:
+        queue = self.parked(mocker)
+        model = SwarmScheduler()
+        before = model.set_workers(
+            {"a": make_node("a", used_cpu=4, slack={"ns;p": (0.5, 512)})}
+        )
+        after = model.set_workers(
+            {"a": make_node("a", used_cpu=4, slack={"ns;p": (1.5, 512)})}
+        )
+        assert scheduler.wake_unschedulable(before, after) == 1
+        assert self.woken(queue) == ["elastic-1"]
+
+    def test_freed_again_between_looks(self, mocker: MockerFixture) -> None:
+        queue = self.parked(mocker)
+        mocker.patch.object(scheduler, "parked_on", {})
+        model = SwarmScheduler()
+        last = model.set_workers({"a": make_node("a", used_cpu=1.5)})
+        # taken when the pods were decided on, freed again by the next look
+        scheduler.note_parked_on(model.set_workers({"a": make_node("a", used_cpu=4)}))
+        mocker.patch.object(
+            scheduler,
+            "get_node_details",
+            return_value={"a": make_node("a", used_cpu=1.5)},
+        )
+
+        assert scheduler.look_at_nodes(model, last) is model.snapshot
+        assert self.woken(queue) == ["elastic-1", "rigid-2"]
+        assert scheduler.parked_on == {}
+
+
+class TestBatchPlanning:
+    def test_failed_plan_decides_pod_by_pod(self, mocker: MockerFixture) -> None:
+        queue = PendingQueue()
+        mocker.patch.object(scheduler, "pending", queue)
+        queue.add(pending_pod("ok"))
+        queue.add(pending_pod("bad"))
+        perform = mocker.patch.object(
+            scheduler, "perform_scheduling", return_value=SCHEDULED
+        )
+        mocker.patch.object(
+            queue, "pop_batch", side_effect=[queue.pop_batch(2, timeout=0)]
+        )
+        mocker.patch.object(scheduler, "gather_snapshot")
+        model = mocker.Mock(method="BINPACK")
+        model.plan.side_effect = ValueError("Invalid number format: 1x")
+        with pytest.raises(StopIteration):
+            scheduler.schedule_pending(model)
+        assert perform.call_count == 2
+        assert queue.in_flight() == 0
+
+    def test_first_batch_is_planned_on_fresh_nodes(self, mocker: MockerFixture) -> None:
+        queue = PendingQueue()
+        mocker.patch.object(scheduler, "pending", queue)
+        queue.add(make_pod("p1", cpu="3"))
+        queue.add(make_pod("p2", cpu="1"))
+        mocker.patch.object(scheduler, "perform_scheduling", return_value=SCHEDULED)
+        mocker.patch.object(
+            queue, "pop_batch", side_effect=[queue.pop_batch(2, timeout=0)]
+        )
+        mocker.patch.object(
+            scheduler,
+            "get_node_details",
+            return_value={"a": make_node("a", cpu=3), "b": make_node("b", cpu=1)},
+        )
+        model = SwarmScheduler(method="BINPACK")
+
+        with pytest.raises(StopIteration):
+            scheduler.schedule_pending(model)
+        # both placed, on the nodes gathered for the batch
+        assert model._planned == {"uid-p1": "a", "uid-p2": "b"}
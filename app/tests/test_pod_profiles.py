@@ -0,0 +1,71 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ..swarm import pod_profiles
+from ..swarm.simulator import Workload
+
+
+class TestGeneratePods:
+    @pytest.fixture
+    def pods(self) -> np.ndarray:
+        return pod_profiles.generate_pods(20_000, arrival_rate=5, seed=3)
+
+    def test_same_seed_same_trace(self, pods: np.ndarray) -> None:
+        again = pod_profiles.generate_pods(20_000, arrival_rate=5, seed=3)
+        assert np.array_equal(pods, again)
+
+    def test_profiles_and_steps(self, pods: np.ndarray) -> None:
+        for profiles, (low, high) in pod_profiles.CATEGORIES:
+            demands = {tuple(demand) for demand, _ in profiles}
+            in_category = np.array([tuple(d) in demands for d in pods["demand"]])
+            steps = pods["steps"][in_category]
+            assert steps.min() >= low and steps.max() <= high
+
+        large = pods["demand"].max(axis=1) >= 8
+        assert not pods["elastic"][large].any()
+        # about 40% small, 40% medium and 20% large pods, half of the first
+        # two elastic
+        assert large.mean() == pytest.approx(0.2, abs=0.02)
+        assert pods["elastic"].mean() == pytest.approx(0.4, abs=0.02)
+
+    def test_elastic_pods(self, pods: np.ndarray) -> None:
+        elastic = pods["elastic"]
+        assert (pods["slack"][elastic] == 0).all()
+        for mask, share in ((elastic, 0.3), (~elastic, 0.1)):
+            expected = [int(share * steps) for steps in pods["steps"][mask]]
+            assert pods["tolerance"][mask].tolist() == expected
+
+    def test_arrivals_are_sorted(self, pods: np.ndarray) -> None:
+        assert (np.diff(pods["arrival"]) >= 0).all()
+        assert pods["arrival"][-1] == pytest.approx(20_000 / 5, rel=0.05)
+
+
+class TestTraces:
+    @pytest.mark.parametrize("name", ["trace.npy", "trace.npz"])
+    def test_round_trip(self, tmp_path: Path, name: str) -> None:
+        pods = pod_profiles.generate_pods(1000, seed=1)
+        path = str(tmp_path / name)
+        pod_profiles.save_trace(path, pods)
+
+        loaded = pod_profiles.load_trace(path)
+        assert np.array_equal(loaded, pods)
+        assert isinstance(loaded, np.memmap) == name.endswith(".npy")
+
+    def test_path_without_extension(self, tmp_path: Path) -> None:
+        pods = pod_profiles.generate_pods(1000, seed=1)
+        path = str(tmp_path / "trace")
+
+        assert pod_profiles.save_trace(path, pods) == path + ".npz"
+        assert np.array_equal(pod_profiles.load_trace(path), pods)
+
+    def test_workload_of_a_mapped_trace(self, tmp_path: Path) -> None:
+        path = str(tmp_path / "trace.npy")
+        pod_profiles.save_trace(path, pod_profiles.generate_pods(1000, seed=1))
+
+        trace = pod_profiles.load_trace(path)
+        workload = Workload.from_trace(trace)
+        assert len(workload) == 1000
+        # used in place, not copied
+        assert np.shares_memory(workload.demand, trace)
@@ -0,0 +1,96 @@
+from decimal import ROUND_UP, Decimal, localcontext
+from itertools import product
+
+import pytest
+from kubernetes.utils.quantity import parse_quantity as kubernetes_parse_quantity
+
+from ..quantity import NANO, parse_nanos, parse_quantity
+
+SIGNS = ["", "+", "-"]
+WHOLES = ["0", "1", "7", "10", "250", "1024", "123456789", "9007199254740993"]
+FRACTIONS = ["", ".", ".5", ".25", ".125", ".000000001", ".0000000001", ".999"]
+POWERS = ["", "e3", "E3", "e-2", "E+1", "e0", "e18"]
+SUFFIXES = ["", "n", "u", "m", "k", "K", "M", "G", "T", "P", "E"] + [
+    s + "i" for s in "numKMGTPE"
+]
+INVALID = ["", "m", "Mi", "abc", "1ki", "1Mi ", "1m ", "0x1", "1e", "1..5", "1e3e3"]
+ODD = [" 1", "1_0", ".5", "1.", ".5Mi", "1e+03k", "Infinity", "NaN", "1e999999"]
+
+
+def exact(quantity: str) -> Decimal:
+    # beyond the default 28 digits of precision
+    with localcontext(prec=200):
+        value: Decimal = kubernetes_parse_quantity(quantity)
+        return value
+
+
+def expected_nanos(quantity: str) -> int:
+    with localcontext(prec=200):
+        return int((exact(quantity) * NANO).to_integral_value(ROUND_UP))
+
+
+def representable(quantity: str) -> bool:
+    """
+    Whether the quantity is a whole number of nano units, and exact within the
+    precision that kubernetes computes it with.
+    """
+    with localcontext(prec=200):
+        value = exact(quantity)
+        if value * NANO != expected_nanos(quantity):
+            return False
+    return bool(kubernetes_parse_quantity(quantity) == value)
+
+
+class TestParseQuantity:
+    def test_equivalent_to_kubernetes(self) -> None:
+        checked = rounded = 0
+        for parts in product(SIGNS, WHOLES, FRACTIONS, POWERS, SUFFIXES):
+            quantity = "".join(parts)
+            nanos = parse_nanos(quantity)
+            assert nanos == expected_nanos(quantity), quantity
+            if representable(quantity):
+                expected = float(kubernetes_parse_quantity(quantity))
+                assert parse_quantity(quantity) == expected, quantity
+            else:
+                # beyond nano precision, or beyond what kubernetes computes
+                assert parse_quantity(quantity) == nanos / NANO, quantity
+                rounded += 1
+            checked += 1
+        assert checked > 20000
+        assert rounded > 0
+
+    @pytest.mark.parametrize("quantity", INVALID)
+    def test_invalid(self, quantity: str) -> None:
+        with pytest.raises(ValueError):
+            kubernetes_parse_quantity(quantity)
+        with pytest.raises(ValueError):
+            parse_quantity(quantity)
+
+    @pytest.mark.parametrize("quantity", ODD)
+    def test_other_forms_of_decimal(self, quantity: str) -> None:
+        expected = float(kubernetes_parse_quantity(quantity))
+        if expected in (float("inf"), float("-inf")) or expected != expected:
+            # the integer result has no infinity or NaN
+            with pytest.raises(ValueError):
+                parse_quantity(quantity)
+        else:
+            assert parse_quantity(quantity) == expected
+
+    def test_beyond_nano_precision_is_rounded_up(self) -> None:
+        assert parse_nanos("0.5n") == 1
+        assert parse_nanos("-1e-12") == -1
+        assert parse_nanos("1ni") == 1
+        assert parse_quantity("1.0000000001") == 1.000000001
+        assert parse_quantity("1.5e-10") == 1e-09
+
+    def test_numbers_are_taken_as_they_are(self) -> None:
+        assert parse_quantity(3) == 3.0
+        assert parse_quantity(0.25) == 0.25
+        assert parse_quantity(Decimal("1.5")) == 1.5
+
+    def test_results_are_cached(self) -> None:
+        parse_nanos.cache_clear()
+        parse_quantity("512Mi")
+        parse_quantity("512Mi")
+        info = parse_nanos.cache_info()
+        assert (info.hits, info.misses) == (1, 1)
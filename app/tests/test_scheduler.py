@@ -0,0 +1,225 @@
+from typing import Any
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from prometheus_client import REGISTRY
+from pytest_mock import MockerFixture
+
+from .. import orchestration, scheduler
+from ..ledger import SlackLedger
+from ..state import SchedulerState
+from ..swarm.snapshot import ClusterSnapshot
+from ..swarm.SwarmScheduler import SwarmScheduler
+from .benchmarks.fake_api import FakeResponse
+from .fakes import make_node, make_pod
+
+
+class TestWarmState:
+    def test_warm_snapshot_until_reconciled(
+        self, tmp_path: Path, mocker: MockerFixture
+    ) -> None:
+        state = SchedulerState.open(str(tmp_path / "state.bin"))
+        state.save_nodes({"warm": make_node("warm")})
+        mocker.patch.object(scheduler, "state", state)
+        fetch = mocker.patch.object(
+            scheduler, "fetch_node_details", return_value={"fresh": make_node("fresh")}
+        )
+
+        assert list(scheduler.get_node_details(get_slack=False)) == ["warm"]
+        fetch.assert_not_called()
+
+        scheduler.reconcile_state()
+        assert state.reconciled.is_set()
+        assert list(scheduler.get_node_details(get_slack=False)) == ["fresh"]
+
+    def test_charges_of_ended_pods_are_dropped(
+        self, tmp_path: Path, mocker: MockerFixture
+    ) -> None:
+        state = SchedulerState.open(str(tmp_path / "state.bin"))
+        ledger = SlackLedger()
+        ledger.attach(state)
+        ledger.charge(make_pod("ended", rigid=False), "a", "ns;r")
+        ledger.charge(make_pod("running", rigid=False), "a", "ns;r")
+        mocker.patch.object(scheduler, "state", state)
+        mocker.patch.object(scheduler, "ledger", ledger)
+        mocker.patch.object(
+            scheduler, "fetch_node_details", return_value={"a": make_node("a")}
+        )
+        mocker.patch.object(
+            scheduler, "iter_pods_in_k8s", return_value=[{"uid": "uid-running"}]
+        )
+
+        scheduler.reconcile_state()
+        assert list(state.slack_charges()) == ["uid-running"]
+
+    def test_fresh_snapshot_is_saved(
+        self, tmp_path: Path, mocker: MockerFixture
+    ) -> None:
+        state = SchedulerState.open(str(tmp_path / "state.bin"))
+        state.reconciled.set()
+        mocker.patch.object(scheduler, "state", state)
+        response = FakeResponse(
+            [
+                {
+                    "name": "a",
+                    "id": "id-a",
+                    "usage": {"cpu": "250m", "memory": "1Gi"},
+                    "capacity": {"cpu": "4", "memory": "8Gi"},
+                    "allocatable": {"cpu": "4", "memory": "8Gi"},
+                }
+            ]
+        )
+        mocker.patch("app.orchestration.requests.get", return_value=response)
+
+        nodes = scheduler.get_node_details(get_slack=False)
+        # generations are stamped per process, not stored
+        assert state.load_nodes()["a"] == nodes["a"].model_copy(
+            update={"generation": None}
+        )
+        assert nodes["a"].allocatable.memory == 8192
+
+
+class TestNodeDetails:
+    def test_rigid_fetches_keep_the_last_slack(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(scheduler, "state", None)
+        mocker.patch.object(scheduler, "last_slack", {})
+        with_slack = {"a": make_node("a", slack={"ns;big": (2, 1024)})}
+        fetch = mocker.patch.object(
+            scheduler, "fetch_node_details", return_value=with_slack
+        )
+        scheduler.get_node_details(get_slack=True)
+
+        fetch.return_value = {"a": make_node("a"), "b": make_node("b")}
+        nodes = scheduler.get_node_details(get_slack=False)
+
+        assert nodes["a"].slack == with_slack["a"].slack
+        assert nodes["b"].slack is None
+
+    def test_no_nodes_without_the_pods(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(scheduler, "state", None)
+        mocker.patch("app.utils.get_pod_usage", return_value={})
+        node = make_node("a").model_dump(exclude={"slack", "generation"})
+        mocker.patch.object(
+            orchestration.client,
+            "get",
+            side_effect=lambda path, *_: [node] if path == "/k8s_node" else None,
+        )
+
+        assert list(scheduler.fetch_node_details(get_slack=False)) == ["a"]
+        # no slack table for nodes whose pods couldn't be fetched
+        assert scheduler.fetch_node_details(get_slack=True) == {}
+
+
+def fallbacks(fallback: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "rms_decision_fallbacks_total", {"fallback": fallback}
+    )
+    return value or 0.0
+
+
+class TestDecisionDeadline:
+    def model(self) -> SwarmScheduler:
+        model = SwarmScheduler()
+        model.params = {"alpha": 1.0, "beta": 1024.0, "gamma": 0.5}
+        return model
+
+    def test_fresh_snapshot_within_the_deadline(self, mocker: MockerFixture) -> None:
+        model = self.model()
+        mocker.patch.object(
+            scheduler, "get_node_details", return_value={"a": make_node("a")}
+        )
+        snapshot = scheduler.gather_snapshot(make_pod("p"), model, deadline=5)
+        assert snapshot is model.snapshot
+        assert list(snapshot.workers_by_name) == ["a"]
+
+    def test_last_snapshot_after_the_deadline(self, mocker: MockerFixture) -> None:
+        model = self.model()
+        last = model.set_workers({"old": make_node("old")})
+        released = threading.Event()
+
+        def slow(get_slack: bool) -> dict[str, Any]:
+            released.wait(5)
+            return {"new": make_node("new")}
+
+        mocker.patch.object(scheduler, "get_node_details", side_effect=slow)
+        before = fallbacks("snapshot")
+        try:
+            snapshot = scheduler.gather_snapshot(make_pod("p"), model, deadline=0.01)
+        finally:
+            released.set()
+        assert snapshot is last
+        assert fallbacks("snapshot") == before + 1
+
+    def test_nothing_to_fall_back_to(self, mocker: MockerFixture) -> None:
+        released = threading.Event()
+        mocker.patch.object(
+            scheduler, "get_node_details", side_effect=lambda _: released.wait(5)
+        )
+        before = fallbacks("none")
+        try:
+            with pytest.raises(Exception, match="no snapshot"):
+                scheduler.gather_snapshot(make_pod("p"), self.model(), deadline=0.01)
+        finally:
+            released.set()
+        assert fallbacks("none") == before + 1
+
+    def test_no_fallback_without_slack_for_elastic_pods(
+        self, mocker: MockerFixture
+    ) -> None:
+        model = self.model()
+        # gathered for a rigid pod
+        model.set_workers({"old": make_node("old")})
+        released = threading.Event()
+        mocker.patch.object(
+            scheduler, "get_node_details", side_effect=lambda _: released.wait(5)
+        )
+        before = fallbacks("none")
+        try:
+            with pytest.raises(Exception, match="no snapshot"):
+                scheduler.gather_snapshot(
+                    make_pod("e", rigid=False), model, deadline=0.01
+                )
+        finally:
+            released.set()
+        assert fallbacks("none") == before + 1
+
+    def test_decisions_share_the_gathering_in_flight(
+        self, mocker: MockerFixture
+    ) -> None:
+        model = self.model()
+        model.set_workers({"old": make_node("old", slack={})})
+        released = threading.Event()
+
+        def slow(get_slack: bool) -> dict[str, Any]:
+            released.wait(5)
+            return {"new": make_node("new")}
+
+        fetch = mocker.patch.object(scheduler, "get_node_details", side_effect=slow)
+        mocker.patch.object(scheduler, "gatherers", ThreadPoolExecutor(2))
+        mocker.patch.object(scheduler, "gathering", {})
+        mocker.patch.object(scheduler, "gathering_waiters", {})
+        try:
+            for name in ("p1", "p2", "p3"):
+                scheduler.gather_snapshot(make_pod(name), model, deadline=0.01)
+            scheduler.gather_snapshot(make_pod("e", rigid=False), model, deadline=0.01)
+            scheduler.gather_snapshot(make_pod("p4"), model, deadline=0.01)
+        finally:
+            released.set()
+        assert [call.args for call in fetch.call_args_list] == [(False,), (True,)]
+
+    def test_gatherings_nobody_waits_for_are_dropped(
+        self, mocker: MockerFixture
+    ) -> None:
+        future: Future[ClusterSnapshot] = Future()
+        mocker.patch.object(scheduler.gatherers, "submit", return_value=future)
+        mocker.patch.object(scheduler, "gathering", {})
+        mocker.patch.object(scheduler, "gathering_waiters", {})
+        model = self.model()
+        model.set_workers({"old": make_node("old")})
+
+        scheduler.gather_snapshot(make_pod("p"), model, deadline=0.01)
+        assert future.cancelled()
+        assert scheduler.gathering_waiters == {}
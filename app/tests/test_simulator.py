@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from ..swarm import simulator
+
+
+class TestAdmitInOrder:
+    def test_running_total_per_target(self) -> None:
+        target = np.array([0, 1, 0, 0, 1])
+        demand = np.array([[2.0, 1.0], [5.0, 5.0], [2.0, 1.0], [2.0, 1.0], [1.0, 1.0]])
+        free = np.array([[5.0, 5.0], [5.0, 5.0]])
+        admitted = simulator.admit_in_order(target, demand, free)
+        assert admitted.tolist() == [True, True, True, False, False]
+
+
+class TestClusterSimulator:
+    @pytest.fixture
+    def workload(self) -> simulator.Workload:
+        return simulator.Workload.from_pod_profiles(2000, arrival_rate=5, seed=7)
+
+    @pytest.mark.parametrize("method", simulator.METHODS)
+    def test_every_pod_is_accounted_for(
+        self, workload: simulator.Workload, method: str
+    ) -> None:
+        sim = simulator.ClusterSimulator(20, workload, method=method, seed=7)
+        result = sim.run()
+
+        summary = result.summary()
+        total = sum(
+            summary[k]
+            for k in (
+                "satisfied_rigid",
+                "satisfied_elastic",
+                "un_satisfied_rigid",
+                "un_satisfied_elastic",
+            )
+        )
+        assert total == len(workload)
+        assert set(sim.state.tolist()) <= {simulator.FINISHED, simulator.UNSATISFIED}
+
+        # everything was released again
+        assert np.allclose(sim.assigned, 0)
+        assert np.allclose(sim.used, 0)
+
+    @pytest.mark.parametrize("method", simulator.METHODS)
+    def test_capacity_and_slack_are_respected(
+        self, workload: simulator.Workload, method: str
+    ) -> None:
+        sim = simulator.ClusterSimulator(5, workload, method=method, seed=7)
+        result = simulator.SimulationResult(300)
+        for i in range(300):
+            sim.step(result, i)
+            assert np.all(sim.assigned <= sim.capacity + 1e-9)
+            assert np.all(sim.free_slack >= -1e-9)
+
+    def test_unknown_method(self, workload: simulator.Workload) -> None:
+        with pytest.raises(ValueError):
+            simulator.ClusterSimulator(5, workload, method="FOO")
@@ -0,0 +1,105 @@
+from typing import Any
+
+import json
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+
+from .. import snapshot
+from ..state import SchedulerState
+from .fakes import make_node
+
+
+def read_lines(text: str) -> list[dict[str, Any]]:
+    return [json.loads(line) for line in text.splitlines()]
+
+
+class TestSnapshotRoutes:
+    @pytest.fixture
+    def state(self, tmp_path: Path) -> SchedulerState:
+        state = SchedulerState.open(str(tmp_path / "state.bin"))
+        state.save_nodes(
+            {
+                "a": make_node("a", slack={"ns;p": (1, 512)}),
+                "b": make_node("b", used_cpu=1),
+            }
+        )
+        return state
+
+    @pytest.fixture
+    def client(self, state: SchedulerState) -> TestClient:
+        routes = snapshot.SnapshotRoutes(state.store.path)
+        app = FastAPI()
+        app.include_router(routes.router)
+        return TestClient(app)
+
+    def test_full_snapshot(self, client: TestClient, state: SchedulerState) -> None:
+        response = client.get("/snapshot/")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == snapshot.NDJSON
+        assert response.headers["X-Snapshot-Full"] == "true"
+        assert response.headers["ETag"] == f'"{state.store.seq}"'
+
+        lines = {line["name"]: line for line in read_lines(response.text)}
+        assert set(lines) == {"a", "b"}
+        assert lines["a"]["slack"]["ns;p"]["cpu"] == 1
+        assert lines["b"]["slack"] is None
+        assert lines["b"]["node"]["usage"]["cpu"] == 1
+
+    def test_not_modified(self, client: TestClient, state: SchedulerState) -> None:
+        etag = client.get("/snapshot/").headers["ETag"]
+        response = client.get("/snapshot/", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        # other records don't change the snapshot
+        state.set_reservation("uid-p", {"node": "a"})
+        state.resource_version = "42"
+        response = client.get("/snapshot/", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        state.save_nodes({"a": make_node("a", slack={"ns;p": (1, 512)})})
+        response = client.get("/snapshot/", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        etag = response.headers["ETag"]
+
+        state.save_nodes({"a": make_node("a", used_cpu=2), "b": make_node("b")})
+        response = client.get("/snapshot/", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_delta_since_generation(
+        self, client: TestClient, state: SchedulerState
+    ) -> None:
+        generation = int(client.get("/snapshot/").headers["X-Snapshot-Generation"])
+        state.save_nodes(
+            {
+                "a": make_node("a", slack={"ns;p": (1, 512)}),
+                "c": make_node("c"),
+            }
+        )
+
+        response = client.get("/snapshot/", params={"since": generation})
+        assert response.headers["X-Snapshot-Full"] == "false"
+        lines = {line["name"]: line for line in read_lines(response.text)}
+        assert set(lines) == {"b", "c"}
+        assert lines["b"]["deleted"] is True
+        assert lines["c"]["generation"] > generation
+
+    def test_delta_after_compaction_is_full(
+        self, client: TestClient, state: SchedulerState
+    ) -> None:
+        generation = int(client.get("/snapshot/").headers["X-Snapshot-Generation"])
+        state.save_nodes({"a": make_node("a")})
+        state.store.compact()
+
+        response = client.get("/snapshot/", params={"since": generation})
+        assert response.headers["X-Snapshot-Full"] == "true"
+        assert [line["name"] for line in read_lines(response.text)] == ["a"]
+
+    def test_no_state_file(self, tmp_path: Path) -> None:
+        routes = snapshot.SnapshotRoutes(str(tmp_path / "missing.bin"))
+        app = FastAPI()
+        app.include_router(routes.router)
+        response = TestClient(app).get("/snapshot/")
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -0,0 +1,116 @@
+from pathlib import Path
+
+import pytest
+
+from .. import state
+from .fakes import make_node
+
+
+class TestStateStore:
+    @pytest.fixture
+    def path(self, tmp_path: Path) -> str:
+        return str(tmp_path / "state.bin")
+
+    def test_storage_interface(self, path: str) -> None:
+        store = state.StateStore(path)
+        store.set("a", {"x": 1})
+        store.set("b", [1, 2])
+        assert store.has("a")
+        assert not store.has("c")
+        assert store.get("a") == {"x": 1}
+        assert store.get("c") is None
+        assert sorted(map(str, store.all())) == sorted(["{'x': 1}", "[1, 2]"])
+
+        store.delete("a")
+        assert not store.has("a")
+        with pytest.raises(KeyError):
+            store.delete("a")
+
+        store.clear()
+        assert store.all() == []
+
+    def test_survives_reopen(self, path: str) -> None:
+        store = state.StateStore(path)
+        store.set("a", 1)
+        store.set("a", 2)
+        store.set("b", 3)
+        store.delete("b")
+        seq = store.seq
+        store.close()
+
+        reopened = state.StateStore(path)
+        assert reopened.get("a") == 2
+        assert not reopened.has("b")
+        assert reopened.seq == seq
+
+    def test_uncommitted_record_is_ignored(self, path: str) -> None:
+        store = state.StateStore(path)
+        store.set("a", 1)
+        # simulate a crash after writing the record but before the commit
+        committed = state.HEADER.unpack_from(store._mm, 0)
+        store.set("b", 2)
+        state.HEADER.pack_into(store._mm, 0, *committed)
+        store.close()
+
+        reopened = state.StateStore(path)
+        assert reopened.get("a") == 1
+        assert not reopened.has("b")
+
+    def test_grows_and_compacts(self, path: str) -> None:
+        store = state.StateStore(path, initial_size=4096)
+        for i in range(2000):
+            store.set(f"key/{i % 10}", {"value": i, "padding": "x" * 50})
+        assert [store.get(f"key/{i}")["value"] for i in range(10)] == list(
+            range(1990, 2000)
+        )
+        assert Path(path).stat().st_size < 64 * 1024
+
+        store.close()
+        reopened = state.StateStore(path)
+        assert reopened.get("key/9")["value"] == 1999
+
+    def test_reader_sees_writer_updates(self, path: str) -> None:
+        writer = state.StateStore(path, initial_size=4096)
+        writer.set("a", 1)
+        reader = state.StateStore(path, readonly=True)
+        assert reader.get("a") == 1
+
+        for i in range(500):
+            writer.set(f"k{i % 3}", "y" * 100)
+        writer.set("a", 2)
+        reader.refresh()
+        assert reader.get("a") == 2
+        assert reader.get("k0") == "y" * 100
+
+        with pytest.raises(PermissionError):
+            reader.set("a", 3)
+
+
+class TestSchedulerState:
+    def test_nodes_and_metadata(self, tmp_path: Path) -> None:
+        path = str(tmp_path / "sub" / "state.bin")
+        scheduler_state = state.SchedulerState.open(path)
+        nodes = {
+            "a": make_node("a", slack={"ns;p": (1, 512)}),
+            "b": make_node("b"),
+        }
+        scheduler_state.save_nodes(nodes)
+        seq = scheduler_state.store.seq
+        scheduler_state.save_nodes(nodes)
+        assert scheduler_state.store.seq == seq  # nothing changed
+
+        # the slack table survives a snapshot fetched without slack
+        scheduler_state.save_nodes({"a": nodes["a"].model_copy(update={"slack": None})})
+        scheduler_state.resource_version = "12345"
+        scheduler_state.set_reservation("ns;pod", {"node": "a", "cpu": 1})
+        scheduler_state.store.close()
+
+        warm = state.SchedulerState.open(path)
+        assert warm.load_nodes() == {"a": nodes["a"]}
+        assert warm.resource_version == "12345"
+        assert warm.reservations() == {"ns;pod": {"node": "a", "cpu": 1}}
+
+        warm.delete_reservation("ns;pod")
+        warm.resource_version = None
+        assert warm.reservations() == {}
+        assert warm.resource_version is None
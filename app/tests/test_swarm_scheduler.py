@@ -0,0 +1,220 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pytest_mock import MockerFixture
+
+from ..assume import AssumeCache
+from ..swarm.SwarmScheduler import SwarmScheduler, Unschedulable
+from ..swarm.Worker import NodeGenerations
+from .fakes import make_node, make_pod
+
+
+class TestNodeGenerations:
+    def test_generation_changes_with_the_node(self) -> None:
+        generations = NodeGenerations()
+        first = {"a": make_node("a"), "b": make_node("b")}
+        generations.stamp(first)
+        second = {"a": make_node("a"), "b": make_node("b", used_cpu=1)}
+        generations.stamp(second)
+
+        assert second["a"].generation == first["a"].generation
+        assert second["b"].generation != first["b"].generation
+
+
+class TestIncrementalWorkers:
+    def model(self) -> SwarmScheduler:
+        model = SwarmScheduler()
+        model.params = {"alpha": 1, "beta": 512, "gamma": 0}
+        return model
+
+    def test_only_changed_workers_are_rebuilt(self, mocker: MockerFixture) -> None:
+        model = self.model()
+        generations = NodeGenerations()
+        nodes = {f"n{i}": make_node(f"n{i}") for i in range(5)}
+        generations.stamp(nodes)
+        model.set_workers(nodes)
+        before = dict(model.workers_by_name)
+
+        nodes = {f"n{i}": make_node(f"n{i}") for i in range(1, 6)}
+        nodes["n1"] = make_node("n1", used_cpu=2)
+        generations.stamp(nodes)
+        update = mocker.spy(model.feasibility, "update")
+        model.set_workers(nodes)
+
+        assert sorted(model.workers_by_name) == ["n1", "n2", "n3", "n4", "n5"]
+        assert model.workers_by_name["n1"] is not before["n1"]
+        assert all(model.workers_by_name[n] is before[n] for n in ("n2", "n3", "n4"))
+        changed, removed = update.call_args.args
+        assert sorted(w.unique_id for w in changed) == ["n1", "n5"]
+        assert removed == {"n0"}
+        assert sorted(model.feasibility.feasible_nodes((3.0, 512.0))) == [
+            "n2",
+            "n3",
+            "n4",
+            "n5",
+        ]
+
+    def test_lookup_table_is_patched(self) -> None:
+        model = self.model()
+        generations = NodeGenerations()
+        nodes = {
+            "a": make_node("a", slack={"ns;big": (2, 1024)}),
+            "b": make_node("b", slack={"ns;small": (0.5, 64)}),
+        }
+        generations.stamp(nodes)
+        model.set_workers(nodes)
+        model.create_lookup_table((1, 512), 0)
+        assert set(model.bucket_of) == {("a", "ns;big"), ("b", "ns;small")}
+
+        nodes = {
+            "a": nodes["a"],
+            "c": make_node("c", slack={"ns;mid": (2, 64)}),
+        }
+        generations.stamp(nodes)
+        model.set_workers(nodes)
+        model.create_lookup_table((1, 512), 0)
+
+        assert model.bucket_of == {("a", "ns;big"): 0b11, ("c", "ns;mid"): 0b01}
+        assert [sorted(bucket) for bucket in model.lookup_table] == [
+            [],
+            [("c", "ns;mid")],
+            [],
+            [("a", "ns;big")],
+        ]
+
+    def test_nodes_without_generation_are_rebuilt(self) -> None:
+        model = self.model()
+        nodes = {"a": make_node("a")}
+        model.set_workers(nodes)
+        worker = model.workers_by_name["a"]
+        model.set_workers(nodes)
+        assert model.workers_by_name["a"] is not worker
+
+
+class TestElasticCandidates:
+    def model(self, neighbor_buckets: bool) -> SwarmScheduler:
+        model = SwarmScheduler(neighbor_buckets=neighbor_buckets)
+        model.params = {"alpha": 1, "beta": 512, "gamma": 0}
+        return model
+
+    def test_only_fitting_entries_are_sampled(self) -> None:
+        model = self.model(neighbor_buckets=False)
+        # both in the HH bucket, only the first one hosts the demand
+        model.set_workers(
+            {
+                "fits": make_node("fits", slack={"ns;a": (4, 4096)}),
+                "small": make_node("small", slack={"ns;b": (1.5, 600)}),
+            }
+        )
+        pod = make_pod("e", cpu="2", memory="1Gi", rigid=False)
+        for _ in range(20):
+            assert model.schedule_elastic(pod, (1, 512), 0) == "fits"
+
+    def test_neighboring_buckets(self) -> None:
+        # the pod is LH, the only slack is HH, no free capacity
+        nodes = {"a": make_node("a", used_cpu=4, slack={"ns;a": (2, 2048)})}
+        pod = make_pod("e", cpu="500m", memory="1Gi", rigid=False)
+
+        model = self.model(neighbor_buckets=False)
+        model.set_workers(nodes)
+        assert model.schedule_elastic(pod, (1, 512), 0) is None
+
+        model = self.model(neighbor_buckets=True)
+        model.set_workers(nodes)
+        assert model.schedule_elastic(pod, (1, 512), 0) == "a"
+
+    def test_unschedulable_only_without_free_capacity(self) -> None:
+        model = self.model(neighbor_buckets=False)
+        pod = make_pod("e", cpu="2", memory="1Gi", rigid=False)
+        # HH slack too small for the pod, and free capacity for it
+        model.set_workers({"a": make_node("a", slack={"ns;a": (1.5, 600)})})
+        with pytest.raises(Exception) as error:
+            model.schedule_elastic(pod, (1, 512), 0)
+        assert not isinstance(error.value, Unschedulable)
+
+        model.set_workers({"a": make_node("a", used_cpu=3, slack={"ns;a": (1.5, 600)})})
+        with pytest.raises(Unschedulable):
+            model.schedule_elastic(pod, (1, 512), 0)
+
+    def test_empty_bucket_backs_off_with_free_capacity(self) -> None:
+        model = self.model(neighbor_buckets=False)
+        pod = make_pod("e", cpu="500m", memory="1Gi", rigid=False)
+        # the pod is LH, the only slack is HH
+        model.set_workers({"a": make_node("a", slack={"ns;a": (2, 2048)})})
+        with pytest.raises(Exception) as error:
+            model.schedule_elastic(pod, (1, 512), 0)
+        assert not isinstance(error.value, Unschedulable)
+
+        model.set_workers({"a": make_node("a", used_cpu=4)})
+        assert model.schedule_elastic(pod, (1, 512), 0) is None
+
+
+class TestSnapshots:
+    def test_published_snapshots_do_not_change(self) -> None:
+        model = SwarmScheduler()
+        model.params = {"alpha": 1, "beta": 512, "gamma": 0}
+        nodes = {"a": make_node("a", slack={"ns;big": (2, 1024)})}
+        first = model.set_workers(nodes)
+        with_table = model.create_lookup_table((1, 512), 0)
+
+        nodes = {"b": make_node("b", slack={"ns;small": (0.5, 64)})}
+        latest = model.set_workers(nodes)
+        model.create_lookup_table((1, 512), 0)
+
+        assert first.version < with_table.version < latest.version
+        assert list(first.workers_by_name) == ["a"]
+        assert list(with_table.bucket_of) == [("a", "ns;big")]
+        assert with_table.lookup_table[0b11] == {
+            ("a", "ns;big"): {"pod": "ns;big", "node": "a", "slack": (2.0, 1024.0)}
+        }
+        assert list(model.bucket_of) == [("b", "ns;small")]
+        assert model.select_node(make_pod("p", cpu="1"), snapshot=first) == "a"
+
+    def test_elastic_pods_are_decided_on_their_snapshot(self) -> None:
+        model = SwarmScheduler()
+        model.params = {"alpha": 1, "beta": 512, "gamma": 0}
+        first = model.set_workers({"a": make_node("a", slack={"ns;big": (4, 4096)})})
+        # published for a rigid decision, without slack
+        model.set_workers({"a": make_node("a")})
+        pod = make_pod("e", cpu="2", memory="1Gi", rigid=False)
+
+        assert model.schedule_elastic(pod, (1, 512), 0, snapshot=first) == "a"
+        with pytest.raises(Exception, match="No rigid pod has slack"):
+            model.schedule_elastic(pod, (1, 512), 0)
+        assert list(first.workers_by_name["a"].slack) == ["ns;big"]
+
+    def test_commit_refuses_outdated_choices(self) -> None:
+        model = SwarmScheduler(reservations=AssumeCache(ttl=30))
+        snapshot = model.set_workers({"a": make_node("a", cpu=4)})
+        first, second = make_pod("p1", cpu="3"), make_pod("p2", cpu="3")
+
+        # both decided on the same snapshot
+        assert model.select_node(first, snapshot=snapshot) == "a"
+        assert model.select_node(second, snapshot=snapshot) == "a"
+        assert model.commit(first, "a")
+        assert not model.commit(second, "a")
+        assert model.workers_by_name["a"].usage[0] == 3
+        assert len(model.reservations or ()) == 1
+
+    def test_parallel_decisions_do_not_oversubscribe(self) -> None:
+        model = SwarmScheduler(reservations=AssumeCache(ttl=30))
+        nodes = {f"n{i}": make_node(f"n{i}", cpu=4) for i in range(4)}
+        model.set_workers(nodes)
+
+        def decide(i: int) -> bool:
+            pod = make_pod(f"p{i}", cpu="1")
+            for _ in range(10):
+                snapshot = model.set_workers(nodes)
+                try:
+                    node = model.select_node(pod, snapshot=snapshot)
+                except Exception:
+                    return False
+                if model.commit(pod, node):
+                    return True
+            return False
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            placed = sum(pool.map(decide, range(24)))
+
+        assert placed == 16
+        assert all(w.usage[0] == 4 for w in model.workers)
@@ -0,0 +1,130 @@
+import random
+
+import numpy as np
+import pytest
+from pytest_mock import MockerFixture
+
+from ..swarm import thresholds
+from ..swarm.SwarmScheduler import SwarmScheduler
+from .fakes import make_node, make_pod
+
+
+class TestP2Quantile:
+    @pytest.mark.parametrize("p", [0.1, 0.5, 0.9])
+    def test_close_to_exact_quantile(self, p: float) -> None:
+        rng = random.Random(3)
+        values = [rng.lognormvariate(0, 1) for _ in range(20_000)]
+        estimate = thresholds.P2Quantile(p)
+        for value in values:
+            estimate.add(value)
+        exact = float(np.quantile(values, p))
+        assert estimate.value() == pytest.approx(exact, rel=0.05)
+
+    def test_few_observations(self) -> None:
+        estimate = thresholds.P2Quantile(0.5)
+        assert estimate.value() is None
+        for value in (5.0, 1.0, 3.0):
+            estimate.add(value)
+        assert estimate.value() == 3.0
+
+
+class TestWindowedQuantile:
+    def test_follows_a_shift(self) -> None:
+        rng = random.Random(3)
+        estimate = thresholds.WindowedQuantile(0.5, window=1000)
+        for _ in range(5000):
+            estimate.add(rng.uniform(0, 1))
+        assert estimate.value() == pytest.approx(0.5, abs=0.05)
+        for _ in range(5000):
+            estimate.add(rng.uniform(10, 11))
+        assert estimate.value() == pytest.approx(10.5, abs=0.05)
+
+
+class TestThresholdEstimator:
+    def test_not_ready_without_observations(self) -> None:
+        estimator = thresholds.ThresholdEstimator(min_observations=5)
+        estimator.observe((1.0, 1.0))
+        assert not estimator.ready
+
+    def test_balanced_buckets(self) -> None:
+        rng = random.Random(3)
+        estimator = thresholds.ThresholdEstimator()
+        vectors = [(rng.expovariate(1), rng.expovariate(0.01)) for _ in range(5000)]
+        for vector in vectors:
+            estimator.observe(vector)
+        assert estimator.ready
+
+        alpha, beta = estimator.thresholds()
+        low_cpu = sum(cpu < alpha for cpu, _ in vectors) / len(vectors)
+        low_mem = sum(mem < beta for _, mem in vectors) / len(vectors)
+        assert low_cpu == pytest.approx(0.5, abs=0.03)
+        assert low_mem == pytest.approx(0.5, abs=0.03)
+
+    def test_thresholds_are_refreshed_on_an_interval(self) -> None:
+        now = [0.0]
+        estimator = thresholds.ThresholdEstimator(
+            min_observations=1, refresh_seconds=60, clock=lambda: now[0]
+        )
+        estimator.observe((1.0, 1.0))
+        first = estimator.thresholds()
+        for _ in range(10):
+            estimator.observe((5.0, 5.0))
+        assert estimator.thresholds() == first
+        now[0] = 60
+        assert estimator.thresholds() == (5.0, 5.0)
+
+
+class TestSwarmSchedulerThresholds:
+    def test_local_thresholds(self, mocker: MockerFixture) -> None:
+        mocker.patch(
+            "app.swarm.SwarmScheduler.get_parameters",
+            return_value=[{"alpha": 100.0, "beta": 1e6, "gamma": 0.0}],
+        )
+        model = SwarmScheduler(thresholds_source="local")
+        model.set_workers(
+            {
+                f"n{i}": make_node(f"n{i}", slack={f"ns;p{i}": (i + 1, 256 * (i + 1))})
+                for i in range(10)
+            }
+        )
+        pod = make_pod("e", cpu="1", memory="256Mi", rigid=False)
+        model.select_node(pod, slack_estimation_error=0)
+        assert model.threshold_estimator.ready
+
+        alpha, beta = model.get_thresholds()
+        assert alpha < 100.0 and beta < 1e6
+
+    def test_api_thresholds_by_default(self, mocker: MockerFixture) -> None:
+        model = SwarmScheduler(thresholds_source="api")
+        model.params = {"alpha": 1.0, "beta": 2.0, "gamma": 0.0}
+        for _ in range(10):
+            model.threshold_estimator.observe((5.0, 5.0))
+        assert model.get_thresholds() == (1.0, 2.0)
+
+    def test_thresholds_of_the_snapshot(self, mocker: MockerFixture) -> None:
+        model = SwarmScheduler(thresholds_source="api")
+        model.params = {"alpha": 1.0, "beta": 2.0, "gamma": 0.0}
+        model.set_workers({"a": make_node("a", slack={"ns;p": (1, 256)})})
+        snapshot = model.snapshot
+        model.params = {"alpha": 3.0, "beta": 4.0, "gamma": 0.0}
+        schedule_elastic = mocker.patch.object(model, "schedule_elastic")
+
+        pod = make_pod("e", rigid=False)
+        model.select_node(pod, snapshot=snapshot, refresh_parameters=False)
+        assert schedule_elastic.call_args.args[1] == (1.0, 2.0)
+
+    def test_slack_is_observed_once(self, mocker: MockerFixture) -> None:
+        model = SwarmScheduler()
+        observe = mocker.spy(model.threshold_estimator, "observe")
+        nodes = {"a": make_node("a", slack={"ns;p": (1, 256)})}
+        model.set_workers(nodes)
+        model.create_lookup_table((1, 512), 0)
+        # a rebuild for other thresholds, and a changed node with the same entry
+        model.create_lookup_table((2, 512), 0)
+        model.set_workers({"a": make_node("a", used_cpu=1, slack={"ns;p": (1, 256)})})
+        model.create_lookup_table((2, 512), 0)
+        assert observe.call_count == 1
+
+        model.set_workers({"a": make_node("a", slack={"ns;q": (1, 256)})})
+        model.create_lookup_table((2, 512), 0)
+        assert observe.call_count == 2
@@ -0,0 +1,38 @@
+from pytest_mock import MockerFixture
+
+from .. import utils
+from .benchmarks.fake_api import FakeOrchestrationAPI
+
+
+class TestPodIngestion:
+    def api(self, mocker: MockerFixture) -> FakeOrchestrationAPI:
+        api = FakeOrchestrationAPI(n_nodes=3, n_pods=10)
+        api.pods[0]["status"] = "Succeeded"
+        api.pods[1]["status"] = "Failed"
+        for pod in api.pods:
+            pod["labels"] = {"app": "x" * 100}
+        api.install(mocker)
+        return api
+
+    def test_pods_are_streamed_in_slim_form(self, mocker: MockerFixture) -> None:
+        self.api(mocker)
+        mocker.patch.object(utils, "STREAM_CHUNK_SIZE", 16)
+
+        pods = utils.get_pods_in_k8s()
+        assert len(pods) == 10
+        assert set(pods[0]) == {*utils.POD_FIELDS, "containers"}
+        assert set(pods[0]["containers"][0]) == set(utils.CONTAINER_FIELDS)
+
+    def test_finished_pods_are_skipped(self, mocker: MockerFixture) -> None:
+        self.api(mocker)
+        rigid, elastic = utils.get_pods_by_type()
+        # even pods are rigid, pod-0 and pod-1 are finished
+        assert [p["name"] for p in rigid] == ["pod-2", "pod-4", "pod-6", "pod-8"]
+        assert [p["name"] for p in elastic] == ["pod-3", "pod-5", "pod-7", "pod-9"]
+
+    def test_slack_of_active_rigid_pods_only(self, mocker: MockerFixture) -> None:
+        api = self.api(mocker)
+        slack = utils.compute_node_slack()
+        keys = {key for per_node in slack.values() for key in per_node}
+        assert keys == {f"default;pod-{i}" for i in (2, 4, 6, 8)}
+        assert set(slack) <= {node["name"] for node in api.nodes}
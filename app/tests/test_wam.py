@@ -0,0 +1,140 @@
+from typing import Any
+
+import threading
+import time
+
+from pytest_mock import MockerFixture
+
+from .. import fastjson, limiter, wam
+from .fakes import make_pod
+
+
+class TestWamClient:
+    def test_binds_run_within_the_limit(self, mocker: MockerFixture) -> None:
+        running, peak = 0, 0
+        lock = threading.Lock()
+
+        def post(url, data, headers):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+            call = fastjson.loads(data)
+            return mocker.Mock(
+                status_code=200, json=lambda: {"id": call["id"], "result": {}}
+            )
+
+        client = wam.WamClient(
+            "http://wam/rpc",
+            limiter.AdaptiveLimiter(initial_limit=2, max_limit=2, name="test"),
+            max_workers=8,
+            batch_size=1,
+        )
+        mocker.patch.object(client._session, "post", side_effect=post)
+
+        binds = [client.bind_async(make_pod(f"p{i}"), "n1") for i in range(10)]
+        for bind in binds:
+            bind.result()
+        assert 1 <= peak <= 2
+
+    def test_failed_bind_is_reported_by_the_future(self, mocker: MockerFixture) -> None:
+        client = wam.WamClient("http://wam/rpc", max_workers=1, batch_size=1)
+        mocker.patch.object(
+            client._session,
+            "post",
+            return_value=mocker.Mock(status_code=500, text="boom"),
+        )
+
+        bind = client.bind_async(make_pod("p"), "n1")
+        assert "500 - boom" in str(bind.exception())
+        assert client.limiter.limit < 4
+
+
+class TestBatching:
+    def client(self, mocker: MockerFixture, response: Any) -> wam.WamClient:
+        client = wam.WamClient("http://wam/rpc", batch_size=4, batch_linger=0.05)
+        mocker.patch.object(
+            client._session,
+            "post",
+            side_effect=lambda url, data, headers: mocker.Mock(
+                status_code=200, json=lambda: response(fastjson.loads(data))
+            ),
+        )
+        return client
+
+    def test_binds_are_sent_as_one_batch(self, mocker: MockerFixture) -> None:
+        client = self.client(
+            mocker, lambda calls: [{"id": c["id"], "result": {}} for c in calls]
+        )
+
+        binds = [client.bind_async(make_pod(f"p{i}"), "n1") for i in range(4)]
+        for bind in binds:
+            bind.result(timeout=1)
+
+        post: Any = client._session.post
+        assert post.call_count == 1
+        calls = fastjson.loads(post.call_args.kwargs["data"])
+        assert [c["params"][0]["pod"]["name"] for c in calls] == [
+            "p0",
+            "p1",
+            "p2",
+            "p3",
+        ]
+        assert len({c["id"] for c in calls}) == 4
+
+    def test_errors_are_mapped_to_their_pod(self, mocker: MockerFixture) -> None:
+        def response(calls: list[dict[str, Any]]) -> list[dict[str, Any]]:
+            return [
+                {"id": c["id"], "error": "node full"}
+                if c["params"][0]["pod"]["name"] == "p1"
+                else {"id": c["id"], "result": {}}
+                for c in reversed(calls)
+            ]
+
+        client = self.client(mocker, response)
+        binds = [client.bind_async(make_pod(f"p{i}"), "n1") for i in range(3)]
+
+        assert binds[0].exception(timeout=1) is None
+        assert "node full" in str(binds[1].exception(timeout=1))
+        assert binds[2].exception(timeout=1) is None
+
+    def test_calls_without_a_response_fail(self, mocker: MockerFixture) -> None:
+        client = self.client(
+            mocker, lambda calls: [{"id": calls[0]["id"], "result": {}}]
+        )
+        binds = [client.bind_async(make_pod(f"p{i}"), "n1") for i in range(2)]
+
+        assert binds[0].exception(timeout=1) is None
+        assert "no response" in str(binds[1].exception(timeout=1))
+        post: Any = client._session.post
+        calls = fastjson.loads(post.call_args.kwargs["data"])
+        assert all(c["jsonrpc"] == "2.0" for c in calls)
+
+    def test_non_json_response_fails_every_bind(self, mocker: MockerFixture) -> None:
+        client = wam.WamClient("http://wam/rpc", batch_size=4, batch_linger=0.05)
+        mocker.patch.object(
+            client._session,
+            "post",
+            return_value=mocker.Mock(
+                status_code=200, text="<html>", json=mocker.Mock(side_effect=ValueError)
+            ),
+        )
+
+        binds = [client.bind_async(make_pod(f"p{i}"), "n1") for i in range(2)]
+        for bind in binds:
+            assert "not JSON" in str(bind.exception(timeout=1))
+
+    def test_failed_request_fails_every_bind(self, mocker: MockerFixture) -> None:
+        client = wam.WamClient("http://wam/rpc", batch_size=4, batch_linger=0.05)
+        mocker.patch.object(
+            client._session,
+            "post",
+            return_value=mocker.Mock(status_code=503, text="unavailable"),
+        )
+
+        binds = [client.bind_async(make_pod(f"p{i}"), "n1") for i in range(2)]
+        for i, bind in enumerate(binds):
+            assert f"Pod p{i}: 503 - unavailable" in str(bind.exception(timeout=1))
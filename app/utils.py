@@ -1,27 +1,13 @@
-from typing import Any
+from typing import Any, Callable, Iterator, Optional
 
 from datetime import datetime
 
-import requests
-from kubernetes import client, config
-from kubernetes.utils.quantity import parse_quantity as pq
 from loguru import logger
 
-from app.consts import ORCHESTRATION_API_URL
-
-try:
-    config.load_incluster_config()
-except config.config_exception.ConfigException:
-    try:
-        config.load_kube_config()
-    except config.config_exception.ConfigException:
-        logger.error("No Kubernetes config found — running without cluster access")
-v1 = client.CoreV1Api()
-custom = client.CustomObjectsApi()
-
-
-def parse_quantity(quantity):
-    return float(pq(quantity))
+from app import fastjson, orchestration
+from app.k8s import clients
+from app.quantity import parse_quantity as parse_quantity
+from app.schemas import resource_value
 
 
 def diff_timestamps(t1: str, t2: str) -> float:
@@ -38,27 +24,56 @@ def classify_pod(pod):
     return "elastic"
 
 
+# fields of the /k8s_pod entries the scheduler uses
+POD_FIELDS = ("uid", "name", "namespace", "node_name", "status")
+CONTAINER_FIELDS = ("cpu_request", "memory_request", "cpu_limit", "memory_limit")
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def slim_pod(pod: dict[str, Any]) -> dict[str, Any]:
+    slim = {field: pod.get(field) for field in POD_FIELDS}
+    slim["containers"] = [
+        {field: c.get(field) for field in CONTAINER_FIELDS}
+        for c in pod.get("containers", [])
+    ]
+    return slim
+
+
+def decode_pods(response: Any) -> list[dict[str, Any]]:
+    """
+    The slim form (`slim_pod`) of the pods of a /k8s_pod response, decoded one
+    pod at a time from the stream.
+    """
+    return [
+        slim_pod(pod)
+        for pod in fastjson.iter_array(response.iter_content(STREAM_CHUNK_SIZE))
+    ]
+
+
+def iter_pods_in_k8s(
+    keep: Optional[Callable[[dict[str, Any]], bool]] = None
+) -> Iterator[dict[str, Any]]:
+    """
+    The pods of /k8s_pod for which `keep` is true, in slim form. The list is
+    only downloaded and decoded again when it changed since the last call.
+    Raises if it can't be fetched, rather than passing for an empty cluster.
+    """
+    pods = orchestration.client.get("/k8s_pod", decode_pods)
+    if pods is None:
+        raise Exception("Failed to get pod details.")
+    for pod in pods:
+        if keep is None or keep(pod):
+            yield pod
+
+
 def get_pods_in_k8s():
-    try:
-        response = requests.get(f"{ORCHESTRATION_API_URL}/k8s_pod")
-        if response.status_code == 200:
-            return response.json()
-        else:
-            logger.error(f"Status code {response.status_code}: {response.text}")
-    except Exception:
-        logger.exception("Failed to get node details.")
+    return list(iter_pods_in_k8s())
 
 
 def get_parameters(limit=1):
     logger.debug("Reading latest parameter(s).")
     try:
-        response = requests.get(
-            f"{ORCHESTRATION_API_URL}/tuning_parameters/latest/{limit}"
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            logger.error(f"Status code {response.status_code}: {response.text}")
+        return orchestration.client.get(f"/tuning_parameters/latest/{limit}")
     except Exception:
         logger.exception("Failed to get parameters.")
 
@@ -71,22 +86,30 @@ def classify_pod_dict(pod):
     return "elastic"
 
 
+def is_active(pod):
+    # skip finished pods
+    return pod.get("status") not in ("Succeeded", "Failed")
+
+
+def is_active_rigid(pod):
+    return is_active(pod) and classify_pod_dict(pod) == "rigid"
+
+
 def get_pods_by_type():
-    pods = get_pods_in_k8s()
     rigid: list[Any] = []
     elastic: list[Any] = []
-    for p in pods:
-        # skip finished pods
-        if p.get("status") not in ("Succeeded", "Failed"):
-            typ = classify_pod_dict(p)
-            (rigid if typ == "rigid" else elastic).append(p)
+    for p in iter_pods_in_k8s(is_active):
+        typ = classify_pod_dict(p)
+        (rigid if typ == "rigid" else elastic).append(p)
     return rigid, elastic
 
 
 def get_pod_usage():
     """Return dict {(namespace, name): {'cpu': millicores, 'mem': bytes}}"""
     usage = {}
-    metrics = custom.list_cluster_custom_object("metrics.k8s.io", "v1beta1", "pods")
+    metrics = clients.custom_objects().list_cluster_custom_object(
+        "metrics.k8s.io", "v1beta1", "pods"
+    )
     for item in metrics["items"]:
         cpu = sum(parse_quantity(c["usage"]["cpu"]) for c in item["containers"])
         mem = sum(
@@ -101,12 +124,11 @@ def get_pod_usage():
 
 
 def compute_node_slack():
-    rigid, _ = get_pods_by_type()
     usage = get_pod_usage()
     slack_per_node: dict[str, dict[Any, Any]] = {}
 
-    for pod in rigid:
-        node = pod.get("node_name")
+    for pod in iter_pods_in_k8s(is_active_rigid):
+        node = pod["node_name"]
         key = f"{pod.get('namespace')};{pod.get('name')}"
         used = usage.get(key, {"cpu": 0, "memory": 0})
 
@@ -132,16 +154,15 @@ def compute_node_slack():
 
 
 def get_pod_requested_resources(pod):
-    """Return total requested CPU (millicores) and memory (bytes) for a pod."""
-    total_cpu = 0
-    total_mem = 0
+    """
+    Return the total requested CPU (cores), memory (MiB) and any other resource
+    (see `resource_value`) of a pod.
+    """
+    totals = {"cpu": 0.0, "memory": 0.0}
 
     for container in pod.spec.containers:
         requests = container.resources.limits or container.resources.requests or {}
-        cpu_req = requests.get("cpu", "0")
-        mem_req = requests.get("memory", "0")
-
-        total_cpu += parse_quantity(cpu_req)
-        total_mem += parse_quantity(mem_req) / (1024**2)
+        for name, quantity in requests.items():
+            totals[name] = totals.get(name, 0.0) + resource_value(name, quantity)
 
-    return {"cpu": total_cpu, "memory": total_mem}
+    return totals
@@ -0,0 +1,155 @@
+from typing import Any, Optional
+
+import itertools
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from loguru import logger
+
+from app import fastjson
+from app.consts import WAM_BATCH_LINGER_MS, WAM_BATCH_SIZE, WAM_MAX_CONCURRENCY, WAM_URL
+from app.limiter import AdaptiveLimiter
+
+# (pod, node name, future of the bind)
+PendingBind = tuple[Any, str, "Future[None]"]
+
+
+class WamClient:
+    """
+    JSON-RPC client of the Workload Actions Manager (WAM).
+
+    Asynchronous binds are collected for up to `batch_linger` seconds or
+    `batch_size` binds and sent as one JSON-RPC batch; the result or error of
+    each call is mapped back to the future of its pod. Requests go through an
+    `AdaptiveLimiter`, so the number of requests in flight follows WAM's
+    latency and errors instead of the pending backlog.
+    """
+
+    def __init__(
+        self,
+        url: str = WAM_URL,
+        limiter: Optional[AdaptiveLimiter] = None,
+        max_workers: int = WAM_MAX_CONCURRENCY,
+        batch_size: int = WAM_BATCH_SIZE,
+        batch_linger: float = WAM_BATCH_LINGER_MS / 1000,
+    ) -> None:
+        self.url = url
+        self.limiter = limiter or AdaptiveLimiter(max_limit=max_workers)
+        self.max_workers = max_workers
+        self.batch_size = max(batch_size, 1)
+        self.batch_linger = batch_linger
+        self._session = requests.Session()
+        self._ids = itertools.count(1)
+        self._pending: "queue.Queue[PendingBind]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._dispatcher: Optional[threading.Thread] = None
+
+    def _call(self, pod: Any, node_name: str, id: int) -> dict[str, Any]:
+        return {
+            "jsonrpc": "2.0",
+            "method": "action.Bind",
+            "params": [
+                {
+                    "pod": {
+                        "namespace": pod.metadata.namespace,
+                        "name": pod.metadata.name,
+                    },
+                    "node": {"name": node_name},
+                }
+            ],
+            "id": str(id),
+        }
+
+    def _post(self, payload: Any) -> dict[str, dict[str, Any]]:
+        """Send one request and return the JSON-RPC responses by call id."""
+        logger.opt(lazy=True).debug(
+            "Payload:\n{}", lambda: json.dumps(payload, indent=2)
+        )
+
+        data = fastjson.dumps(payload)
+        with self.limiter.slot():
+            response = self._session.post(self.url, data=data, headers=fastjson.HEADERS)
+            if response.status_code != 200:
+                raise Exception(f"{response.status_code} - {response.text}")
+        try:
+            body = response.json()
+        except ValueError:
+            raise Exception(f"Response is not JSON: {response.text}")
+        items = body if isinstance(body, list) else [body]
+        return {str(item.get("id")): item for item in items if isinstance(item, dict)}
+
+    def bind(self, pod: Any, node_name: str, id: Optional[int] = None) -> None:
+        call = self._call(pod, node_name, next(self._ids) if id is None else id)
+        try:
+            responses = self._post(call)
+        except Exception as e:
+            raise Exception(f"Failed to schedule Pod {pod.metadata.name}: {e}")
+        self._check(pod, node_name, responses.get(call["id"]))
+
+    def bind_batch(self, binds: list[PendingBind]) -> None:
+        """Send `binds` as one batch and resolve their futures."""
+        try:
+            calls = [self._call(pod, node, next(self._ids)) for pod, node, _ in binds]
+            responses = self._post(calls if len(calls) > 1 else calls[0])
+        except Exception as e:
+            for pod, _, future in binds:
+                future.set_exception(
+                    Exception(f"Failed to schedule Pod {pod.metadata.name}: {e}")
+                )
+            return
+        for (pod, node_name, future), call in zip(binds, calls):
+            try:
+                self._check(pod, node_name, responses.get(call["id"]))
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(None)
+
+    @staticmethod
+    def _check(pod: Any, node_name: str, response: Optional[dict[str, Any]]) -> None:
+        if response is None:
+            raise Exception(
+                f"Failed to schedule Pod {pod.metadata.name}: no response to the call"
+            )
+        if response.get("error") is not None:
+            raise Exception(
+                f"Failed to schedule Pod {pod.metadata.name}: {response['error']}"
+            )
+        logger.info("Successfully scheduled Pod {} on {}", pod.metadata.name, node_name)
+
+    def bind_async(self, pod: Any, node_name: str) -> "Future[None]":
+        """Queue a bind for the next batch; the future holds its exception if any."""
+        with self._lock:
+            if self._dispatcher is None:
+                self._executor = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix="wam-bind"
+                )
+                self._dispatcher = threading.Thread(
+                    target=self._dispatch, name="wam-dispatcher", daemon=True
+                )
+                self._dispatcher.start()
+        future: "Future[None]" = Future()
+        self._pending.put((pod, node_name, future))
+        return future
+
+    def _dispatch(self) -> None:
+        assert self._executor is not None
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self.batch_linger
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(
+                        self._pending.get(timeout=max(deadline - time.monotonic(), 0))
+                    )
+                except queue.Empty:
+                    break
+            self._executor.submit(self.bind_batch, batch)
+
+
+wam = WamClient()
@@ -0,0 +1,172 @@
+from typing import Any, Callable
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# Per-decision cost of logging and JSON encoding with debug logging off, before
+# (eager f-strings, stdlib json) and after (deferred logging, app.fastjson).
+os.environ.setdefault("LOGURU_LEVEL", "INFO")
+
+Stage = Callable[[], None]
+
+
+def make_snapshot(n_nodes: int, n_slack: int) -> list[dict[str, Any]]:
+    """Raw /k8s_node response with a slack table per node."""
+    return [
+        {
+            "name": f"node-{i}",
+            "id": f"id-{i}",
+            "usage": {"cpu": "1500m", "memory": "3Gi"},
+            "capacity": {"cpu": "16", "memory": "64Gi"},
+            "allocatable": {"cpu": "15800m", "memory": "62Gi"},
+            "slack": {
+                f"ns;pod-{i}-{j}": {"cpu": 0.25 * j, "memory": 128.0 * j}
+                for j in range(n_slack)
+            },
+        }
+        for i in range(n_nodes)
+    ]
+
+
+def bind_payload(i: int) -> dict[str, Any]:
+    return {
+        "method": "action.Bind",
+        "params": [
+            {
+                "pod": {"namespace": "default", "name": f"pod-{i}"},
+                "node": {"name": f"node-{i}"},
+            }
+        ],
+        "id": str(i),
+    }
+
+
+def stages(raw: list[dict[str, Any]]) -> dict[str, tuple[Stage, Stage]]:
+    from loguru import logger
+
+    from app import fastjson
+    from app.schemas import NodeDetail
+
+    nodes = {node["name"]: NodeDetail.model_validate(node) for node in raw}
+    slack = {name: node.slack for name, node in nodes.items()}
+    payload = bind_payload(1)
+
+    def parse_before() -> None:
+        for node in raw:
+            NodeDetail.model_validate_json(json.dumps(node))
+
+    def parse_after() -> None:
+        for node in raw:
+            NodeDetail.model_validate(node)
+
+    def workers_log_before() -> None:
+        logger.debug(f"Setting up the model workers with {len(nodes)} nodes:")
+        for name in nodes:
+            logger.debug(f"{name}: {nodes[name]}")
+
+    def workers_log_after() -> None:
+        logger.opt(lazy=True).debug(
+            "Setting up the model workers with {} nodes:\n{}",
+            lambda: len(nodes),
+            lambda: "\n".join(f"{name}: {node}" for name, node in nodes.items()),
+        )
+
+    def bind_before() -> None:
+        logger.debug(f"Payload:\n{json.dumps(payload, indent=2)}")
+        json.dumps(payload).encode()
+
+    def bind_after() -> None:
+        logger.opt(lazy=True).debug(
+            "Payload:\n{}", lambda: json.dumps(payload, indent=2)
+        )
+        fastjson.dumps(payload)
+
+    def state_before() -> None:
+        for table in slack.values():
+            json.dumps({k: v.model_dump() for k, v in (table or {}).items()})
+
+    def state_after() -> None:
+        for table in slack.values():
+            fastjson.dumps({k: v.model_dump() for k, v in (table or {}).items()})
+
+    return {
+        "parse snapshot": (parse_before, parse_after),
+        "log workers": (workers_log_before, workers_log_after),
+        "bind payload": (bind_before, bind_after),
+        "encode state": (state_before, state_after),
+    }
+
+
+def measure(fn: Stage, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="benchmark_decision.py")
+    parser.add_argument(
+        "--app-dir",
+        help="Directory containing the app",
+        default=".",
+    )
+    parser.add_argument(
+        "--nodes",
+        help="Number of nodes in the snapshot",
+        type=int,
+        default=1000,
+    )
+    parser.add_argument(
+        "--slack",
+        help="Number of slack entries per node",
+        type=int,
+        default=10,
+    )
+    parser.add_argument(
+        "--repeat",
+        help="Number of measured decisions per stage",
+        type=int,
+        default=20,
+    )
+    parser.add_argument(
+        "--out",
+        help="Optional JSON file for the results",
+        default=None,
+    )
+
+    args = parser.parse_args()
+    sys.path.insert(0, args.app_dir)
+
+    results = {}
+    for stage, (before, after) in stages(make_snapshot(args.nodes, args.slack)).items():
+        before(), after()  # warm up
+        results[stage] = {
+            "before_ms": measure(before, args.repeat),
+            "after_ms": measure(after, args.repeat),
+        }
+        print(
+            f"{stage}: {results[stage]['before_ms']:.2f} ms -> "
+            f"{results[stage]['after_ms']:.2f} ms"
+        )
+
+    before_total = sum(r["before_ms"] for r in results.values())
+    after_total = sum(r["after_ms"] for r in results.values())
+    print(
+        f"per decision at {args.nodes} nodes: {before_total:.2f} ms -> "
+        f"{after_total:.2f} ms (median of {args.repeat})"
+    )
+
+    if args.out is not None:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
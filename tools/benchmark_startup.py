@@ -0,0 +1,102 @@
+from typing import Any
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Each probe runs in a fresh interpreter so that module caches do not leak
+# between measurements. It prints the import and ready times in seconds.
+PROBES = {
+    "app.main": """
+import json, time
+t0 = time.perf_counter()
+from app.main import app
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+TestClient(app).get("/")
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "ready": t2 - t0}))
+""",
+    "app.scheduler": """
+import json, time
+t0 = time.perf_counter()
+import app.scheduler
+t1 = time.perf_counter()
+from app.k8s import clients
+from app.swarm.SwarmScheduler import SwarmScheduler
+clients.core_v1()
+SwarmScheduler()
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "ready": t2 - t0}))
+""",
+}
+
+
+def run_probe(code: str, app_dir: str) -> Any:
+    env = dict(os.environ, PYTHONPATH=app_dir, LOGURU_LEVEL="CRITICAL")
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    last_line = result.stdout.strip().splitlines()[-1]
+    return json.loads(last_line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="benchmark_startup.py")
+    parser.add_argument(
+        "--app-dir",
+        help="Directory containing the app",
+        default=".",
+    )
+    parser.add_argument(
+        "--repeat",
+        help="Number of cold starts per target",
+        type=int,
+        default=5,
+    )
+    parser.add_argument(
+        "--budget-ms",
+        help="Fail if the median ready time of any target exceeds this budget",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--out",
+        help="Optional JSON file for the results",
+        default=None,
+    )
+
+    args = parser.parse_args()
+
+    results = {}
+    for target, code in PROBES.items():
+        samples = [run_probe(code, args.app_dir) for _ in range(args.repeat)]
+        results[target] = {
+            "import_ms": statistics.median(s["import"] for s in samples) * 1000,
+            "ready_ms": statistics.median(s["ready"] for s in samples) * 1000,
+        }
+        print(
+            f"{target}: import {results[target]['import_ms']:.1f} ms, "
+            f"ready {results[target]['ready_ms']:.1f} ms (median of {args.repeat})"
+        )
+
+    if args.out is not None:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.budget_ms is not None:
+        over = [t for t, r in results.items() if r["ready_ms"] > args.budget_ms]
+        if over:
+            print(f"startup budget of {args.budget_ms} ms exceeded by: {over}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()